@@ -0,0 +1,923 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import {DataTypes} from "../../libraries/aave/DataTypes.sol";
+import "../../interfaces/aave/IPriceOracle.sol";
+import "../../interfaces/aave/IReserveInterestRateStrategy.sol";
+
+// Aave v2 stand-ins: lending pool, aToken, variable debt token, interest
+// rate strategy, protocol data provider and price oracle. scripts/mocks.py
+// places the pool, the data provider and the oracle at their mainnet
+// addresses. Borrows accrue at the rate of the interest rate strategy like
+// Aave (compounded variable borrow index); deposits do not earn interest,
+// stable rate borrowing, credit delegation, flashloans and liquidations are
+// not modelled. Revert reasons are Aave's error codes.
+
+interface IStETHShares {
+    function getSharesByPooledEth(uint256 _ethAmount)
+        external
+        view
+        returns (uint256);
+
+    function getPooledEthByShares(uint256 _sharesAmount)
+        external
+        view
+        returns (uint256);
+}
+
+library MockRayMath {
+    using SafeMath for uint256;
+
+    uint256 internal constant WAD = 1e18;
+    uint256 internal constant RAY = 1e27;
+    uint256 internal constant PERCENTAGE_FACTOR = 1e4;
+
+    function rayMul(uint256 a, uint256 b) internal pure returns (uint256) {
+        return a.mul(b).add(RAY / 2) / RAY;
+    }
+
+    function rayDiv(uint256 a, uint256 b) internal pure returns (uint256) {
+        return a.mul(RAY).add(b / 2).div(b);
+    }
+
+    function wadDiv(uint256 a, uint256 b) internal pure returns (uint256) {
+        return a.mul(WAD).add(b / 2).div(b);
+    }
+
+    function percentMul(uint256 value, uint256 percentage)
+        internal
+        pure
+        returns (uint256)
+    {
+        return value.mul(percentage).add(PERCENTAGE_FACTOR / 2) / PERCENTAGE_FACTOR;
+    }
+}
+
+contract MockAToken {
+    using SafeMath for uint256;
+
+    address public immutable POOL;
+    address public immutable UNDERLYING_ASSET_ADDRESS;
+    // stETH rebases: balances are kept in shares of the underlying so the
+    // collateral follows every oracle report like Aave's astETH
+    bool public immutable rebasing;
+    string public name;
+    string public symbol;
+    uint8 public constant decimals = 18;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(address indexed owner, address indexed spender, uint256 value);
+
+    mapping(address => uint256) private scaledBalances;
+    mapping(address => mapping(address => uint256)) private allowances;
+    uint256 private scaledSupply;
+
+    modifier onlyLendingPool {
+        require(msg.sender == POOL, "29");
+        _;
+    }
+
+    constructor(
+        address _pool,
+        address _underlying,
+        bool _rebasing,
+        string memory _name,
+        string memory _symbol
+    ) public {
+        POOL = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlying;
+        rebasing = _rebasing;
+        name = _name;
+        symbol = _symbol;
+    }
+
+    function balanceOf(address _user) public view returns (uint256) {
+        return _unscaled(scaledBalances[_user]);
+    }
+
+    function scaledBalanceOf(address _user) external view returns (uint256) {
+        return scaledBalances[_user];
+    }
+
+    function totalSupply() external view returns (uint256) {
+        return _unscaled(scaledSupply);
+    }
+
+    function scaledTotalSupply() external view returns (uint256) {
+        return scaledSupply;
+    }
+
+    function mint(address _user, uint256 _amount)
+        external
+        onlyLendingPool
+        returns (bool)
+    {
+        uint256 scaled = _scaled(_amount);
+        require(scaled != 0, "56");
+        scaledBalances[_user] = scaledBalances[_user].add(scaled);
+        scaledSupply = scaledSupply.add(scaled);
+        emit Transfer(address(0), _user, _amount);
+        return true;
+    }
+
+    function burn(
+        address _user,
+        address _receiverOfUnderlying,
+        uint256 _amount
+    ) external onlyLendingPool {
+        uint256 scaled = _scaled(_amount);
+        scaledBalances[_user] = scaledBalances[_user].sub(scaled);
+        scaledSupply = scaledSupply.sub(scaled);
+        require(
+            IERC20(UNDERLYING_ASSET_ADDRESS).transfer(
+                _receiverOfUnderlying,
+                _amount
+            )
+        );
+        emit Transfer(_user, address(0), _amount);
+    }
+
+    function transferUnderlyingTo(address _target, uint256 _amount)
+        external
+        onlyLendingPool
+        returns (uint256)
+    {
+        require(IERC20(UNDERLYING_ASSET_ADDRESS).transfer(_target, _amount));
+        return _amount;
+    }
+
+    function allowance(address _owner, address _spender)
+        external
+        view
+        returns (uint256)
+    {
+        return allowances[_owner][_spender];
+    }
+
+    function approve(address _spender, uint256 _amount) external returns (bool) {
+        allowances[msg.sender][_spender] = _amount;
+        emit Approval(msg.sender, _spender, _amount);
+        return true;
+    }
+
+    function transfer(address _recipient, uint256 _amount)
+        external
+        returns (bool)
+    {
+        _transfer(msg.sender, _recipient, _amount);
+        return true;
+    }
+
+    function transferFrom(
+        address _sender,
+        address _recipient,
+        uint256 _amount
+    ) external returns (bool) {
+        allowances[_sender][msg.sender] = allowances[_sender][msg.sender].sub(
+            _amount
+        );
+        _transfer(_sender, _recipient, _amount);
+        return true;
+    }
+
+    function _transfer(
+        address _from,
+        address _to,
+        uint256 _amount
+    ) internal {
+        uint256 scaled = _scaled(_amount);
+        scaledBalances[_from] = scaledBalances[_from].sub(scaled);
+        scaledBalances[_to] = scaledBalances[_to].add(scaled);
+        // The sender must stay healthy without the collateral
+        MockLendingPool(POOL).finalizeTransfer(
+            UNDERLYING_ASSET_ADDRESS,
+            _from,
+            _to,
+            _amount,
+            0,
+            0
+        );
+        emit Transfer(_from, _to, _amount);
+    }
+
+    function _scaled(uint256 _amount) internal view returns (uint256) {
+        if (!rebasing) {
+            return _amount;
+        }
+        return
+            IStETHShares(UNDERLYING_ASSET_ADDRESS).getSharesByPooledEth(_amount);
+    }
+
+    function _unscaled(uint256 _scaledAmount) internal view returns (uint256) {
+        if (!rebasing) {
+            return _scaledAmount;
+        }
+        return
+            IStETHShares(UNDERLYING_ASSET_ADDRESS).getPooledEthByShares(
+                _scaledAmount
+            );
+    }
+}
+
+contract MockVariableDebtToken {
+    using SafeMath for uint256;
+    using MockRayMath for uint256;
+
+    address public immutable POOL;
+    address public immutable UNDERLYING_ASSET_ADDRESS;
+    string public name;
+    string public symbol;
+    uint8 public constant decimals = 18;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+
+    mapping(address => uint256) private scaledBalances;
+    uint256 private scaledSupply;
+
+    modifier onlyLendingPool {
+        require(msg.sender == POOL, "29");
+        _;
+    }
+
+    constructor(
+        address _pool,
+        address _underlying,
+        string memory _name,
+        string memory _symbol
+    ) public {
+        POOL = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlying;
+        name = _name;
+        symbol = _symbol;
+    }
+
+    function balanceOf(address _user) external view returns (uint256) {
+        return scaledBalances[_user].rayMul(_index());
+    }
+
+    function scaledBalanceOf(address _user) external view returns (uint256) {
+        return scaledBalances[_user];
+    }
+
+    function totalSupply() external view returns (uint256) {
+        return scaledSupply.rayMul(_index());
+    }
+
+    function scaledTotalSupply() external view returns (uint256) {
+        return scaledSupply;
+    }
+
+    function mint(
+        address,
+        address _onBehalfOf,
+        uint256 _amount,
+        uint256 _index
+    ) external onlyLendingPool returns (bool) {
+        uint256 previousBalance = scaledBalances[_onBehalfOf];
+        uint256 scaled = _amount.rayDiv(_index);
+        require(scaled != 0, "56");
+        scaledBalances[_onBehalfOf] = previousBalance.add(scaled);
+        scaledSupply = scaledSupply.add(scaled);
+        emit Transfer(address(0), _onBehalfOf, _amount);
+        return previousBalance == 0;
+    }
+
+    function burn(
+        address _user,
+        uint256 _amount,
+        uint256 _index
+    ) external onlyLendingPool {
+        uint256 scaled = _amount.rayDiv(_index);
+        require(scaled != 0, "57");
+        scaledBalances[_user] = scaledBalances[_user].sub(scaled);
+        scaledSupply = scaledSupply.sub(scaled);
+        emit Transfer(_user, address(0), _amount);
+    }
+
+    function transfer(address, uint256) external pure returns (bool) {
+        revert("TRANSFER_NOT_SUPPORTED");
+    }
+
+    function approve(address, uint256) external pure returns (bool) {
+        revert("APPROVAL_NOT_SUPPORTED");
+    }
+
+    function _index() internal view returns (uint256) {
+        return
+            MockLendingPool(POOL).getReserveNormalizedVariableDebt(
+                UNDERLYING_ASSET_ADDRESS
+            );
+    }
+}
+
+contract MockReserveInterestRateStrategy {
+    using SafeMath for uint256;
+    using MockRayMath for uint256;
+
+    uint256 internal constant RAY = 1e27;
+    uint256 internal constant PERCENTAGE_FACTOR = 1e4;
+
+    uint256 public immutable OPTIMAL_UTILIZATION_RATE;
+    uint256 public immutable EXCESS_UTILIZATION_RATE;
+    uint256 public immutable baseVariableBorrowRate;
+    uint256 public immutable variableRateSlope1;
+    uint256 public immutable variableRateSlope2;
+
+    constructor(
+        uint256 _optimalUtilizationRate,
+        uint256 _baseVariableBorrowRate,
+        uint256 _variableRateSlope1,
+        uint256 _variableRateSlope2
+    ) public {
+        OPTIMAL_UTILIZATION_RATE = _optimalUtilizationRate;
+        EXCESS_UTILIZATION_RATE = RAY.sub(_optimalUtilizationRate);
+        baseVariableBorrowRate = _baseVariableBorrowRate;
+        variableRateSlope1 = _variableRateSlope1;
+        variableRateSlope2 = _variableRateSlope2;
+    }
+
+    function getMaxVariableBorrowRate() external view returns (uint256) {
+        return
+            baseVariableBorrowRate.add(variableRateSlope1).add(
+                variableRateSlope2
+            );
+    }
+
+    function calculateInterestRates(
+        address,
+        uint256 utilizationRate,
+        uint256,
+        uint256,
+        uint256,
+        uint256 reserveFactor
+    )
+        external
+        view
+        returns (
+            uint256 liquidityRate,
+            uint256 stableBorrowRate,
+            uint256 variableBorrowRate
+        )
+    {
+        if (utilizationRate > OPTIMAL_UTILIZATION_RATE) {
+            uint256 excessUtilizationRateRatio =
+                utilizationRate.sub(OPTIMAL_UTILIZATION_RATE).rayDiv(
+                    EXCESS_UTILIZATION_RATE
+                );
+            variableBorrowRate = baseVariableBorrowRate
+                .add(variableRateSlope1)
+                .add(variableRateSlope2.rayMul(excessUtilizationRateRatio));
+        } else {
+            variableBorrowRate = baseVariableBorrowRate.add(
+                utilizationRate.rayMul(variableRateSlope1).rayDiv(
+                    OPTIMAL_UTILIZATION_RATE
+                )
+            );
+        }
+        liquidityRate = variableBorrowRate.rayMul(utilizationRate).percentMul(
+            PERCENTAGE_FACTOR.sub(reserveFactor)
+        );
+        stableBorrowRate = 0;
+    }
+}
+
+contract MockLendingPool {
+    using SafeMath for uint256;
+    using MockRayMath for uint256;
+
+    uint256 internal constant RAY = 1e27;
+    uint256 internal constant SECONDS_PER_YEAR = 365 days;
+    uint256 internal constant HEALTH_FACTOR_LIQUIDATION_THRESHOLD = 1e18;
+    uint256 internal constant VARIABLE = 2;
+
+    event Deposit(
+        address indexed reserve,
+        address user,
+        address indexed onBehalfOf,
+        uint256 amount,
+        uint16 indexed referral
+    );
+    event Withdraw(
+        address indexed reserve,
+        address indexed user,
+        address indexed to,
+        uint256 amount
+    );
+    event Borrow(
+        address indexed reserve,
+        address user,
+        address indexed onBehalfOf,
+        uint256 amount,
+        uint256 borrowRateMode,
+        uint256 borrowRate,
+        uint16 indexed referral
+    );
+    event Repay(
+        address indexed reserve,
+        address indexed user,
+        address indexed repayer,
+        uint256 amount
+    );
+    event ReserveUsedAsCollateralEnabled(
+        address indexed reserve,
+        address indexed user
+    );
+
+    struct AccountData {
+        uint256 collateral;
+        uint256 debt;
+        uint256 ltv;
+        uint256 threshold;
+    }
+
+    // Placed at the mainnet address, so no constructor state
+    address public priceOracle;
+    mapping(address => DataTypes.ReserveData) internal reserves;
+    address[] internal reservesList;
+
+    function initialize(address _priceOracle) external {
+        require(priceOracle == address(0), "already initialized");
+        priceOracle = _priceOracle;
+    }
+
+    function initReserve(
+        address asset,
+        address aTokenAddress,
+        address stableDebtAddress,
+        address variableDebtAddress,
+        address interestRateStrategyAddress
+    ) external {
+        DataTypes.ReserveData storage reserve = reserves[asset];
+        require(reserve.aTokenAddress == address(0), "32");
+        reserve.liquidityIndex = uint128(RAY);
+        reserve.variableBorrowIndex = uint128(RAY);
+        reserve.lastUpdateTimestamp = uint40(block.timestamp);
+        reserve.aTokenAddress = aTokenAddress;
+        reserve.stableDebtTokenAddress = stableDebtAddress;
+        reserve.variableDebtTokenAddress = variableDebtAddress;
+        reserve.interestRateStrategyAddress = interestRateStrategyAddress;
+        reserve.id = uint8(reservesList.length);
+        reservesList.push(asset);
+    }
+
+    // Packed like Aave's ReserveConfigurationMap, see DataTypes
+    function setConfiguration(address asset, uint256 configuration) external {
+        reserves[asset].configuration.data = configuration;
+    }
+
+    function getConfiguration(address asset)
+        external
+        view
+        returns (DataTypes.ReserveConfigurationMap memory)
+    {
+        return reserves[asset].configuration;
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        returns (DataTypes.ReserveData memory)
+    {
+        return reserves[asset];
+    }
+
+    function getReservesList() external view returns (address[] memory) {
+        return reservesList;
+    }
+
+    function getReserveNormalizedIncome(address asset)
+        external
+        view
+        returns (uint256)
+    {
+        return reserves[asset].liquidityIndex;
+    }
+
+    function getReserveNormalizedVariableDebt(address asset)
+        public
+        view
+        returns (uint256)
+    {
+        DataTypes.ReserveData storage reserve = reserves[asset];
+        if (uint40(block.timestamp) == reserve.lastUpdateTimestamp) {
+            return reserve.variableBorrowIndex;
+        }
+        return
+            _compoundedInterest(
+                reserve.currentVariableBorrowRate,
+                reserve.lastUpdateTimestamp
+            )
+                .rayMul(reserve.variableBorrowIndex);
+    }
+
+    function deposit(
+        address asset,
+        uint256 amount,
+        address onBehalfOf,
+        uint16 referralCode
+    ) external {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(amount != 0, "1");
+        _updateState(reserve, asset);
+        require(
+            IERC20(asset).transferFrom(
+                msg.sender,
+                reserve.aTokenAddress,
+                amount
+            )
+        );
+        MockAToken(reserve.aTokenAddress).mint(onBehalfOf, amount);
+        _updateInterestRates(reserve, asset);
+        emit Deposit(asset, msg.sender, onBehalfOf, amount, referralCode);
+    }
+
+    function withdraw(
+        address asset,
+        uint256 amount,
+        address to
+    ) external returns (uint256) {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        uint256 userBalance =
+            MockAToken(reserve.aTokenAddress).balanceOf(msg.sender);
+        uint256 amountToWithdraw = amount == uint256(-1) ? userBalance : amount;
+        require(amountToWithdraw != 0, "1");
+        require(amountToWithdraw <= userBalance, "5");
+        _updateState(reserve, asset);
+        MockAToken(reserve.aTokenAddress).burn(msg.sender, to, amountToWithdraw);
+        _updateInterestRates(reserve, asset);
+        require(_isHealthy(msg.sender), "6");
+        emit Withdraw(asset, msg.sender, to, amountToWithdraw);
+        return amountToWithdraw;
+    }
+
+    function borrow(
+        address asset,
+        uint256 amount,
+        uint256 interestRateMode,
+        uint16 referralCode,
+        address onBehalfOf
+    ) external {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(amount != 0, "1");
+        require(
+            (reserve.configuration.data >> 58) & 1 == 1 &&
+                reserve.variableDebtTokenAddress != address(0),
+            "7"
+        );
+        require(interestRateMode == VARIABLE, "8");
+        require(onBehalfOf == msg.sender, "59");
+        _updateState(reserve, asset);
+        MockVariableDebtToken(reserve.variableDebtTokenAddress).mint(
+            msg.sender,
+            onBehalfOf,
+            amount,
+            reserve.variableBorrowIndex
+        );
+        require(_coversDebt(onBehalfOf), "11");
+        MockAToken(reserve.aTokenAddress).transferUnderlyingTo(
+            onBehalfOf,
+            amount
+        );
+        _updateInterestRates(reserve, asset);
+        emit Borrow(
+            asset,
+            msg.sender,
+            onBehalfOf,
+            amount,
+            interestRateMode,
+            reserve.currentVariableBorrowRate,
+            referralCode
+        );
+    }
+
+    function repay(
+        address asset,
+        uint256 amount,
+        uint256 rateMode,
+        address onBehalfOf
+    ) external returns (uint256) {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(amount != 0, "1");
+        require(rateMode == VARIABLE, "8");
+        uint256 variableDebt =
+            MockVariableDebtToken(reserve.variableDebtTokenAddress).balanceOf(
+                onBehalfOf
+            );
+        require(variableDebt != 0, "16");
+        require(amount != uint256(-1) || msg.sender == onBehalfOf, "17");
+        uint256 paybackAmount = Math.min(amount, variableDebt);
+        _updateState(reserve, asset);
+        MockVariableDebtToken(reserve.variableDebtTokenAddress).burn(
+            onBehalfOf,
+            paybackAmount,
+            reserve.variableBorrowIndex
+        );
+        require(
+            IERC20(asset).transferFrom(
+                msg.sender,
+                reserve.aTokenAddress,
+                paybackAmount
+            )
+        );
+        _updateInterestRates(reserve, asset);
+        emit Repay(asset, onBehalfOf, msg.sender, paybackAmount);
+        return paybackAmount;
+    }
+
+    // Every deposit counts as collateral, like the first deposit on Aave
+    function setUserUseReserveAsCollateral(address asset, bool useAsCollateral)
+        external
+    {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(
+            MockAToken(reserve.aTokenAddress).balanceOf(msg.sender) > 0,
+            "19"
+        );
+        require(useAsCollateral, "NOT_SUPPORTED");
+        emit ReserveUsedAsCollateralEnabled(asset, msg.sender);
+    }
+
+    function finalizeTransfer(
+        address asset,
+        address from,
+        address,
+        uint256,
+        uint256,
+        uint256
+    ) external view {
+        require(msg.sender == reserves[asset].aTokenAddress, "23");
+        require(_isHealthy(from), "6");
+    }
+
+    function getUserAccountData(address user)
+        public
+        view
+        returns (
+            uint256 totalCollateralETH,
+            uint256 totalDebtETH,
+            uint256 availableBorrowsETH,
+            uint256 currentLiquidationThreshold,
+            uint256 ltv,
+            uint256 healthFactor
+        )
+    {
+        AccountData memory data;
+        for (uint256 i = 0; i < reservesList.length; i++) {
+            _addReserve(data, reservesList[i], user);
+        }
+        totalCollateralETH = data.collateral;
+        totalDebtETH = data.debt;
+        if (totalCollateralETH > 0) {
+            ltv = data.ltv.div(totalCollateralETH);
+            currentLiquidationThreshold = data.threshold.div(totalCollateralETH);
+        }
+        uint256 borrowable = totalCollateralETH.percentMul(ltv);
+        availableBorrowsETH = borrowable > totalDebtETH
+            ? borrowable - totalDebtETH
+            : 0;
+        healthFactor = totalDebtETH == 0
+            ? uint256(-1)
+            : totalCollateralETH.percentMul(currentLiquidationThreshold).wadDiv(
+                totalDebtETH
+            );
+    }
+
+    // Values in ETH, ltv and threshold weighted by collateral
+    function _addReserve(
+        AccountData memory data,
+        address asset,
+        address user
+    ) internal view {
+        DataTypes.ReserveData storage reserve = reserves[asset];
+        uint256 price = IPriceOracle(priceOracle).getAssetPrice(asset);
+        uint256 collateral =
+            MockAToken(reserve.aTokenAddress).balanceOf(user).mul(price).div(
+                1e18
+            );
+        data.collateral = data.collateral.add(collateral);
+        data.ltv = data.ltv.add(
+            collateral.mul(reserve.configuration.data & 0xFFFF)
+        );
+        data.threshold = data.threshold.add(
+            collateral.mul((reserve.configuration.data >> 16) & 0xFFFF)
+        );
+        if (reserve.variableDebtTokenAddress != address(0)) {
+            data.debt = data.debt.add(
+                MockVariableDebtToken(reserve.variableDebtTokenAddress)
+                    .balanceOf(user)
+                    .mul(price)
+                    .div(1e18)
+            );
+        }
+    }
+
+    function _coversDebt(address user) internal view returns (bool) {
+        (uint256 collateral, uint256 debt, , , uint256 ltv, ) =
+            getUserAccountData(user);
+        return debt <= collateral.percentMul(ltv);
+    }
+
+    function _isHealthy(address user) internal view returns (bool) {
+        (, , , , , uint256 healthFactor) = getUserAccountData(user);
+        return healthFactor >= HEALTH_FACTOR_LIQUIDATION_THRESHOLD;
+    }
+
+    function _activeReserve(address asset)
+        internal
+        view
+        returns (DataTypes.ReserveData storage reserve)
+    {
+        reserve = reserves[asset];
+        require((reserve.configuration.data >> 56) & 1 == 1, "2");
+    }
+
+    function _updateState(DataTypes.ReserveData storage reserve, address asset)
+        internal
+    {
+        reserve.variableBorrowIndex = uint128(
+            getReserveNormalizedVariableDebt(asset)
+        );
+        reserve.lastUpdateTimestamp = uint40(block.timestamp);
+    }
+
+    function _updateInterestRates(
+        DataTypes.ReserveData storage reserve,
+        address asset
+    ) internal {
+        uint256 totalVariableDebt;
+        if (reserve.variableDebtTokenAddress != address(0)) {
+            totalVariableDebt = MockVariableDebtToken(
+                reserve
+                    .variableDebtTokenAddress
+            )
+                .totalSupply();
+        }
+        uint256 utilizationRate =
+            totalVariableDebt == 0
+                ? 0
+                : totalVariableDebt.rayDiv(
+                    IERC20(asset).balanceOf(reserve.aTokenAddress).add(
+                        totalVariableDebt
+                    )
+                );
+        (uint256 liquidityRate, , uint256 variableBorrowRate) =
+            IReserveInterestRateStrategy(reserve.interestRateStrategyAddress)
+                .calculateInterestRates(
+                asset,
+                utilizationRate,
+                0,
+                totalVariableDebt,
+                0,
+                (reserve.configuration.data >> 64) & 0xFFFF
+            );
+        reserve.currentLiquidityRate = uint128(liquidityRate);
+        reserve.currentVariableBorrowRate = uint128(variableBorrowRate);
+    }
+
+    // Aave's MathUtils.calculateCompoundedInterest: binomial approximation
+    // of the per-second compounding since the last update
+    function _compoundedInterest(uint256 rate, uint40 lastUpdateTimestamp)
+        internal
+        view
+        returns (uint256)
+    {
+        uint256 exp = block.timestamp.sub(uint256(lastUpdateTimestamp));
+        if (exp == 0) {
+            return RAY;
+        }
+        uint256 expMinusOne = exp - 1;
+        uint256 expMinusTwo = exp > 2 ? exp - 2 : 0;
+        uint256 ratePerSecond = rate / SECONDS_PER_YEAR;
+        uint256 basePowerTwo = ratePerSecond.rayMul(ratePerSecond);
+        uint256 basePowerThree = basePowerTwo.rayMul(ratePerSecond);
+        uint256 secondTerm = exp.mul(expMinusOne).mul(basePowerTwo) / 2;
+        uint256 thirdTerm =
+            exp.mul(expMinusOne).mul(expMinusTwo).mul(basePowerThree) / 6;
+        return RAY.add(ratePerSecond.mul(exp)).add(secondTerm).add(thirdTerm);
+    }
+}
+
+contract MockProtocolDataProvider {
+    MockLendingPool public pool;
+
+    function initialize(address _pool) external {
+        require(address(pool) == address(0), "already initialized");
+        pool = MockLendingPool(_pool);
+    }
+
+    function getReserveConfigurationData(address asset)
+        external
+        view
+        returns (
+            uint256 decimals,
+            uint256 ltv,
+            uint256 liquidationThreshold,
+            uint256 liquidationBonus,
+            uint256 reserveFactor,
+            bool usageAsCollateralEnabled,
+            bool borrowingEnabled,
+            bool stableBorrowRateEnabled,
+            bool isActive,
+            bool isFrozen
+        )
+    {
+        uint256 data = pool.getConfiguration(asset).data;
+        ltv = data & 0xFFFF;
+        liquidationThreshold = (data >> 16) & 0xFFFF;
+        liquidationBonus = (data >> 32) & 0xFFFF;
+        decimals = (data >> 48) & 0xFF;
+        isActive = (data >> 56) & 1 == 1;
+        isFrozen = (data >> 57) & 1 == 1;
+        borrowingEnabled = (data >> 58) & 1 == 1;
+        stableBorrowRateEnabled = (data >> 59) & 1 == 1;
+        reserveFactor = (data >> 64) & 0xFFFF;
+        usageAsCollateralEnabled = liquidationThreshold != 0;
+    }
+
+    function getReserveTokensAddresses(address asset)
+        external
+        view
+        returns (
+            address aTokenAddress,
+            address stableDebtTokenAddress,
+            address variableDebtTokenAddress
+        )
+    {
+        DataTypes.ReserveData memory reserve = pool.getReserveData(asset);
+        return (
+            reserve.aTokenAddress,
+            reserve.stableDebtTokenAddress,
+            reserve.variableDebtTokenAddress
+        );
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        returns (
+            uint256 availableLiquidity,
+            uint256 totalStableDebt,
+            uint256 totalVariableDebt,
+            uint256 liquidityRate,
+            uint256 variableBorrowRate,
+            uint256 stableBorrowRate,
+            uint256 averageStableBorrowRate,
+            uint256 liquidityIndex,
+            uint256 variableBorrowIndex,
+            uint40 lastUpdateTimestamp
+        )
+    {
+        DataTypes.ReserveData memory reserve = pool.getReserveData(asset);
+        availableLiquidity = IERC20(asset).balanceOf(reserve.aTokenAddress);
+        if (reserve.variableDebtTokenAddress != address(0)) {
+            totalVariableDebt = IERC20(reserve.variableDebtTokenAddress)
+                .totalSupply();
+        }
+        liquidityRate = reserve.currentLiquidityRate;
+        variableBorrowRate = reserve.currentVariableBorrowRate;
+        liquidityIndex = reserve.liquidityIndex;
+        variableBorrowIndex = pool.getReserveNormalizedVariableDebt(asset);
+        lastUpdateTimestamp = reserve.lastUpdateTimestamp;
+    }
+}
+
+contract MockPriceOracle {
+    event AssetPriceUpdated(address asset, uint256 price, uint256 timestamp);
+
+    // Price of one unit of the asset in ETH (wei)
+    mapping(address => uint256) private prices;
+
+    function setAssetPrice(address _asset, uint256 _price) external {
+        prices[_asset] = _price;
+        emit AssetPriceUpdated(_asset, _price, block.timestamp);
+    }
+
+    function getAssetPrice(address _asset) public view returns (uint256) {
+        return prices[_asset];
+    }
+
+    function getAssetsPrices(address[] calldata _assets)
+        external
+        view
+        returns (uint256[] memory)
+    {
+        uint256[] memory assetsPrices = new uint256[](_assets.length);
+        for (uint256 i = 0; i < _assets.length; i++) {
+            assetsPrices[i] = getAssetPrice(_assets[i]);
+        }
+        return assetsPrices;
+    }
+
+    function getSourceOfAsset(address) external pure returns (address) {
+        return address(0);
+    }
+
+    function getFallbackOracle() external pure returns (address) {
+        return address(0);
+    }
+}
@@ -0,0 +1,69 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+interface IFlashLoanRecipient {
+    function receiveFlashLoan(
+        IERC20[] memory tokens,
+        uint256[] memory amounts,
+        uint256[] memory feeAmounts,
+        bytes memory userData
+    ) external;
+}
+
+// Balancer vault stand-in, placed at the mainnet vault address. Only the
+// flashloans: the tokens held by the vault are lent and the fee charged is
+// flashLoanFeePercentage (1e18 = 100%), with Balancer's error codes.
+contract MockBalancerVault {
+    using SafeMath for uint256;
+
+    uint256 internal constant ONE = 1e18;
+
+    event FlashLoan(
+        IFlashLoanRecipient indexed recipient,
+        IERC20 indexed token,
+        uint256 amount,
+        uint256 feeAmount
+    );
+
+    uint256 public flashLoanFeePercentage;
+
+    function setFlashLoanFeePercentage(uint256 _flashLoanFeePercentage)
+        external
+    {
+        flashLoanFeePercentage = _flashLoanFeePercentage;
+    }
+
+    function flashLoan(
+        IFlashLoanRecipient recipient,
+        IERC20[] memory tokens,
+        uint256[] memory amounts,
+        bytes memory userData
+    ) external {
+        require(tokens.length == amounts.length, "BAL#103");
+        uint256[] memory feeAmounts = new uint256[](tokens.length);
+        uint256[] memory preLoanBalances = new uint256[](tokens.length);
+
+        for (uint256 i = 0; i < tokens.length; ++i) {
+            preLoanBalances[i] = tokens[i].balanceOf(address(this));
+            require(preLoanBalances[i] >= amounts[i], "BAL#528");
+            // Rounded up like Balancer's FixedPoint.mulUp
+            uint256 product = amounts[i].mul(flashLoanFeePercentage);
+            feeAmounts[i] = product == 0 ? 0 : (product - 1) / ONE + 1;
+            require(tokens[i].transfer(address(recipient), amounts[i]));
+        }
+
+        recipient.receiveFlashLoan(tokens, amounts, feeAmounts, userData);
+
+        for (uint256 i = 0; i < tokens.length; ++i) {
+            uint256 postLoanBalance = tokens[i].balanceOf(address(this));
+            require(postLoanBalance >= preLoanBalances[i], "BAL#529");
+            uint256 receivedFeeAmount = postLoanBalance - preLoanBalances[i];
+            require(receivedFeeAmount >= feeAmounts[i], "BAL#602");
+            emit FlashLoan(recipient, tokens[i], amounts[i], receivedFeeAmount);
+        }
+    }
+}
@@ -0,0 +1,29 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Yearn base fee oracle stand-in, placed at the mainnet address. 0.6.12 has
+// no block.basefee, so the current base fee is set by the tests.
+contract MockBaseFee {
+    uint256 public maxAcceptableBaseFee;
+    uint256 public baseFee;
+
+    function initialize(uint256 _maxAcceptableBaseFee, uint256 _baseFee)
+        external
+    {
+        require(maxAcceptableBaseFee == 0, "already initialized");
+        maxAcceptableBaseFee = _maxAcceptableBaseFee;
+        baseFee = _baseFee;
+    }
+
+    function setMaxAcceptableBaseFee(uint256 _maxAcceptableBaseFee) external {
+        maxAcceptableBaseFee = _maxAcceptableBaseFee;
+    }
+
+    function setBaseFee(uint256 _baseFee) external {
+        baseFee = _baseFee;
+    }
+
+    function isCurrentBaseFeeAcceptable() external view returns (bool) {
+        return baseFee <= maxAcceptableBaseFee;
+    }
+}
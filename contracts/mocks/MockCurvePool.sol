@@ -0,0 +1,198 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+// Curve ETH/stETH StableSwap stand-in, placed at the mainnet pool address.
+// get_D, get_y, get_dy and exchange are ported from the pool's Vyper source
+// (coin 0 is ETH, coin 1 stETH), so quotes match scripts/stableswap.py.
+// Liquidity is added without minting LP tokens.
+contract MockCurvePool {
+    using SafeMath for uint256;
+
+    uint256 internal constant N_COINS = 2;
+    uint256 internal constant FEE_DENOMINATOR = 1e10;
+    uint256 internal constant A_PRECISION = 100;
+
+    event TokenExchange(
+        address indexed buyer,
+        int128 sold_id,
+        uint256 tokens_sold,
+        int128 bought_id,
+        uint256 tokens_bought
+    );
+
+    // Placed at the mainnet address, so no constructor state
+    IERC20 public steth;
+    uint256 public A_precise;
+    uint256 public fee;
+    uint256 public admin_fee;
+    uint256[2] public admin_balances;
+
+    receive() external payable {}
+
+    function initialize(
+        address _steth,
+        uint256 _A,
+        uint256 _fee,
+        uint256 _admin_fee
+    ) external {
+        require(address(steth) == address(0), "already initialized");
+        steth = IERC20(_steth);
+        A_precise = _A.mul(A_PRECISION);
+        fee = _fee;
+        admin_fee = _admin_fee;
+    }
+
+    function A() external view returns (uint256) {
+        return A_precise / A_PRECISION;
+    }
+
+    function coins(uint256 i) external view returns (address) {
+        return i == 0 ? 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE : address(steth);
+    }
+
+    function balances(uint256 i) external view returns (uint256) {
+        return _balances(0)[i];
+    }
+
+    function balances(int128 i) external view returns (uint256) {
+        return _balances(0)[uint256(i)];
+    }
+
+    function add_liquidity(uint256[2] calldata amounts, uint256)
+        external
+        payable
+        returns (uint256)
+    {
+        require(msg.value == amounts[0]);
+        require(steth.transferFrom(msg.sender, address(this), amounts[1]));
+        return amounts[0].add(amounts[1]);
+    }
+
+    function get_dy(
+        int128 i,
+        int128 j,
+        uint256 dx
+    ) external view returns (uint256) {
+        uint256[2] memory xp = _balances(0);
+        uint256 y = _get_y(uint256(i), uint256(j), xp[uint256(i)].add(dx), xp);
+        uint256 dy = xp[uint256(j)].sub(y).sub(1);
+        return dy.sub(dy.mul(fee) / FEE_DENOMINATOR);
+    }
+
+    function exchange(
+        int128 i,
+        int128 j,
+        uint256 dx,
+        uint256 min_dy
+    ) external payable returns (uint256) {
+        uint256[2] memory old_balances = _balances(msg.value);
+        uint256 y =
+            _get_y(
+                uint256(i),
+                uint256(j),
+                old_balances[uint256(i)].add(dx),
+                old_balances
+            );
+        uint256 dy = old_balances[uint256(j)].sub(y).sub(1);
+        uint256 dy_fee = dy.mul(fee) / FEE_DENOMINATOR;
+        dy = dy.sub(dy_fee);
+        require(dy >= min_dy, "Exchange resulted in fewer coins than expected");
+
+        uint256 dy_admin_fee = dy_fee.mul(admin_fee) / FEE_DENOMINATOR;
+        admin_balances[uint256(j)] = admin_balances[uint256(j)].add(
+            dy_admin_fee
+        );
+
+        if (i == 0) {
+            require(msg.value == dx);
+        } else {
+            require(msg.value == 0);
+            require(steth.transferFrom(msg.sender, address(this), dx));
+        }
+        if (j == 0) {
+            (bool success, ) = msg.sender.call{value: dy}("");
+            require(success);
+        } else {
+            require(steth.transfer(msg.sender, dy));
+        }
+        emit TokenExchange(msg.sender, i, dx, j, dy);
+        return dy;
+    }
+
+    function _balances(uint256 _value)
+        internal
+        view
+        returns (uint256[2] memory)
+    {
+        return [
+            address(this).balance.sub(admin_balances[0]).sub(_value),
+            steth.balanceOf(address(this)).sub(admin_balances[1])
+        ];
+    }
+
+    function _get_D(uint256[2] memory xp, uint256 amp)
+        internal
+        pure
+        returns (uint256)
+    {
+        uint256 S = xp[0].add(xp[1]);
+        if (S == 0) {
+            return 0;
+        }
+        uint256 Dprev;
+        uint256 D = S;
+        uint256 Ann = amp.mul(N_COINS);
+        for (uint256 _i = 0; _i < 255; _i++) {
+            uint256 D_P = D;
+            for (uint256 k = 0; k < N_COINS; k++) {
+                // +1 is to prevent /0
+                D_P = D_P.mul(D).div(xp[k].mul(N_COINS).add(1));
+            }
+            Dprev = D;
+            D = Ann
+                .mul(S)
+                .div(A_PRECISION)
+                .add(D_P.mul(N_COINS))
+                .mul(D)
+                .div(
+                Ann.sub(A_PRECISION).mul(D).div(A_PRECISION).add(
+                    (N_COINS + 1).mul(D_P)
+                )
+            );
+            if (D > Dprev ? D - Dprev <= 1 : Dprev - D <= 1) {
+                return D;
+            }
+        }
+        revert();
+    }
+
+    function _get_y(
+        uint256 i,
+        uint256 j,
+        uint256 x,
+        uint256[2] memory xp
+    ) internal view returns (uint256) {
+        require(i != j && i < N_COINS && j < N_COINS);
+        uint256 amp = A_precise;
+        uint256 D = _get_D(xp, amp);
+        uint256 Ann = amp.mul(N_COINS);
+
+        // With two coins the only other coin is `i`, at the new balance `x`
+        uint256 c = D.mul(D).div(x.mul(N_COINS));
+        c = c.mul(D).mul(A_PRECISION).div(Ann.mul(N_COINS));
+        uint256 b = x.add(D.mul(A_PRECISION).div(Ann));
+        uint256 y_prev;
+        uint256 y = D;
+        for (uint256 _i = 0; _i < 255; _i++) {
+            y_prev = y;
+            y = y.mul(y).add(c).div(y.mul(2).add(b).sub(D));
+            if (y > y_prev ? y - y_prev <= 1 : y_prev - y <= 1) {
+                return y;
+            }
+        }
+        revert();
+    }
+}
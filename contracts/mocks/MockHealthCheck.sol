@@ -0,0 +1,46 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// Yearn common health check stand-in, placed at the mainnet address set by
+// Strategy: a report passes if profit and loss stay within their limits
+// (in bps of the strategy's total debt).
+contract MockHealthCheck {
+    using SafeMath for uint256;
+
+    uint256 internal constant MAX_BPS = 10_000;
+
+    uint256 public profitLimitRatio;
+    uint256 public lossLimitRatio;
+
+    function initialize(uint256 _profitLimitRatio, uint256 _lossLimitRatio)
+        external
+    {
+        require(profitLimitRatio == 0, "already initialized");
+        profitLimitRatio = _profitLimitRatio;
+        lossLimitRatio = _lossLimitRatio;
+    }
+
+    function setProfitLimitRatio(uint256 _profitLimitRatio) external {
+        require(_profitLimitRatio < MAX_BPS);
+        profitLimitRatio = _profitLimitRatio;
+    }
+
+    function setlossLimitRatio(uint256 _lossLimitRatio) external {
+        require(_lossLimitRatio < MAX_BPS);
+        lossLimitRatio = _lossLimitRatio;
+    }
+
+    function check(
+        uint256 profit,
+        uint256 loss,
+        uint256,
+        uint256,
+        uint256 totalDebt
+    ) external view returns (bool) {
+        return
+            profit <= totalDebt.mul(profitLimitRatio).div(MAX_BPS) &&
+            loss <= totalDebt.mul(lossLimitRatio).div(MAX_BPS);
+    }
+}
@@ -0,0 +1,162 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// Lido stETH stand-in, placed at the mainnet stETH address. Balances are
+// shares of the pooled ether like the real token, so setTotalPooledEther
+// rebases every holder the way an oracle report does (rewards or slashing).
+contract MockStETH {
+    using SafeMath for uint256;
+
+    string public constant name = "Liquid staked Ether 2.0";
+    string public constant symbol = "stETH";
+    uint8 public constant decimals = 18;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(address indexed owner, address indexed spender, uint256 value);
+    event Submitted(address indexed sender, uint256 amount, address referral);
+
+    mapping(address => uint256) private shares;
+    mapping(address => mapping(address => uint256)) private allowances;
+    uint256 private totalShares;
+    uint256 private totalPooledEther;
+    bool private stakingPaused;
+
+    receive() external payable {
+        _submit(address(0));
+    }
+
+    function submit(address _referral) external payable returns (uint256) {
+        return _submit(_referral);
+    }
+
+    function isStakingPaused() external view returns (bool) {
+        return stakingPaused;
+    }
+
+    function pauseStaking() external {
+        stakingPaused = true;
+    }
+
+    function resumeStaking() external {
+        stakingPaused = false;
+    }
+
+    // Oracle report: the ether behind every share changes, balances follow
+    function setTotalPooledEther(uint256 _totalPooledEther) external {
+        require(totalShares > 0, "NO_SHARES");
+        totalPooledEther = _totalPooledEther;
+    }
+
+    function getTotalPooledEther() external view returns (uint256) {
+        return totalPooledEther;
+    }
+
+    function getTotalShares() external view returns (uint256) {
+        return totalShares;
+    }
+
+    function sharesOf(address _account) external view returns (uint256) {
+        return shares[_account];
+    }
+
+    function getSharesByPooledEth(uint256 _ethAmount)
+        public
+        view
+        returns (uint256)
+    {
+        if (totalPooledEther == 0) {
+            return 0;
+        }
+        return _ethAmount.mul(totalShares).div(totalPooledEther);
+    }
+
+    function getPooledEthByShares(uint256 _sharesAmount)
+        public
+        view
+        returns (uint256)
+    {
+        if (totalShares == 0) {
+            return 0;
+        }
+        return _sharesAmount.mul(totalPooledEther).div(totalShares);
+    }
+
+    function totalSupply() external view returns (uint256) {
+        return totalPooledEther;
+    }
+
+    function balanceOf(address _account) external view returns (uint256) {
+        return getPooledEthByShares(shares[_account]);
+    }
+
+    function allowance(address _owner, address _spender)
+        external
+        view
+        returns (uint256)
+    {
+        return allowances[_owner][_spender];
+    }
+
+    function approve(address _spender, uint256 _amount) external returns (bool) {
+        allowances[msg.sender][_spender] = _amount;
+        emit Approval(msg.sender, _spender, _amount);
+        return true;
+    }
+
+    function transfer(address _recipient, uint256 _amount)
+        external
+        returns (bool)
+    {
+        _transfer(msg.sender, _recipient, _amount);
+        return true;
+    }
+
+    function transferFrom(
+        address _sender,
+        address _recipient,
+        uint256 _amount
+    ) external returns (bool) {
+        allowances[_sender][msg.sender] = allowances[_sender][msg.sender].sub(
+            _amount,
+            "TRANSFER_AMOUNT_EXCEEDS_ALLOWANCE"
+        );
+        _transfer(_sender, _recipient, _amount);
+        return true;
+    }
+
+    function _submit(address _referral) internal returns (uint256) {
+        require(!stakingPaused, "STAKING_PAUSED");
+        require(msg.value != 0, "ZERO_DEPOSIT");
+
+        uint256 sharesAmount = getSharesByPooledEth(msg.value);
+        if (sharesAmount == 0) {
+            // First deposit (or a pool slashed to zero): one share per wei
+            sharesAmount = msg.value;
+        }
+        shares[msg.sender] = shares[msg.sender].add(sharesAmount);
+        totalShares = totalShares.add(sharesAmount);
+        totalPooledEther = totalPooledEther.add(msg.value);
+
+        emit Submitted(msg.sender, msg.value, _referral);
+        emit Transfer(address(0), msg.sender, msg.value);
+        return sharesAmount;
+    }
+
+    function _transfer(
+        address _sender,
+        address _recipient,
+        uint256 _amount
+    ) internal {
+        require(_sender != address(0), "TRANSFER_FROM_THE_ZERO_ADDRESS");
+        require(_recipient != address(0), "TRANSFER_TO_THE_ZERO_ADDRESS");
+        uint256 sharesAmount = getSharesByPooledEth(_amount);
+        shares[_sender] = shares[_sender].sub(
+            sharesAmount,
+            "TRANSFER_AMOUNT_EXCEEDS_BALANCE"
+        );
+        shares[_recipient] = shares[_recipient].add(sharesAmount);
+        emit Transfer(_sender, _recipient, _amount);
+    }
+}
@@ -0,0 +1,135 @@
+from brownie import interface, web3
+
+import click
+import numpy as np
+
+from scripts.addresses import LENDING_POOL, PROTOCOL_DATA_PROVIDER, WETH
+from scripts.monitor import strategy_metadata
+from scripts.strategy_math import RAY, WAD
+
+# Replica of the AAVE v2 DefaultReserveInterestRateStrategy for the WETH
+# reserve. Seeded from one snapshot of the reserve, it answers what-if
+# queries for whole arrays of extra borrows with the ray math of the
+# protocol: the variable borrow rate after borrowing X more WETH, and how
+# much can be borrowed before adjustPosition stops winding because the rate
+# is above maxBorrowRate.
+
+HALF_RAY = RAY // 2
+
+# Index of interestRateStrategyAddress in DataTypes.ReserveData
+INTEREST_RATE_STRATEGY = 10
+
+
+def main():
+    s = strategy_metadata(click.prompt("Strategy"))["strategy"]
+    model = ReserveRateModel.from_chain()
+    max_borrow_rate = s.maxBorrowRate()
+    current = model.variable_borrow_rate(0)[0]
+    print(f"Utilization: {model.utilization(0)[0] / RAY:.2%}")
+    print(f"Variable borrow rate: {current / RAY:.4%}")
+    print(f"maxBorrowRate: {max_borrow_rate / RAY:.4%}")
+    if current > max_borrow_rate:
+        print("adjustPosition does not wind at the current rate")
+        return
+    headroom = model.max_borrow(max_borrow_rate)
+    deposit = model.max_wind(max_borrow_rate, s.collateralizationRatio())
+    print(f"WETH that can be borrowed before crossing it: {headroom / 1e18:.4f}")
+    print(f"Largest deposit wound before crossing it: {deposit / 1e18:.4f}")
+
+
+def _uint(value):
+    return np.atleast_1d(np.asarray(value, dtype=object))
+
+
+def ray_mul(a, b):
+    return (a * b + HALF_RAY) // RAY
+
+
+def ray_div(a, b):
+    return (a * RAY + b // 2) // b
+
+
+class ReserveRateModel:
+    def __init__(
+        self,
+        available_liquidity,
+        total_stable_debt,
+        total_variable_debt,
+        optimal_utilization,
+        base_variable_borrow_rate,
+        variable_rate_slope1,
+        variable_rate_slope2,
+    ):
+        self.available_liquidity = int(available_liquidity)
+        self.total_stable_debt = int(total_stable_debt)
+        self.total_variable_debt = int(total_variable_debt)
+        self.optimal_utilization = int(optimal_utilization)
+        self.excess_utilization = RAY - self.optimal_utilization
+        self.base = int(base_variable_borrow_rate)
+        self.slope1 = int(variable_rate_slope1)
+        self.slope2 = int(variable_rate_slope2)
+
+    @classmethod
+    def from_chain(cls, asset=WETH, block_identifier=None):
+        if block_identifier is None:
+            block_identifier = web3.eth.block_number
+        kwargs = {"block_identifier": block_identifier}
+        reserve = interface.ILendingPool(LENDING_POOL).getReserveData.call(
+            asset, **kwargs
+        )
+        strategy = interface.IReserveInterestRateStrategy(
+            reserve[INTEREST_RATE_STRATEGY]
+        )
+        data = interface.IProtocolDataProvider(PROTOCOL_DATA_PROVIDER)
+        available, stable, variable = data.getReserveData.call(asset, **kwargs)[:3]
+        return cls(
+            available,
+            stable,
+            variable,
+            strategy.OPTIMAL_UTILIZATION_RATE.call(**kwargs),
+            strategy.baseVariableBorrowRate.call(**kwargs),
+            strategy.variableRateSlope1.call(**kwargs),
+            strategy.variableRateSlope2.call(**kwargs),
+        )
+
+    def utilization(self, extra_borrow):
+        # Utilization in ray after borrowing `extra_borrow` more of the asset
+        extra = _uint(extra_borrow)
+        total_debt = self.total_stable_debt + self.total_variable_debt + extra
+        available = self.available_liquidity - extra
+        return np.where(
+            total_debt == 0, 0, ray_div(total_debt, available + total_debt)
+        ).astype(object)
+
+    def variable_borrow_rate(self, extra_borrow):
+        # currentVariableBorrowRate in ray after borrowing `extra_borrow`
+        u = self.utilization(extra_borrow)
+        excess = ray_div(
+            np.where(u > self.optimal_utilization, u - self.optimal_utilization, 0),
+            self.excess_utilization,
+        )
+        above = self.base + self.slope1 + ray_mul(self.slope2, excess)
+        below = self.base + ray_div(ray_mul(u, self.slope1), self.optimal_utilization)
+        return np.where(u > self.optimal_utilization, above, below).astype(object)
+
+    def max_borrow(self, max_rate):
+        # Largest extra borrow that keeps the variable rate <= max_rate,
+        # bounded by the available liquidity
+        def within(amount):
+            return self.variable_borrow_rate(amount)[0] <= max_rate
+
+        if not within(0):
+            return 0
+        low, high = 0, self.available_liquidity
+        if within(high):
+            return high
+        while high - low > 1:
+            mid = (low + high) // 2
+            low, high = (mid, high) if within(mid) else (low, mid)
+        return low
+
+    def max_wind(self, max_rate, collateralization_ratio):
+        # Largest want amount MarketLib.wind can lever at the given target
+        # ratio with its flashloan (borrowed on AAVE) staying within max_rate
+        borrow = self.max_borrow(max_rate)
+        return borrow * (int(collateralization_ratio) * 10 ** 9 - RAY) // RAY
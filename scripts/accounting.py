@@ -0,0 +1,145 @@
+import click
+
+from scripts.addresses import BALANCER, WETH
+from scripts.leverage import unwind as unwind_position
+from scripts.stableswap import StableSwap
+from scripts.strategy_math import WAD
+
+# Exact model of the harvest accounting of Strategy.sol: estimatedTotalAssets,
+# liquidatePosition and prepareReturn on plain Python integers, with the
+# rounding and SafeMath reverts of the contract. A strategy state is a dict
+# of balances (want, yield_bearing, collateral, debt), price
+# (getWantPerYieldBearing) and the parameters read by liquidatePosition; the
+# MarketLib.unwind step is pluggable so edge cases (lossy swaps, partial
+# unwinds) can be injected. The differential mode predicts the Harvested
+# event of the next harvest of a deployed strategy from its current state.
+# Only the chain reads need the brownie project, they import it when called.
+
+
+class Revert(Exception):
+    pass
+
+
+def main():
+    from scripts.monitor import strategy_metadata
+
+    s = strategy_metadata(click.prompt("Strategy"))["strategy"]
+    profit, loss, debt_payment, _ = predict_harvest(s)
+    print(f"Profit: {profit / 1e18}")
+    print(f"Loss: {loss / 1e18}")
+    print(f"Debt payment: {debt_payment / 1e18}")
+
+
+def _sub(a, b):
+    if b > a:
+        raise Revert("SafeMath: subtraction overflow")
+    return a - b
+
+
+def estimated_total_assets(state):
+    return _sub(
+        state["want"]
+        + (state["yield_bearing"] + state["collateral"]) * state["price"] // WAD,
+        state["debt"],
+    )
+
+
+def oracle_unwind(state, want_amount):
+    # MarketLib.unwind through scripts/leverage.py, stETH sold at the oracle
+    # price unless the state carries a `swap` (e.g. StableSwap.exchange)
+    result = unwind_position(
+        state["collateral"],
+        state["debt"],
+        state["want"],
+        want_amount,
+        state["price"],
+        state["target"],
+        state.get("flashloan_maximum", 2 ** 256 - 1),
+        state.get("swap"),
+        liquidation_ratio=state.get("liquidation_ratio"),
+    )
+    if result["reverted"][0]:
+        raise Revert("unwind")
+    return {**state, **{k: int(result[k][0]) for k in ("collateral", "debt", "want")}}
+
+
+def liquidate_position(state, want_amount_needed, unwind=oracle_unwind):
+    # Returns (liquidatedAmount, loss, state)
+    want_amount_needed = min(want_amount_needed, state["max_single_trade"])
+    if state["want"] >= want_amount_needed:
+        return want_amount_needed, 0, state
+    state = unwind(state, _sub(want_amount_needed, state["want"]))
+
+    if want_amount_needed > state["want"]:
+        liquidated, loss = state["want"], want_amount_needed - state["want"]
+    else:
+        liquidated, loss = want_amount_needed, 0
+    if state["debt"] > 0:
+        ratio = state["collateral"] * state["price"] // state["debt"]
+        if ratio <= _sub(state["target"], state["lower"]):
+            raise Revert("unsafe coll. ratio (liqPos)")
+    return liquidated, loss, state
+
+
+def prepare_return(debt_outstanding, total_debt, state, unwind=oracle_unwind):
+    # Returns (profit, loss, debtPayment, state after liquidatePosition)
+    profit = loss = debt_payment = 0
+    total_assets = estimated_total_assets(state)
+    if total_assets >= total_debt:
+        profit = total_assets - total_debt
+    else:
+        loss = total_debt - total_assets
+
+    to_liquidate = debt_outstanding + profit
+    if to_liquidate >= state["min_single_trade"]:
+        freed, liquidation_loss, state = liquidate_position(state, to_liquidate, unwind)
+        debt_payment = min(debt_outstanding, freed)
+        loss += liquidation_loss
+
+    if loss > profit:
+        loss, profit = loss - profit, 0
+    else:
+        profit, loss = profit - loss, 0
+
+    want = state["want"]
+    if want < profit:
+        profit = want
+    elif want < to_liquidate:
+        debt_payment = want - profit
+    else:
+        debt_payment = debt_outstanding
+    return profit, loss, debt_payment, state
+
+
+def state_from_chain(s, block_identifier=None):
+    from brownie import interface
+
+    kwargs = {"block_identifier": block_identifier}
+    return {
+        "want": s.balanceOfWant.call(**kwargs),
+        "yield_bearing": s.balanceOfYieldBearing.call(**kwargs),
+        "collateral": s.balanceOfCollateral.call(**kwargs),
+        "debt": s.balanceOfDebt.call(**kwargs),
+        "price": s.getWantPerYieldBearing.call(**kwargs),
+        "target": s.collateralizationRatio.call(**kwargs),
+        "lower": s.lowerRebalanceTolerance.call(**kwargs),
+        "liquidation_ratio": s.getLiquidationRatio.call(**kwargs),
+        "min_single_trade": s.minSingleTrade.call(**kwargs),
+        "max_single_trade": s.maxSingleTrade.call(**kwargs),
+        "flashloan_maximum": interface.ERC20(WETH).balanceOf.call(BALANCER, **kwargs),
+        "swap": StableSwap.from_chain(block_identifier=block_identifier).exchange(1, 0),
+    }
+
+
+def predict_harvest(s, block_identifier=None):
+    # prepareReturn of the next harvest of `s` as of `block_identifier`.
+    # Loose stETH is swapped in the same unwind and is not modelled: expect a
+    # few wei of difference once the strategy holds any.
+    from scripts.monitor import strategy_metadata
+
+    meta = strategy_metadata(s)
+    s, vault = meta["strategy"], meta["vault"]
+    kwargs = {"block_identifier": block_identifier}
+    debt_outstanding = vault.debtOutstanding["address"].call(s, **kwargs)
+    total_debt = vault.strategies.call(s, **kwargs)["totalDebt"]
+    return prepare_return(debt_outstanding, total_debt, state_from_chain(s, **kwargs))
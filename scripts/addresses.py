@@ -0,0 +1,13 @@
+# Mainnet addresses of the contracts Strategy and MarketLib hard-code, shared
+# by the scripts and the tests. scripts/mocks.py places its stand-ins at the
+# same addresses.
+
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+STETH = "0xae7ab96520DE3A18E5e111B5EaAb095312D7fE84"
+LENDING_POOL = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
+PROTOCOL_DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+PRICE_ORACLE = "0xA50ba011c48153De246E5192C8f9258A2ba79Ca9"
+CURVE = "0xDC24316b9AE028F1497c275EB9192a3Ea0f67022"
+BALANCER = "0xBA12222222228d8Ba445958a75a0704d566BF2C8"
+BASE_FEE_ORACLE = "0xb5e1CAcB567d98faaDB60a1fD4820720141f064F"
+HEALTH_CHECK = "0xDDCea799fF1699e98EDF118e0629A974Df7DF012"
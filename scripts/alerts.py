@@ -0,0 +1,197 @@
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_API = "https://api.telegram.org"
+
+# Telegram accepts at most 4096 characters per message
+MAX_MESSAGE_LENGTH = 4096
+
+# Markdown code block the monitor reports are wrapped in
+FENCE = "```"
+
+# Telegram limits: about 30 messages per second overall and 20 messages per
+# minute into the same group
+GLOBAL_RATE = 30
+CHAT_RATE = 20 / 60
+
+
+class TokenBucket:
+    # Allows `rate` acquisitions per second with bursts of up to `capacity`
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AlertDispatcher:
+    # Delivers alerts from a background thread so the monitor never waits on
+    # the chat API. Messages queued for the same chat while a delivery is in
+    # flight are coalesced into one message. Deliveries share one pooled
+    # HTTPS session, are rate limited globally and per chat, and are retried
+    # with exponential backoff (honouring Telegram's retry_after).
+
+    def __init__(
+        self,
+        bot_key,
+        base_url=TELEGRAM_API,
+        global_rate=GLOBAL_RATE,
+        chat_rate=CHAT_RATE,
+        max_retries=5,
+        backoff=1.0,
+        timeout=10,
+    ):
+        self.url = f"{base_url}/bot{bot_key}/sendMessage"
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_buckets = {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.failed = []
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, chat_id, text, parse_mode="MarkdownV2"):
+        self.queue.put((str(chat_id), text, parse_mode))
+
+    def flush(self):
+        # Block until every queued alert is delivered or given up on
+        self.queue.join()
+
+    def close(self):
+        self.flush()
+        self.session.close()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for (chat_id, parse_mode), texts in _group(batch).items():
+                    for text in _pack(texts):
+                        # An unexpected error fails this message only, the
+                        # worker keeps consuming the queue so flush() returns
+                        try:
+                            self._deliver(chat_id, text, parse_mode)
+                        except Exception:
+                            self.failed.append(
+                                {
+                                    "chat_id": chat_id,
+                                    "text": text,
+                                    "parse_mode": parse_mode,
+                                }
+                            )
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _deliver(self, chat_id, text, parse_mode):
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+        bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate))
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            self.global_bucket.acquire()
+            delay = self.backoff * 2 ** attempt
+            try:
+                r = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException:
+                time.sleep(delay)
+                continue
+            if r.status_code == 200:
+                return True
+            if r.status_code == 429:
+                try:
+                    delay = r.json()["parameters"]["retry_after"]
+                except (ValueError, KeyError, TypeError):
+                    pass
+            elif r.status_code < 500:
+                # The request itself is wrong, retrying will not help
+                break
+            time.sleep(delay)
+
+        self.failed.append(payload)
+        return False
+
+
+def _group(batch):
+    # Texts per (chat, parse mode), in submission order
+    groups = {}
+    for chat_id, text, parse_mode in batch:
+        groups.setdefault((chat_id, parse_mode), []).append(text)
+    return groups
+
+
+def _pack(texts):
+    # Join texts into as few messages as fit the Telegram length limit, texts
+    # above the limit are split first (Telegram rejects them outright)
+    messages = []
+    for text in texts:
+        for piece in _split(text):
+            if messages and len(messages[-1]) + 1 + len(piece) <= MAX_MESSAGE_LENGTH:
+                messages[-1] += "\n" + piece
+            else:
+                messages.append(piece)
+    return messages
+
+
+def _split(text, limit=MAX_MESSAGE_LENGTH):
+    # Pieces of at most `limit` characters, cut at line breaks where possible.
+    # A report wrapped in a ``` block is closed and reopened in every piece,
+    # so each message still parses as Markdown.
+    if len(text) <= limit:
+        return [text]
+    fenced = (
+        len(text) > 2 * len(FENCE) and text.startswith(FENCE) and text.endswith(FENCE)
+    )
+    if fenced:
+        text = text[len(FENCE) : -len(FENCE)].strip("\n")
+        limit -= 2 * len(FENCE) + 2
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    if fenced:
+        return ["\n".join([FENCE, piece.strip("\n"), FENCE]) for piece in pieces]
+    return pieces
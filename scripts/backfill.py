@@ -0,0 +1,95 @@
+from brownie import web3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import click
+import json
+
+from scripts.history import HealthStore
+from scripts.monitor import MULTICALL2, get_multicall, load_config, snapshot_strategy
+
+# Blocks per unit of work, also the checkpoint granularity
+CHUNK_SIZE = 500
+
+# Chunks fetched at the same time
+WORKERS = 8
+
+
+def main():
+    config = load_config()
+    strategy = click.prompt("Strategy")
+    from_block = click.prompt("From block", type=int)
+    to_block = click.prompt("To block", type=int, default=web3.eth.block_number)
+    step = click.prompt("Blocks between snapshots", type=int, default=1)
+
+    store = HealthStore(config.get("history", "monitor-history.sqlite"))
+    checkpoint = Path(f"backfill-{strategy}-{from_block}-{to_block}-{step}.json")
+    written = backfill(
+        strategy,
+        from_block,
+        to_block,
+        store,
+        get_multicall(config.get("multicall", MULTICALL2)),
+        step=step,
+        checkpoint=checkpoint,
+    )
+    store.close()
+    print(f"Stored {written} snapshots, checkpoint: {checkpoint}")
+
+
+def chunks(from_block, to_block, chunk_size=CHUNK_SIZE):
+    return [
+        (start, min(start + chunk_size - 1, to_block))
+        for start in range(from_block, to_block + 1, chunk_size)
+    ]
+
+
+def backfill(
+    strategy,
+    from_block,
+    to_block,
+    store,
+    multicall,
+    step=1,
+    chunk_size=CHUNK_SIZE,
+    workers=WORKERS,
+    checkpoint=None,
+):
+    # Snapshot `strategy` every `step` blocks of [from_block, to_block] into
+    # `store`. Chunks run concurrently; each finished chunk is recorded in
+    # the checkpoint file, so an interrupted backfill resumes where it
+    # stopped. Blocks before the strategy existed are skipped.
+    done = _load_checkpoint(checkpoint)
+    todo = [c for c in chunks(from_block, to_block, chunk_size) if list(c) not in done]
+
+    def fetch(chunk):
+        start, end = chunk
+        first = start + (step - (start - from_block) % step) % step
+        snapshots = [
+            snapshot_strategy(strategy, multicall, block_identifier=block)
+            for block in range(first, end + 1, step)
+        ]
+        return chunk, [s for s in snapshots if s["getCurrentCollRatio"] is not None]
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for future in as_completed([executor.submit(fetch, c) for c in todo]):
+            chunk, snapshots = future.result()
+            written += store.append_many(snapshots)
+            done.append(list(chunk))
+            _save_checkpoint(checkpoint, done)
+    return written
+
+
+def _load_checkpoint(path):
+    if path is None or not Path(path).exists():
+        return []
+    return json.loads(Path(path).read_text())["done"]
+
+
+def _save_checkpoint(path, done):
+    if path is None:
+        return
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps({"done": sorted(done)}))
+    tmp.replace(path)
@@ -0,0 +1,166 @@
+from brownie import Contract, chain, convert, network, web3
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+# On-disk cache of contract ABIs, keyed by network, chain id and address.
+# The network name keeps a mainnet fork (chain id 1 as well) apart from
+# mainnet. ABIs are stored content-addressed under abis/<sha256>.json so that
+# clones, tokens and other contracts sharing an ABI are only stored once:
+#
+#   <CACHE_DIR>/abis/<sha256>.json
+#   <CACHE_DIR>/<network>-<chain id>/<address>.json
+#       -> {"name": ..., "abi": <sha256>, "code": <sha256 of the bytecode>}
+#
+# An entry only counts while the address still holds the same code, so a
+# redeploy on a development chain or a fork is fetched again instead of
+# reusing a stale ABI. Once warm, contracts are rebuilt with
+# Contract.from_abi and no explorer request is made.
+CACHE_DIR = Path(
+    os.getenv(
+        "CONTRACT_CACHE_DIR", Path.home() / ".cache" / "strategy-monitor" / "contracts"
+    )
+)
+
+# Decoded contract objects for the current process
+_contracts = {}
+
+stats = {"hits": 0, "misses": 0}
+
+
+def main():
+    key = chain_key()
+    entries = list(CACHE_DIR.glob(f"{key}/*.json"))
+    print(f"{len(entries)} contracts cached for {key} in {CACHE_DIR}")
+
+
+def clear():
+    # Invalidate every cached contract of the active chain
+    key = chain_key()
+    removed = invalidate(key)
+    print(f"Removed {removed} cached contracts for {key}")
+
+
+def chain_key():
+    # Cache directory of the active network, e.g. mainnet-1 or mainnet-fork-1
+    return f"{network.show_active()}-{chain.id}"
+
+
+def cached_contract(address):
+    if hasattr(address, "abi"):
+        return address
+    address = convert.to_address(address)
+    key = (chain_key(), address)
+    code = _code_hash(address)
+
+    if key in _contracts and _contracts[key][0] == code:
+        stats["hits"] += 1
+        return _contracts[key][1]
+
+    entry = _read_entry(key[0], address)
+    if entry is not None and entry["code"] == code:
+        stats["hits"] += 1
+        contract = Contract.from_abi(entry["name"], address, entry["abi"])
+    else:
+        stats["misses"] += 1
+        contract = _fetch(address)
+        _write_entry(key[0], address, contract._name, contract.abi, code)
+
+    _contracts[key] = (code, contract)
+    return contract
+
+
+def invalidate(key, addresses=None):
+    # Drop cached entries of one chain key (see chain_key), all of them if
+    # no address is given. Unreferenced ABI files are removed as well.
+    chain_dir = CACHE_DIR / key
+    if addresses is None:
+        paths = list(chain_dir.glob("*.json"))
+    else:
+        paths = [chain_dir / f"{convert.to_address(a)}.json" for a in addresses]
+
+    removed = 0
+    for path in paths:
+        if path.exists():
+            path.unlink()
+            removed += 1
+    for cached in [k for k in _contracts if k[0] == key]:
+        if addresses is None or cached[1] in [convert.to_address(a) for a in addresses]:
+            del _contracts[cached]
+
+    _collect_garbage()
+    return removed
+
+
+def _fetch(address):
+    return Contract(address)
+
+
+def _code_hash(address):
+    return hashlib.sha256(bytes(web3.eth.get_code(address))).hexdigest()
+
+
+def _read_entry(key, address):
+    path = CACHE_DIR / key / f"{address}.json"
+    try:
+        entry = json.loads(path.read_text())
+        abi = json.loads((CACHE_DIR / "abis" / f"{entry['abi']}.json").read_text())
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+    return {"name": entry["name"], "abi": abi, "code": entry.get("code")}
+
+
+def _write_entry(key, address, name, abi, code):
+    data = json.dumps(abi, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(data.encode()).hexdigest()
+
+    abi_path = CACHE_DIR / "abis" / f"{digest}.json"
+    if not abi_path.exists():
+        _atomic_write(abi_path, data)
+    _atomic_write(
+        CACHE_DIR / key / f"{address}.json",
+        json.dumps({"name": name, "abi": digest, "code": code}),
+    )
+
+
+def _atomic_write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+def _collect_garbage():
+    referenced = set()
+    for path in CACHE_DIR.glob("*/*.json"):
+        if path.parent.name == "abis":
+            continue
+        try:
+            referenced.add(json.loads(path.read_text())["abi"])
+        except (ValueError, KeyError):
+            path.unlink()
+    for path in CACHE_DIR.glob("abis/*.json"):
+        if path.stem not in referenced:
+            path.unlink()
+
+
+if __name__ == "__main__":
+    # Offline invalidation: python scripts/contract_cache.py --chain mainnet-1 [ADDRESS ...]
+    parser = argparse.ArgumentParser(description="Invalidate cached contract ABIs")
+    parser.add_argument("addresses", nargs="*")
+    parser.add_argument("--chain", help="<network>-<chain id>, e.g. mainnet-1")
+    parser.add_argument("--all", action="store_true", help="wipe the whole cache")
+    args = parser.parse_args()
+
+    if args.all:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"Removed {CACHE_DIR}")
+    elif args.chain is None:
+        parser.error("--chain or --all is required")
+    else:
+        removed = invalidate(args.chain, args.addresses or None)
+        print(f"Removed {removed} cached contracts for {args.chain}")
@@ -0,0 +1,242 @@
+from math import ceil
+
+import click
+
+from scripts.addresses import BALANCER, WETH
+from scripts.leverage import unwind
+from scripts.stableswap import DENOMINATOR, StableSwap
+from scripts.strategy_math import WAD
+from scripts.tolerances import GAS, GAS_PRICE
+
+# Exit of a position larger than maxSingleTrade in a schedule of harvests.
+# liquidatePosition frees at most maxSingleTrade per harvest, so the position
+# is drained in chunks; every candidate number of equal chunks is replayed
+# exactly through MarketLib._unwind against the Curve replica (updated after
+# each swap) and the Balancer liquidity, and the schedule with the lowest
+# slippage plus gas wins. The keeper mode runs the schedule step by step,
+# re-planning from the chain before every harvest. The planner is plain
+# Python; brownie and the monitor are only imported by the chain functions.
+
+# MarketLib._swapYieldBearingToWant default, maxSlippage is not readable
+MAX_SLIPPAGE = 200
+
+# Upper bound of harvests in a schedule
+MAX_CHUNKS = 50
+
+# Gas of setMinMaxSingleTrade before every harvest
+SET_TRADE_GAS = 50_000
+
+
+class ExitIncomplete(Exception):
+    # The keeper ran out of harvests with the position still open; `txs` are
+    # the harvests it sent
+    def __init__(self, txs, remaining):
+        super().__init__(
+            f"position not drained after {len(txs)} harvests, "
+            f"{remaining / 1e18} left"
+        )
+        self.txs = txs
+        self.remaining = remaining
+
+
+def main():
+    strategy = click.prompt("Strategy")
+    gas_price = click.prompt("Gas price (gwei)", type=float, default=GAS_PRICE * 1e9)
+    plan = plan_exit(
+        position_from_chain(strategy), StableSwap.from_chain(), gas_price / 1e9
+    )
+    print_plan(plan)
+    if click.confirm("Execute the schedule?"):
+        from brownie import accounts
+
+        keeper = accounts.load(
+            click.prompt("Account", type=click.Choice(accounts.load()))
+        )
+        execute(strategy, keeper, gas_price=gas_price / 1e9)
+
+
+def position_from_chain(s):
+    from brownie import interface
+    from scripts.monitor import strategy_metadata
+
+    s = strategy_metadata(s)["strategy"]
+    return {
+        "collateral": s.balanceOfCollateral(),
+        "debt": s.balanceOfDebt(),
+        "want": s.balanceOfWant(),
+        "price": s.getWantPerYieldBearing(),
+        "target": s.collateralizationRatio(),
+        "lower": s.lowerRebalanceTolerance(),
+        "liquidation_ratio": s.getLiquidationRatio(),
+        "min_single_trade": s.minSingleTrade(),
+        "flashloan_maximum": interface.ERC20(WETH).balanceOf(BALANCER),
+    }
+
+
+def _assets(position):
+    # Strategy.estimatedTotalAssets without loose stETH
+    return (
+        position["want"]
+        + position["collateral"] * position["price"] // WAD
+        - position["debt"]
+    )
+
+
+def _recover(pool, initial, recovery):
+    # Arbitrage moves the pool back towards its initial balances
+    balances = [
+        b + int(recovery * (b0 - b)) for b, b0 in zip(pool.balances, initial.balances)
+    ]
+    return StableSwap(balances, pool.amp, pool.fee, pool.admin_fee)
+
+
+def simulate_step(position, pool, chunk, max_slippage=MAX_SLIPPAGE):
+    # One harvest with maxSingleTrade = chunk and the whole position owed to
+    # the vault: prepareReturn -> liquidatePosition -> MarketLib.unwind.
+    # Returns (position, pool, step) or None if the harvest would revert.
+    needed = min(chunk, _assets(position))
+    position = dict(position)
+    step = {"maxSingleTrade": chunk, "withdrawn": 0, "received": 0, "slippage": 0}
+    if position["want"] < needed:
+        result = unwind(
+            position["collateral"],
+            position["debt"],
+            position["want"],
+            needed - position["want"],
+            position["price"],
+            position["target"],
+            position["flashloan_maximum"],
+            pool.exchange(1, 0),
+            liquidation_ratio=position["liquidation_ratio"],
+        )
+        withdrawn = result["withdrawn"][0]
+        received = pool.get_dy(1, 0, withdrawn)[0] if withdrawn else 0
+        if result["reverted"][0]:
+            return None
+        if received < withdrawn * (DENOMINATOR - max_slippage) // DENOMINATOR:
+            return None
+        for key in ("collateral", "debt", "want"):
+            position[key] = result[key][0]
+        if withdrawn:
+            pool = pool.after_exchange(1, 0, withdrawn)
+        step.update(
+            withdrawn=withdrawn, received=received, slippage=withdrawn - received,
+        )
+        # "unsafe coll. ratio (liqPos)"
+        ratio = position["collateral"] * position["price"] // max(position["debt"], 1)
+        if position["debt"] > 0 and ratio <= position["target"] - position["lower"]:
+            return None
+
+    position["want"] -= min(needed, position["want"])
+    step.update(collateral=position["collateral"], debt=position["debt"])
+    return position, pool, step
+
+
+def simulate_schedule(
+    position, pool, chunk, gas_price=GAS_PRICE, recovery=0, max_slippage=MAX_SLIPPAGE
+):
+    # Harvests with a fixed maxSingleTrade until less than minSingleTrade is
+    # left, or None if one of them reverts
+    initial, steps = pool, []
+    while _assets(position) >= position["min_single_trade"]:
+        if len(steps) == MAX_CHUNKS:
+            return None
+        simulated = simulate_step(position, pool, chunk, max_slippage)
+        if simulated is None:
+            return None
+        position, pool, step = simulated
+        steps.append(step)
+        pool = _recover(pool, initial, recovery)
+
+    gas = len(steps) * (GAS["harvest"] + SET_TRADE_GAS) * gas_price
+    slippage = sum(s["slippage"] for s in steps)
+    return {
+        "chunk": chunk,
+        "steps": steps,
+        "slippage": slippage,
+        "gas": int(gas * 1e18),
+        "cost": slippage + int(gas * 1e18),
+        "remaining": _assets(position),
+    }
+
+
+def plan_exit(
+    position,
+    pool,
+    gas_price=GAS_PRICE,
+    recovery=0,
+    max_slippage=MAX_SLIPPAGE,
+    max_chunks=MAX_CHUNKS,
+):
+    # Cheapest feasible schedule of 1 to `max_chunks` equal chunks, or None
+    total = _assets(position)
+    plans = [
+        simulate_schedule(
+            position, pool, ceil(total / n), gas_price, recovery, max_slippage
+        )
+        for n in range(1, max_chunks + 1)
+    ]
+    plans = [p for p in plans if p is not None]
+    return min(plans, key=lambda p: p["cost"]) if plans else None
+
+
+def print_plan(plan):
+    if plan is None:
+        print("No feasible schedule, lower the position or raise maxSlippage")
+        return
+    print(f"{len(plan['steps'])} harvests of maxSingleTrade {plan['chunk'] / 1e18}")
+    for i, s in enumerate(plan["steps"]):
+        print(
+            f"{i + 1:3} withdraw {s['withdrawn'] / 1e18:12.4f} stETH, "
+            f"receive {s['received'] / 1e18:12.4f} ETH, "
+            f"slippage {s['slippage'] / 1e18:8.4f}, debt left {s['debt'] / 1e18:12.4f}"
+        )
+    print(f"Slippage {plan['slippage'] / 1e18} ETH, gas {plan['gas'] / 1e18} ETH")
+
+
+def execute(
+    s,
+    keeper,
+    gas_price=GAS_PRICE,
+    recovery=0,
+    max_slippage=MAX_SLIPPAGE,
+    max_chunks=MAX_CHUNKS,
+):
+    # Keeper mode: plan from the current chain state, harvest the first chunk
+    # and repeat until the position is drained. The strategy has to owe its
+    # debt to the vault (debt ratio 0 or revoked) and `keeper` has to be a
+    # vault manager. maxSingleTrade is restored at the end. Raises
+    # ExitIncomplete if the position is still open after `max_chunks`
+    # harvests.
+    from scripts.monitor import strategy_metadata
+
+    meta = strategy_metadata(s)
+    s, vault = meta["strategy"], meta["vault"]
+    if vault.debtOutstanding["address"](s) == 0:
+        raise ValueError("set the debt ratio of the strategy to 0 first")
+
+    min_single_trade, max_single_trade = s.minSingleTrade(), s.maxSingleTrade()
+    txs = []
+    try:
+        for _ in range(max_chunks):
+            if s.estimatedTotalAssets() < min_single_trade:
+                break
+            plan = plan_exit(
+                position_from_chain(s),
+                StableSwap.from_chain(),
+                gas_price,
+                recovery,
+                max_slippage,
+            )
+            if plan is None:
+                raise ValueError("no feasible exit schedule left")
+            print(f"Harvest {len(txs) + 1}, {len(plan['steps'])} left")
+            s.setMinMaxSingleTrade(min_single_trade, plan["chunk"], {"from": keeper})
+            txs.append(s.harvest({"from": keeper}))
+        else:
+            remaining = s.estimatedTotalAssets()
+            if remaining >= min_single_trade:
+                raise ExitIncomplete(txs, remaining)
+    finally:
+        s.setMinMaxSingleTrade(min_single_trade, max_single_trade, {"from": keeper})
+    return txs
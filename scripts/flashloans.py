@@ -0,0 +1,104 @@
+# Flashloan liquidity of the Balancer vault. MarketLib.wind and
+# MarketLib.unwind borrow at most the WETH balance of the vault, silently
+# capping the flashloan: an unwind under the cap only repays part of the debt
+# and reverts if the collateral left cannot back the rest at the target
+# ratio. A wind under the cap does not revert but locks less collateral,
+# leaving the position under-levered after the harvest. These helpers work
+# on the raw integers of a monitor snapshot, so the report can flag
+# strategies whose full unwind or next wind does not fit.
+
+from scripts.strategy_math import RAY, WAD
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def leverage_plus_one(target_collateralization_ratio):
+    # MarketLib._unwind, in WAD
+    return RAY * WAD // (target_collateralization_ratio * 10 ** 9 - RAY) + WAD
+
+
+def unwind_capped(debt, liquidity):
+    # A full unwind flashloans the whole debt
+    return debt > liquidity
+
+
+def max_safe_unwind(collateral, debt, price, target_collateralization_ratio, liquidity):
+    # Largest wantAmountRequested of a single MarketLib.unwind that does not
+    # revert with a flashloan capped at `liquidity`: the collateral left has
+    # to back the debt the flashloan did not repay at the target ratio.
+    # Without a cap this is the request that withdraws all the collateral.
+    remaining_debt = debt - min(debt, liquidity)
+    withdrawable = collateral - _ceil_div(
+        remaining_debt * target_collateralization_ratio, price
+    )
+    if withdrawable <= 0:
+        return 0
+    return ((withdrawable + 1) * price - 1) // leverage_plus_one(
+        target_collateralization_ratio
+    )
+
+
+def next_wind(balance_of_want, credit_available, max_single_trade):
+    # Strategy.adjustPosition winds the idle want plus the credit the vault
+    # sends with the harvest, at most maxSingleTrade
+    return min(max_single_trade, balance_of_want + credit_available)
+
+
+def wind_flashloan(want_amount_initial, target_collateralization_ratio):
+    # MarketLib.wind, before the cap
+    return want_amount_initial * RAY // (target_collateralization_ratio * 10 ** 9 - RAY)
+
+
+def wind_capped(want_amount_initial, target_collateralization_ratio, liquidity):
+    return (
+        wind_flashloan(want_amount_initial, target_collateralization_ratio) > liquidity
+    )
+
+
+def _unwind_line(snapshot, liquidity):
+    if snapshot["balanceOfDebt"] is None:
+        return "Flashloan cover of a full unwind: n/a"
+    if not unwind_capped(snapshot["balanceOfDebt"], liquidity):
+        return "Flashloan liquidity covers a full unwind"
+    position = [
+        snapshot["balanceOfCollateral"],
+        snapshot["balanceOfDebt"],
+        snapshot["getWantPerYieldBearing"],
+        snapshot["collateralizationRatio"],
+    ]
+    safe = "n/a"
+    if None not in position:
+        safe = f"{max_safe_unwind(*position, liquidity)/1e18:.2f} {snapshot['symbol']}"
+    return f"Full unwind exceeds the flashloan cap! Largest safe unwind: {safe}"
+
+
+def _wind_line(snapshot, liquidity):
+    fields = [
+        snapshot.get("balanceOfWant"),
+        snapshot.get("creditAvailable"),
+        snapshot.get("maxSingleTrade"),
+        snapshot.get("collateralizationRatio"),
+    ]
+    if None in fields:
+        return "Flashloan cover of the next wind: n/a"
+    wind = next_wind(*fields[:3])
+    if not wind_capped(wind, fields[3], liquidity):
+        return "Flashloan liquidity covers the next wind"
+    return (
+        f"Next wind of {wind/1e18:.2f} {snapshot['symbol']} exceeds the "
+        f"flashloan cap, the harvest will leave the position under-levered!"
+    )
+
+
+def flashloan_report(snapshot):
+    # Report lines for one snapshot, empty if the liquidity was not read
+    liquidity = snapshot.get("balancerLiquidity")
+    if liquidity is None:
+        return []
+    return [
+        f"Balancer WETH liquidity: {liquidity/1e18:.2f}",
+        _unwind_line(snapshot, liquidity),
+        _wind_line(snapshot, liquidity),
+    ]
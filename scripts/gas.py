@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+import json
+
+# Gas results files. A results file maps a case id ("harvest[lido-100-0.1]")
+# to the gas used, next to the version of its format; it is committed, so
+# every change of gas shows up in review. Runs compare against the committed
+# file and fail on regressions above the threshold and on cases the file
+# does not have yet, so a new path cannot go unmeasured.
+
+VERSION = 1
+
+# Gas differs between a mainnet fork and the local stand-ins of
+# scripts/mocks.py, so every stack keeps its own results file
+STACKS = ["fork", "mocks"]
+
+# Relative increase of gas tolerated before a case fails
+THRESHOLD = 0.05
+
+
+def results_file(name, stack):
+    # gas-snapshot.mocks.json for ("gas-snapshot", "mocks")
+    if stack not in STACKS:
+        raise ValueError(f"unknown stack {stack}, expected one of {STACKS}")
+    return Path(__file__).parents[1] / f"{name}.{stack}.json"
+
+
+def missing_baseline(path):
+    # Message if nothing was recorded into `path` yet, else None. Without a
+    # baseline every case would count as new, so runs skip instead of failing.
+    path = Path(path)
+    if path.exists():
+        return None
+    return f"{path.name} does not exist, record a baseline first"
+
+
+def load(path):
+    # Results of a file, empty if it does not exist yet
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return _parse(path, path.read_text())
+
+
+def save(path, results):
+    with Path(path).open("w") as fp:
+        _dump(fp, results)
+
+
+def update(path, results):
+    # Adds `results` to the file, keeping the cases they do not cover. Test
+    # workers running in parallel update the same file, so the read and the
+    # write happen under one exclusive lock.
+    with Path(path).open("a+") as fp, _exclusive(fp):
+        fp.seek(0)
+        text = fp.read()
+        merged = {**(_parse(path, text) if text else {}), **results}
+        fp.seek(0)
+        fp.truncate()
+        _dump(fp, merged)
+        fp.flush()
+
+
+@contextmanager
+def _exclusive(fp):
+    # flock where there is fcntl, else (Windows) a lock on the first byte
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is not None:
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp, fcntl.LOCK_UN)
+        return
+    import msvcrt
+
+    fp.seek(0)
+    msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+        yield
+    finally:
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _parse(path, text):
+    data = json.loads(text)
+    if data.get("version") != VERSION:
+        raise ValueError(
+            f"{path} has version {data.get('version')}, expected {VERSION}"
+        )
+    return data["results"]
+
+
+def _dump(fp, results):
+    json.dump(
+        {"version": VERSION, "results": dict(sorted(results.items()))}, fp, indent=2
+    )
+    fp.write("\n")
+
+
+def regression(baseline, case, gas, threshold=THRESHOLD):
+    # Error message if `case` used more gas than the baseline allows or has
+    # no baseline, else None
+    if case not in baseline:
+        return f"{case}: {gas} gas, not in the baseline"
+    limit = baseline[case] * (1 + threshold)
+    if gas > limit:
+        return f"{case}: {gas} gas, baseline {baseline[case]} (+{gas / baseline[case] - 1:.2%})"
+    return None
+
+
+def diff(baseline, results):
+    # Lines of every case whose gas changed, was added or was removed
+    lines = []
+    for case in sorted(set(baseline) | set(results)):
+        old, new = baseline.get(case), results.get(case)
+        if old == new:
+            continue
+        if old is None:
+            lines.append(f"+ {case}: {new}")
+        elif new is None:
+            lines.append(f"- {case}: {old}")
+        else:
+            lines.append(
+                f"  {case}: {old} -> {new} ({new - old:+}, {new / old - 1:+.2%})"
+            )
+    return lines
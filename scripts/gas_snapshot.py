@@ -0,0 +1,237 @@
+from brownie import (
+    MarketLib,
+    MarketLibCloner,
+    Strategy,
+    accounts,
+    chain,
+    config,
+    interface,
+    network,
+    project,
+)
+from pathlib import Path
+
+try:
+    from eth_abi import encode as encode_abi
+except ImportError:
+    from eth_abi import encode_abi
+
+from scripts import gas, mocks
+from scripts.addresses import BALANCER, STETH, WETH
+
+# Standing gas snapshot of the entry points of Strategy, MarketLibCloner and
+# MarketLib, stored in gas-snapshot.<stack>.json. MarketLib only runs inside the
+# strategy, so its functions are measured through the calls that delegate to
+# them: the WIND and UNWIND actions of receiveFlashLoan (MarketLib._wind and
+# _unwind, called directly by an impersonated Balancer vault), harvest,
+# emergencyUnwind (MarketLib.unwind) and emergencyDebtRepayment (repay,
+# withdraw and swap). harvest and tend are measured on every branch of
+# adjustPosition (wind, unwind and nothing to do). Strategy.initialize only
+# runs on a fresh clone, so it is part of MarketLibCloner.cloneMarketLib.
+# Vault.migrateStrategy runs before the first harvest, since prepareMigration
+# requires a strategy without debt. Every call after the first harvest is
+# undone, so each one runs on the same position.
+#
+# On the development network the script deploys the mocks first and uses
+# gas-snapshot.mocks.json, on any other network gas-snapshot.fork.json.
+#
+#   brownie run gas_snapshot --network mainnet-fork        regenerate + diff
+#   brownie run gas_snapshot check --network mainnet-fork  diff, fail on regressions
+#   brownie run gas_snapshot --network development         same, on the mocks
+
+WETH_WHALE = "0x57757e3d981446d585af0d9ae4d7df6d64647806"
+
+WIND, UNWIND = 0, 1
+
+# Deposit wound by the first harvest
+AMOUNT = 100 * 10 ** 18
+
+
+def main():
+    stack = active_stack()
+    results = measure(*deploy(stack))
+    if gas.missing_baseline(snapshot_file(stack)):
+        print(f"First snapshot of the {stack} stack, {len(results)} calls")
+    else:
+        print_diff(results, stack)
+    gas.save(snapshot_file(stack), results)
+
+
+def check():
+    stack = active_stack()
+    missing = gas.missing_baseline(snapshot_file(stack))
+    if missing:
+        raise ValueError(f"{missing} with `brownie run gas_snapshot`")
+    errors = print_diff(measure(*deploy(stack)), stack)
+    if errors:
+        raise ValueError("\n".join(errors))
+
+
+def active_stack():
+    return "mocks" if network.show_active() == "development" else "fork"
+
+
+def snapshot_file(stack):
+    return gas.results_file("gas-snapshot", stack)
+
+
+def print_diff(results, stack):
+    # Diff against the committed snapshot, returns the regressions
+    baseline = gas.load(snapshot_file(stack))
+    for line in gas.diff(baseline, results) or ["No gas changes"]:
+        print(line)
+    return list(
+        filter(None, (gas.regression(baseline, k, v) for k, v in results.items()))
+    )
+
+
+def deploy(stack):
+    # Vault, MarketLib, cloner and original strategy, like the tests
+    gov = accounts[0]
+    if stack == "mocks":
+        mocks.deploy(accounts[-1])
+    Vault = project.load(
+        Path.home() / ".brownie" / "packages" / config["dependencies"][0]
+    ).Vault
+    vault = gov.deploy(Vault)
+    vault.initialize(WETH, gov, gov, "", "", gov, gov)
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    MarketLib.deploy({"from": gov})
+    cloner = gov.deploy(MarketLibCloner, vault, "Strategy-AAVE-lev-v2-stETH")
+    strategy = Strategy.at(cloner.original())
+    strategy.setDoHealthCheck(False, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    return strategy, vault, cloner, gov, accounts.at(WETH_WHALE, force=True)
+
+
+def measure(strategy, vault, cloner, gov, whale):
+    # {"Contract.function[case]": gas used}
+    weth = interface.ERC20(WETH)
+    balancer = accounts.at(BALANCER, force=True)
+    strategist = accounts.at(strategy.strategist(), force=True)
+    results = {}
+
+    def record(name, *txs):
+        # Gas of the last transaction, all of them undone afterwards
+        receipts = [tx() for tx in txs]
+        results[name] = receipts[-1].gas_used
+        chain.undo(len(txs))
+
+    weth.approve(vault, AMOUNT, {"from": whale})
+    vault.deposit(AMOUNT, {"from": whale})
+    clones = []
+    record(
+        "Vault.migrateStrategy",
+        lambda: clones.append(
+            cloner.cloneMarketLib(
+                vault, gov, gov, gov, "Strategy-AAVE-lev-v2-stETH", {"from": gov}
+            ).events["Cloned"]["clone"]
+        ),
+        lambda: vault.migrateStrategy(strategy, clones[-1], {"from": gov}),
+    )
+    results["Strategy.harvest[wind]"] = strategy.harvest({"from": gov}).gas_used
+    record("Strategy.harvest[noop]", lambda: strategy.harvest({"from": gov}))
+    record("Strategy.tend[noop]", lambda: strategy.tend({"from": gov}))
+
+    setters = {
+        "setForceHarvestTriggerOnce": (True,),
+        "setCreditThreshold": (4 * 10 ** 20,),
+        "setMinMaxSingleTrade": (2 * 10 ** 15, 2 * 10 ** 21),
+        "setMaxSlippage": (300,),
+        "setMaxBorrowRate": (5 * 10 ** 25,),
+        "setExpectedFlashloanFee": (1,),
+        "setCollateralizationRatio": (21 * 10 ** 17,),
+        "setRebalanceTolerance": (5 * 10 ** 16, 5 * 10 ** 16),
+        "setHealthCheck": (gov,),
+        "setDoHealthCheck": (True,),
+        "setStrategist": (gov,),
+        "setKeeper": (gov,),
+        "setMinReportDelay": (3600,),
+        "setMaxReportDelay": (86400,),
+        "setProfitFactor": (200,),
+        "setDebtThreshold": (10 ** 18,),
+        "setMetadataURI": ("ipfs://",),
+        "setEmergencyExit": (),
+    }
+    for name, args in setters.items():
+        record(
+            f"Strategy.{name}", lambda: getattr(strategy, name)(*args, {"from": gov}),
+        )
+    record(
+        "Strategy.setRewards", lambda: strategy.setRewards(gov, {"from": strategist})
+    )
+    # stETH is not protected, whatever the strategy holds goes to governance
+    record("Strategy.sweep", lambda: strategy.sweep(STETH, {"from": gov}))
+
+    target = strategy.collateralizationRatio()
+    record(
+        "Strategy.tend[wind]",
+        lambda: strategy.setCollateralizationRatio(
+            target - 3 * 10 ** 17, {"from": gov}
+        ),
+        lambda: strategy.tend({"from": gov}),
+    )
+    record(
+        "Strategy.tend[unwind]",
+        lambda: strategy.setCollateralizationRatio(
+            target + 3 * 10 ** 17, {"from": gov}
+        ),
+        lambda: strategy.tend({"from": gov}),
+    )
+    record(
+        "Strategy.harvest[unwind]",
+        lambda: vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov}),
+        lambda: strategy.harvest({"from": gov}),
+    )
+    assets = strategy.estimatedTotalAssets()
+    record(
+        "Strategy.emergencyUnwind",
+        lambda: strategy.emergencyUnwind(assets // 4, {"from": gov}),
+    )
+    record(
+        "Strategy.emergencyDebtRepayment",
+        lambda: strategy.emergencyDebtRepayment(
+            strategy.balanceOfCollateral() // 10, {"from": gov}
+        ),
+    )
+
+    # Flashloan callbacks as Balancer runs them: the loan is already in the
+    # strategy and the repayment goes back to the vault
+    flashloan = strategy.balanceOfDebt() // 4
+    record(
+        "Strategy.receiveFlashLoan[wind]",
+        lambda: weth.transfer(strategy, 2 * flashloan, {"from": whale}),
+        lambda: strategy.receiveFlashLoan(
+            [WETH],
+            [flashloan],
+            [0],
+            encode_abi(
+                ["uint8", "uint256", "uint256", "uint256"],
+                [WIND, flashloan, flashloan, target],
+            ),
+            {"from": balancer},
+        ),
+    )
+    debt = strategy.balanceOfDebt()
+    record(
+        "Strategy.receiveFlashLoan[unwind]",
+        lambda: weth.transfer(strategy, debt, {"from": whale}),
+        lambda: strategy.receiveFlashLoan(
+            [WETH],
+            [debt],
+            [0],
+            encode_abi(
+                ["uint8", "uint256", "uint256", "uint256"],
+                [UNWIND, assets // 4, debt, target],
+            ),
+            {"from": balancer},
+        ),
+    )
+
+    record(
+        "MarketLibCloner.cloneMarketLib",
+        lambda: cloner.cloneMarketLib(
+            vault, gov, gov, gov, "Strategy-AAVE-lev-v2-stETH", {"from": gov}
+        ),
+    )
+    return results
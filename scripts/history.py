@@ -0,0 +1,166 @@
+import sqlite3
+from pathlib import Path
+
+# Per-block health history of strategies, stored in SQLite with typed
+# columns. Rows are clustered by (strategy, block) so range queries over one
+# strategy are a single index scan. Amounts are stored in ether units and
+# ratios as plain numbers (1.0 == 100%), which keeps rows small and makes the
+# data directly chartable; exact values stay available from the chain.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS health (
+    strategy TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    collateral REAL NOT NULL,
+    debt REAL NOT NULL,
+    estimated_total_assets REAL NOT NULL,
+    coll_ratio REAL NOT NULL,
+    want_per_yield_bearing REAL NOT NULL,
+    liquidation_ratio REAL NOT NULL,
+    debt_ratio INTEGER NOT NULL,
+    PRIMARY KEY (strategy, block)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS health_timestamp ON health (strategy, timestamp);
+CREATE TABLE IF NOT EXISTS liquidity (
+    block INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    balancer_weth REAL NOT NULL
+);
+"""
+
+COLUMNS = [
+    "strategy",
+    "block",
+    "timestamp",
+    "collateral",
+    "debt",
+    "estimated_total_assets",
+    "coll_ratio",
+    "want_per_yield_bearing",
+    "liquidation_ratio",
+    "debt_ratio",
+]
+
+# Columns aggregated by downsample()
+METRICS = COLUMNS[3:]
+
+
+# Snapshot fields stored in a row. The columns are NOT NULL, so a snapshot
+# with one of these calls failed is not stored.
+ROW_FIELDS = [
+    "timestamp",
+    "balanceOfCollateral",
+    "balanceOfDebt",
+    "estimatedTotalAssets",
+    "getCurrentCollRatio",
+    "getWantPerYieldBearing",
+    "getLiquidationRatio",
+    "strategies",
+]
+
+
+def is_complete(snapshot):
+    return all(snapshot.get(field) is not None for field in ROW_FIELDS)
+
+
+def snapshot_row(snapshot):
+    return (
+        snapshot["address"],
+        snapshot["block"],
+        snapshot["timestamp"],
+        snapshot["balanceOfCollateral"] / 1e18,
+        snapshot["balanceOfDebt"] / 1e18,
+        snapshot["estimatedTotalAssets"] / 1e18,
+        snapshot["getCurrentCollRatio"] / 1e18,
+        snapshot["getWantPerYieldBearing"] / 1e18,
+        snapshot["getLiquidationRatio"] / 1e18,
+        snapshot["strategies"]["debtRatio"],
+    )
+
+
+class HealthStore:
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def append(self, snapshot):
+        return self.append_many([snapshot])
+
+    def append_many(self, snapshots):
+        # Incomplete snapshots are skipped; returns the number of rows stored
+        rows = [snapshot_row(s) for s in snapshots if is_complete(s)]
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO health VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+            # Flashloan liquidity is the same for every strategy of a block
+            self.db.executemany(
+                "INSERT OR REPLACE INTO liquidity VALUES (?, ?, ?)",
+                [
+                    (s["block"], s["timestamp"], s["balancerLiquidity"] / 1e18)
+                    for s in snapshots
+                    if s.get("balancerLiquidity") is not None
+                    and s.get("timestamp") is not None
+                ],
+            )
+        return len(rows)
+
+    def last_block(self, strategy):
+        row = self.db.execute(
+            "SELECT MAX(block) FROM health WHERE strategy = ?", (strategy,)
+        ).fetchone()
+        return row[0]
+
+    def range(self, strategy, from_block=0, to_block=None, columns=COLUMNS):
+        # Rows of one strategy between two blocks (inclusive), oldest first
+        if to_block is None:
+            to_block = 2 ** 63 - 1
+        return self.db.execute(
+            f"SELECT {', '.join(columns)} FROM health "
+            "WHERE strategy = ? AND block BETWEEN ? AND ? ORDER BY block",
+            (strategy, from_block, to_block),
+        ).fetchall()
+
+    def downsample(self, strategy, interval, from_timestamp=0, to_timestamp=None):
+        # One row per `interval` seconds with the min, avg and max of every
+        # metric: (bucket start, rows, min/avg/max of METRICS...)
+        if to_timestamp is None:
+            to_timestamp = 2 ** 63 - 1
+        aggregates = ", ".join(f"MIN({m}), AVG({m}), MAX({m})" for m in METRICS)
+        return self.db.execute(
+            f"SELECT (timestamp / ?) * ? AS bucket, COUNT(*), {aggregates} "
+            "FROM health WHERE strategy = ? AND timestamp BETWEEN ? AND ? "
+            "GROUP BY bucket ORDER BY bucket",
+            (interval, interval, strategy, from_timestamp, to_timestamp),
+        ).fetchall()
+
+    def closest_to_liquidation(self, strategy, from_block=0, to_block=None):
+        # Row with the lowest c-ratio relative to the liquidation ratio while
+        # the strategy had debt, or None
+        if to_block is None:
+            to_block = 2 ** 63 - 1
+        return self.db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM health "
+            "WHERE strategy = ? AND block BETWEEN ? AND ? AND debt > 0 "
+            "ORDER BY coll_ratio / liquidation_ratio LIMIT 1",
+            (strategy, from_block, to_block),
+        ).fetchone()
+
+    def liquidity_range(self, strategy, from_block=0, to_block=None):
+        # (block, timestamp, debt, balancer_weth) of one strategy next to the
+        # flashloan liquidity of the same block, oldest first
+        if to_block is None:
+            to_block = 2 ** 63 - 1
+        return self.db.execute(
+            "SELECT health.block, health.timestamp, debt, balancer_weth "
+            "FROM health JOIN liquidity ON health.block = liquidity.block "
+            "WHERE strategy = ? AND health.block BETWEEN ? AND ? "
+            "ORDER BY health.block",
+            (strategy, from_block, to_block),
+        ).fetchall()
@@ -0,0 +1,180 @@
+import numpy as np
+
+from scripts.strategy_math import COLLATERAL_DUST, RAY, WAD, current_coll_ratio
+
+# Vectorized replica of the leverage loop of MarketLib.wind and
+# MarketLib._unwind. Every argument broadcasts, so thousands of scenarios
+# (deposits x prices x targets) are simulated in one pass. Values are Python
+# integers in object arrays and every division rounds like the contract, so
+# the flashloan and withdrawn amounts match the chain exactly. The resulting
+# balances do not: token movements are assumed to be exact (stETH minted 1:1
+# on Lido, AAVE balances without index rounding or accrued interest), so
+# collateral, debt and want are only close to the chain, within the relative
+# tolerance tests/test_leverage_parity.py allows.
+
+
+def _uint(value):
+    # Object array of Python ints, scalars become 1-element arrays so numpy
+    # never falls back to int64
+    array = np.atleast_1d(np.asarray(value, dtype=object))
+    return np.vectorize(int, otypes=[object])(array) if array.size else array
+
+
+def want_per_yield_bearing(want_price, yield_bearing_price):
+    # Strategy.getWantPerYieldBearing from the AAVE oracle prices in ETH
+    want_price, yield_bearing_price = _uint(want_price), _uint(yield_bearing_price)
+    return WAD * (WAD * WAD // want_price) // (WAD * WAD // yield_bearing_price)
+
+
+def flashloan_amount(want_amount_initial, target_collateralization_ratio, maximum):
+    # MarketLib.wind: debt taken to reach the target, capped at the WETH
+    # balance of the Balancer vault
+    amount = (
+        _uint(want_amount_initial)
+        * RAY
+        // (_uint(target_collateralization_ratio) * 10 ** 9 - RAY)
+    )
+    return np.minimum(amount, _uint(maximum))
+
+
+def leverage_plus_one(target_collateralization_ratio):
+    # MarketLib._unwind, in WAD
+    return RAY * WAD // (_uint(target_collateralization_ratio) * 10 ** 9 - RAY) + WAD
+
+
+def lido_submit(amount):
+    # Default want -> stETH route
+    return amount
+
+
+def oracle_exchange(price):
+    # stETH -> want at the oracle price. Pass a vectorized Curve quote
+    # (returning 0 for 0) to price the withdrawal like the contract's swap.
+    return lambda amount: amount * price // WAD
+
+
+def wind(
+    collateral,
+    debt,
+    want_amount_initial,
+    target_collateralization_ratio,
+    flashloan_maximum,
+    swap=lido_submit,
+    fee=0,
+):
+    # MarketLib.wind followed by MarketLib._wind.
+    # Returns (collateral, debt, flashloan amount).
+    collateral, debt = _uint(collateral), _uint(debt)
+    want_amount_initial = _uint(want_amount_initial)
+    active = want_amount_initial >= COLLATERAL_DUST
+
+    flashloan = np.where(
+        active,
+        flashloan_amount(
+            want_amount_initial, target_collateralization_ratio, flashloan_maximum
+        ),
+        0,
+    )
+    locked = swap(want_amount_initial + flashloan)
+    locked = np.where(active & (locked >= COLLATERAL_DUST), locked, 0)
+    return collateral + locked, debt + np.where(active, flashloan + fee, 0), flashloan
+
+
+def unwind(
+    collateral,
+    debt,
+    want_balance,
+    want_amount_requested,
+    price,
+    target_collateralization_ratio,
+    flashloan_maximum,
+    swap=None,
+    fee=0,
+    liquidation_ratio=None,
+):
+    # MarketLib.unwind followed by MarketLib._unwind, assuming no loose
+    # stETH in the strategy. `price` is getWantPerYieldBearing and `swap`
+    # turns withdrawn stETH into want (oracle price by default).
+    # Returns a dict of arrays: collateral, debt, want, flashloan, withdrawn,
+    # borrowed and reverted (the SafeMath underflow of _unwind when a capped
+    # flashloan leaves more debt than the target allows, or a flashloan that
+    # cannot be repaid). With `liquidation_ratio` (getLiquidationRatio), a
+    # withdrawal that leaves the remaining debt below it reverts as on AAVE.
+    collateral, debt, want = _uint(collateral), _uint(debt), _uint(want_balance)
+    price = _uint(price)
+    target = _uint(target_collateralization_ratio)
+    if swap is None:
+        swap = oracle_exchange(price)
+    collateral, debt, want, price, target = np.broadcast_arrays(
+        collateral, debt, want, price, target
+    )
+    active = collateral >= COLLATERAL_DUST
+
+    flashloan = np.where(active, np.minimum(debt, _uint(flashloan_maximum)), 0)
+    repay = np.where(active, flashloan + fee, 0)
+    requested = _uint(want_amount_requested) * leverage_plus_one(target) // price
+    withdrawn = np.minimum(requested, collateral)
+    withdrawn = np.where(active & (withdrawn >= COLLATERAL_DUST), withdrawn, 0)
+
+    debt = debt - flashloan
+    collateral = collateral - withdrawn
+    want = want + swap(withdrawn)
+    reverted = np.zeros(collateral.shape, dtype=bool)
+    if liquidation_ratio is not None:
+        reverted = (debt > 0) & (
+            current_coll_ratio(collateral, debt, price) < _uint(liquidation_ratio)
+        )
+
+    reborrow = collateral > COLLATERAL_DUST
+    target_debt = collateral * price // target
+    reverted = reverted | (active & reborrow & (target_debt < debt))
+    borrowed = np.where(reverted, 0, target_debt - debt)
+    borrowed = np.where(repay > want, np.maximum(borrowed, repay - want), borrowed)
+    borrowed = np.where(active & reborrow, borrowed, 0)
+    debt = debt + borrowed
+    want = want + borrowed - repay
+    reverted = reverted | (want < 0)
+
+    return {
+        "collateral": collateral,
+        "debt": debt,
+        "want": want,
+        "flashloan": flashloan,
+        "withdrawn": withdrawn,
+        "borrowed": borrowed,
+        "reverted": reverted.astype(bool),
+    }
+
+
+def simulate_deposits(
+    deposits,
+    prices,
+    targets,
+    flashloan_maximum,
+    min_single_trade=10 ** 15,
+    max_single_trade=10 ** 21,
+    swap=lido_submit,
+):
+    # Position after the first harvest of a fresh strategy, assuming the
+    # borrow rate is below maxBorrowRate: adjustPosition winds
+    # min(deposit, maxSingleTrade) once the deposit exceeds minSingleTrade.
+    # Returns a dict of arrays: collateral, debt, want (left in the
+    # strategy), flashloan and collRatio (getCurrentCollRatio).
+    deposits = _uint(deposits)
+    initial = np.where(
+        deposits > _uint(min_single_trade),
+        np.minimum(deposits, _uint(max_single_trade)),
+        0,
+    )
+    collateral, debt, flashloan = wind(0, 0, initial, targets, flashloan_maximum, swap)
+    wound = np.where(initial >= COLLATERAL_DUST, initial, 0)
+    collateral, debt, flashloan, want, prices = np.broadcast_arrays(
+        collateral, debt, flashloan, deposits - wound, _uint(prices)
+    )
+    return {
+        "collateral": collateral,
+        "debt": debt,
+        "want": want,
+        "flashloan": flashloan,
+        "collRatio": current_coll_ratio(collateral, debt, prices),
+    }
@@ -0,0 +1,327 @@
+from brownie import convert, web3
+
+import json
+import sqlite3
+from pathlib import Path
+
+try:
+    from eth_abi import decode as decode_abi
+except ImportError:  # eth-abi < 4
+    from eth_abi import decode_abi
+
+from scripts.addresses import BALANCER, LENDING_POOL
+from scripts.monitor import load_config
+
+# Local index of the logs emitted for our strategies. Queries are answered
+# from SQLite without RPC; `sync` resumes from the last ingested block.
+
+# Largest block range requested in a single eth_getLogs
+CHUNK_SIZE = 2000
+
+# name: (signature, [(field, type, indexed), ...])
+EVENTS = {
+    "Harvested": (
+        "Harvested(uint256,uint256,uint256,uint256)",
+        [
+            ("profit", "uint256", False),
+            ("loss", "uint256", False),
+            ("debtPayment", "uint256", False),
+            ("debtOutstanding", "uint256", False),
+        ],
+    ),
+    "StrategyReported": (
+        "StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256)",
+        [
+            ("strategy", "address", True),
+            ("gain", "uint256", False),
+            ("loss", "uint256", False),
+            ("debtPaid", "uint256", False),
+            ("totalGain", "uint256", False),
+            ("totalLoss", "uint256", False),
+            ("totalDebt", "uint256", False),
+            ("debtAdded", "uint256", False),
+            ("debtRatio", "uint256", False),
+        ],
+    ),
+    "Cloned": ("Cloned(address)", [("clone", "address", True)]),
+    "Deployed": ("Deployed(address)", [("original", "address", True)]),
+    "FlashLoan": (
+        "FlashLoan(address,address,uint256,uint256)",
+        [
+            ("recipient", "address", True),
+            ("token", "address", True),
+            ("amount", "uint256", False),
+            ("feeAmount", "uint256", False),
+        ],
+    ),
+    "Deposit": (
+        "Deposit(address,address,address,uint256,uint16)",
+        [
+            ("reserve", "address", True),
+            ("user", "address", False),
+            ("onBehalfOf", "address", True),
+            ("amount", "uint256", False),
+            ("referral", "uint16", True),
+        ],
+    ),
+    "Borrow": (
+        "Borrow(address,address,address,uint256,uint256,uint256,uint16)",
+        [
+            ("reserve", "address", True),
+            ("user", "address", False),
+            ("onBehalfOf", "address", True),
+            ("amount", "uint256", False),
+            ("borrowRateMode", "uint256", False),
+            ("borrowRate", "uint256", False),
+            ("referral", "uint16", True),
+        ],
+    ),
+    "Repay": (
+        "Repay(address,address,address,uint256)",
+        [
+            ("reserve", "address", True),
+            ("user", "address", True),
+            ("repayer", "address", True),
+            ("amount", "uint256", False),
+        ],
+    ),
+    "Withdraw": (
+        "Withdraw(address,address,address,uint256)",
+        [
+            ("reserve", "address", True),
+            ("user", "address", True),
+            ("to", "address", True),
+            ("amount", "uint256", False),
+        ],
+    ),
+}
+
+
+def _hex(value):
+    return "0x" + bytes(value).hex()
+
+
+def _topic(signature):
+    return _hex(web3.keccak(text=signature))
+
+
+def _address_topic(address):
+    return "0x" + convert.to_address(address)[2:].lower().rjust(64, "0")
+
+
+TOPICS = {_topic(signature): name for name, (signature, _) in EVENTS.items()}
+TOPIC = {name: topic for topic, name in TOPICS.items()}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    event TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_strategy ON events (strategy, event, block);
+CREATE INDEX IF NOT EXISTS events_tx ON events (tx_hash);
+CREATE TABLE IF NOT EXISTS strategies (address TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS cursor (id INTEGER PRIMARY KEY CHECK (id = 0), block INTEGER);
+"""
+
+
+def main():
+    # Bring the index configured as `log_index` in monitor-config.yml up to date
+    config = load_config()
+    index = LogIndex(config.get("log_index", "monitor-logs.sqlite"))
+    index.add_strategies(config.get("strategies", []))
+    start = min([c.get("from_block", 0) for c in config.get("cloners", [])] or [0])
+    last = index.sync(
+        vaults=config.get("vaults", []),
+        cloners=[c["address"] for c in config.get("cloners", [])],
+        from_block=config.get("log_index_from_block", start),
+    )
+    print(f"Log index synced up to block {last}")
+
+
+def decode_log(log):
+    name = TOPICS.get(_hex(log["topics"][0]))
+    if name is None:
+        return None
+    _, fields = EVENTS[name]
+    topics = list(log["topics"][1:])
+    data_types = [t for _, t, indexed in fields if not indexed]
+    data = iter(decode_abi(data_types, bytes(log["data"])))
+    args = {}
+    for field, type_, indexed in fields:
+        if indexed:
+            value = decode_abi([type_], bytes(topics.pop(0)))[0]
+        else:
+            value = next(data)
+        args[field] = convert.to_address(value) if type_ == "address" else value
+    return name, args
+
+
+class LogIndex:
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path))
+        self.db.executescript(SCHEMA)
+
+    # ----------------- INGESTION -----------------
+
+    @property
+    def last_block(self):
+        row = self.db.execute("SELECT block FROM cursor WHERE id = 0").fetchone()
+        return row[0] if row else None
+
+    @property
+    def strategies(self):
+        return [r[0] for r in self.db.execute("SELECT address FROM strategies")]
+
+    def add_strategies(self, strategies):
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO strategies VALUES (?)",
+                [(convert.to_address(s),) for s in strategies],
+            )
+
+    def sync(
+        self,
+        vaults=(),
+        cloners=(),
+        from_block=0,
+        to_block=None,
+        lending_pool=LENDING_POOL,
+        balancer=BALANCER,
+        chunk_size=CHUNK_SIZE,
+    ):
+        # Ingest all blocks after the last ingested one (or from `from_block`
+        # on a new index) up to `to_block`. Clones found through Cloned and
+        # Deployed events are added to the indexed strategies.
+        if to_block is None:
+            to_block = web3.eth.block_number
+        start = from_block if self.last_block is None else self.last_block + 1
+
+        while start <= to_block:
+            end = min(to_block, start + chunk_size - 1)
+            logs = self._get_logs(
+                cloners, [TOPIC["Cloned"], TOPIC["Deployed"]], start, end
+            )
+            self._ingest(logs)
+            logs = self._strategy_logs(
+                self.strategies, vaults, lending_pool, balancer, start, end
+            )
+            with self.db:
+                self._ingest(logs)
+                self.db.execute("INSERT OR REPLACE INTO cursor VALUES (0, ?)", (end,))
+            start = end + 1
+        return self.last_block
+
+    def _strategy_logs(self, strategies, vaults, lending_pool, balancer, start, end):
+        if not strategies:
+            return []
+        topics = [_address_topic(s) for s in strategies]
+        aave = [TOPIC[e] for e in ("Deposit", "Borrow", "Repay", "Withdraw")]
+        return (
+            self._get_logs(strategies, [TOPIC["Harvested"]], start, end)
+            + self._get_logs(vaults, [TOPIC["StrategyReported"], topics], start, end)
+            + self._get_logs([balancer], [TOPIC["FlashLoan"], topics], start, end)
+            + self._get_logs([lending_pool], [aave, None, topics], start, end)
+        )
+
+    def _get_logs(self, addresses, topics, start, end):
+        if not addresses:
+            return []
+        return web3.eth.get_logs(
+            {
+                "address": [convert.to_address(a) for a in addresses],
+                "topics": topics,
+                "fromBlock": start,
+                "toBlock": end,
+            }
+        )
+
+    def _ingest(self, logs):
+        rows = []
+        for log in logs:
+            decoded = decode_log(log)
+            if decoded is None:
+                continue
+            name, args = decoded
+            address = convert.to_address(log["address"])
+            if name in ("Cloned", "Deployed"):
+                strategy = args.get("clone", args.get("original"))
+                self.add_strategies([strategy])
+            elif name == "Harvested":
+                strategy = address
+            elif name == "FlashLoan":
+                strategy = args["recipient"]
+            elif name in ("Deposit", "Borrow"):
+                strategy = args["onBehalfOf"]
+            elif name in ("Repay", "Withdraw"):
+                strategy = args["user"]
+            else:
+                strategy = args["strategy"]
+            rows.append(
+                (
+                    log["blockNumber"],
+                    log["logIndex"],
+                    _hex(log["transactionHash"]),
+                    address,
+                    name,
+                    strategy,
+                    json.dumps({k: str(v) for k, v in args.items()}),
+                )
+            )
+        self.db.executemany(
+            "INSERT OR REPLACE INTO events VALUES (?,?,?,?,?,?,?)", rows
+        )
+
+    # ----------------- QUERIES -----------------
+
+    def events(self, strategy, event=None, from_block=0, to_block=None):
+        # [(block, tx hash, event, args)] oldest first
+        if to_block is None:
+            to_block = 2 ** 63 - 1
+        query = (
+            "SELECT block, tx_hash, event, args FROM events "
+            "WHERE strategy = ? AND block BETWEEN ? AND ?"
+        )
+        params = [convert.to_address(strategy), from_block, to_block]
+        if event is not None:
+            query += " AND event = ?"
+            params.append(event)
+        rows = self.db.execute(query + " ORDER BY block, log_index", params)
+        return [(b, tx, e, json.loads(args)) for b, tx, e, args in rows]
+
+    def harvests(self, strategy):
+        # Harvested events with the matching vault report of the same tx
+        reports = {
+            tx: args for _, tx, _, args in self.events(strategy, "StrategyReported")
+        }
+        return [
+            (block, tx, args, reports.get(tx))
+            for block, tx, _, args in self.events(strategy, "Harvested")
+        ]
+
+    def flashloans(self, strategy):
+        # [(block, tx hash, "wind" | "unwind", amount)]. A wind borrows on AAVE
+        # inside the flashloan, an unwind repays debt.
+        result = []
+        for block, tx, _, args in self.events(strategy, "FlashLoan"):
+            actions = {
+                r[0]
+                for r in self.db.execute(
+                    "SELECT event FROM events WHERE tx_hash = ? AND strategy = ?",
+                    (tx, convert.to_address(strategy)),
+                )
+            }
+            action = "unwind" if "Repay" in actions else "wind"
+            result.append((block, tx, action, int(args["amount"])))
+        return result
+
+    def last_flashloan(self, strategy, action):
+        matching = [f for f in self.flashloans(strategy) if f[2] == action]
+        return matching[-1] if matching else None
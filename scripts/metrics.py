@@ -0,0 +1,230 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import bisect
+import threading
+import time
+
+from scripts import contract_cache
+
+# Minimal Prometheus exporter for the monitor. Values are only updated in
+# memory by the polling loop; rendering happens in the scrape thread.
+
+# Seconds, suited to JSON-RPC round trips
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def remove(self, *labels):
+        with self.lock:
+            self.values.pop(labels, None)
+
+    def samples(self):
+        with self.lock:
+            return [
+                (self.name + _labels(self.labels, k), v)
+                for k, v in sorted(self.values.items())
+            ]
+
+
+class Counter(Gauge):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            counts, total, n = self.values.get(labels, ([0] * len(self.buckets), 0, 0))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self.values[labels] = (counts, total + value, n + 1)
+
+    def count(self, *labels):
+        with self.lock:
+            return self.values.get(labels, (None, 0, 0))[2]
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total, n) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _labels(self.labels + ("le",), key + (bound,))
+                    samples.append((f"{self.name}_bucket{labels}", cumulative))
+                labels = _labels(self.labels + ("le",), key + ("+Inf",))
+                samples.append((f"{self.name}_bucket{labels}", n))
+                labels = _labels(self.labels, key)
+                samples.append((f"{self.name}_sum{labels}", total))
+                samples.append((f"{self.name}_count{labels}", n))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        for collect in self.collectors:
+            collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+strategy_coll_ratio = registry.register(
+    Gauge("strategy_coll_ratio", "Current collateralization ratio", ("strategy",))
+)
+strategy_target_coll_ratio = registry.register(
+    Gauge("strategy_target_coll_ratio", "Target collateralization ratio", ("strategy",))
+)
+strategy_liquidation_ratio = registry.register(
+    Gauge("strategy_liquidation_ratio", "AAVE liquidation ratio", ("strategy",))
+)
+strategy_debt = registry.register(
+    Gauge("strategy_debt", "Variable debt in want", ("strategy",))
+)
+strategy_collateral = registry.register(
+    Gauge("strategy_collateral", "stETH collateral on AAVE", ("strategy",))
+)
+strategy_profit = registry.register(
+    Gauge(
+        "strategy_profit",
+        "Estimated total assets minus vault debt, negative on loss",
+        ("strategy",),
+    )
+)
+strategy_tend_trigger = registry.register(
+    Gauge("strategy_tend_trigger", "1 if tendTrigger(1) is true", ("strategy",))
+)
+strategy_failed_calls = registry.register(
+    Gauge(
+        "strategy_failed_calls", "Calls that failed in the last snapshot", ("strategy",)
+    )
+)
+strategy_block = registry.register(
+    Gauge("strategy_snapshot_block", "Block of the last snapshot", ("strategy",))
+)
+rpc_latency = registry.register(
+    Histogram("rpc_request_seconds", "JSON-RPC request latency", ("method",))
+)
+rpc_calls = registry.register(
+    Counter("rpc_requests_total", "JSON-RPC requests", ("method",))
+)
+cache_requests = registry.register(
+    Counter("contract_cache_requests_total", "Contract cache lookups", ("result",))
+)
+
+
+def _collect_cache_stats():
+    for result in ("hits", "misses"):
+        cache_requests.set(contract_cache.stats[result], result)
+
+
+registry.collectors.append(_collect_cache_stats)
+
+
+def _set(gauge, value, s, scale=1e18):
+    # A failed call removes the sample rather than keeping the last value
+    if value is None:
+        gauge.remove(s)
+    else:
+        gauge.set(value / scale, s)
+
+
+def record_snapshot(snapshot):
+    s = snapshot["address"]
+    params = snapshot["strategies"]
+    _set(strategy_coll_ratio, snapshot["getCurrentCollRatio"], s)
+    _set(strategy_target_coll_ratio, snapshot["collateralizationRatio"], s)
+    _set(strategy_liquidation_ratio, snapshot["getLiquidationRatio"], s)
+    _set(strategy_debt, snapshot["balanceOfDebt"], s)
+    _set(strategy_collateral, snapshot["balanceOfCollateral"], s)
+    profit = None
+    if snapshot["estimatedTotalAssets"] is not None and params is not None:
+        profit = snapshot["estimatedTotalAssets"] - params["totalDebt"]
+    _set(strategy_profit, profit, s)
+    _set(strategy_tend_trigger, snapshot["tendTrigger"], s, scale=1)
+    strategy_failed_calls.set(sum(v is None for v in snapshot.values()), s)
+    strategy_block.set(snapshot["block"], s)
+
+
+def rpc_metrics_middleware(make_request, w3):
+    # web3 middleware timing every JSON-RPC request by method
+    def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            return make_request(method, params)
+        finally:
+            rpc_latency.observe(time.perf_counter() - start, method)
+            rpc_calls.inc(method)
+
+    return middleware
+
+
+def instrument(w3):
+    if "rpc_metrics" not in w3.middleware_onion:
+        w3.middleware_onion.add(rpc_metrics_middleware, "rpc_metrics")
+
+
+def serve(port, host="0.0.0.0"):
+    # Serve /metrics from a daemon thread, returns the server
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
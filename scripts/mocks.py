@@ -0,0 +1,197 @@
+from brownie import (
+    MockAToken,
+    MockBalancerVault,
+    MockBaseFee,
+    MockCurvePool,
+    MockHealthCheck,
+    MockLendingPool,
+    MockPriceOracle,
+    MockProtocolDataProvider,
+    MockReserveInterestRateStrategy,
+    MockStETH,
+    MockVariableDebtToken,
+    MockWETH,
+    accounts,
+    web3,
+)
+
+from scripts.addresses import (
+    BALANCER,
+    BASE_FEE_ORACLE,
+    CURVE,
+    HEALTH_CHECK,
+    LENDING_POOL,
+    PRICE_ORACLE,
+    PROTOCOL_DATA_PROVIDER,
+    STETH,
+    WETH,
+)
+
+# Local stand-ins of the protocols Strategy and MarketLib hard-code (see
+# contracts/mocks), placed at their mainnet addresses on a development chain
+# so the tests run offline instead of on a mainnet fork:
+#
+#   brownie test --network development --mocks
+#   brownie run mocks --network development
+#
+# Every stand-in is deployed normally, then its runtime code is copied to the
+# mainnet address and initialised there, which is why none of them sets
+# state in its constructor.
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Accounts the tests impersonate for WETH and stETH (see tests/conftest.py)
+WHALES = [
+    "0x57757e3d981446d585af0d9ae4d7df6d64647806",
+    "0x7153d2ef9f14a6b1bb2ed822745f65e58d836c3f",
+    "0xAc38Ee05C0204A1E119C625d0a560D6731478880",
+]
+
+# Aave v2 reserve parameters of mainnet, in bps
+RESERVES = {
+    WETH: dict(
+        ltv=8_250, threshold=8_600, bonus=10_500, reserve_factor=1_000, borrowing=True
+    ),
+    STETH: dict(
+        ltv=7_000, threshold=7_500, bonus=10_750, reserve_factor=1_000, borrowing=False
+    ),
+}
+
+# WETH interest rate strategy: optimal utilisation, base rate, slope 1 and
+# slope 2 (ray)
+WETH_RATES = (65 * 10 ** 25, 0, 8 * 10 ** 25, 10 ** 27)
+
+# Curve pool: A, fee and admin fee (1e10)
+CURVE_PARAMS = (50, 4_000_000, 5_000_000_000)
+
+# Base fee oracle: acceptable and current base fee
+BASE_FEE = (400 * 10 ** 9, 10 ** 10)
+
+# Health check: profit and loss limits (bps)
+HEALTH_CHECK_LIMITS = (100, 1)
+
+# WETH lent on Aave and on Balancer, ETH and stETH each side of Curve
+LIQUIDITY = 100_000 * 10 ** 18
+
+# WETH and stETH of every whale
+WHALE_BALANCE = 10_000 * 10 ** 18
+
+# Equivalent RPC methods of hardhat, anvil and ganache
+SET_CODE = ["hardhat_setCode", "anvil_setCode", "evm_setAccountCode"]
+SET_BALANCE = ["hardhat_setBalance", "anvil_setBalance", "evm_setAccountBalance"]
+
+
+def main():
+    for name, contract in deploy(accounts[-1]).items():
+        print(f"{name}: {contract.address}")
+
+
+def deploy(deployer, liquidity=LIQUIDITY):
+    # {name: contract} of the whole stack, seeded with liquidity
+    tx = {"from": deployer}
+    set_balance(deployer, 10 * liquidity)
+
+    weth = place(MockWETH, WETH, deployer)
+    steth = place(MockStETH, STETH, deployer)
+    oracle = place(MockPriceOracle, PRICE_ORACLE, deployer)
+    pool = place(MockLendingPool, LENDING_POOL, deployer)
+    pool.initialize(oracle, tx)
+    rates = MockReserveInterestRateStrategy.deploy(*WETH_RATES, tx)
+    for token in [weth, steth]:
+        params = RESERVES[token.address]
+        symbol = token.symbol()
+        a_token = MockAToken.deploy(
+            pool,
+            token,
+            token == steth,
+            f"Aave interest bearing {symbol}",
+            f"a{symbol}",
+            tx,
+        )
+        debt_token = ZERO_ADDRESS
+        if params["borrowing"]:
+            debt_token = MockVariableDebtToken.deploy(
+                pool,
+                token,
+                f"Aave variable debt bearing {symbol}",
+                f"variableDebt{symbol}",
+                tx,
+            )
+        pool.initReserve(token, a_token, ZERO_ADDRESS, debt_token, rates, tx)
+        pool.setConfiguration(token, configuration(**params), tx)
+        oracle.setAssetPrice(token, 10 ** 18, tx)
+    provider = place(MockProtocolDataProvider, PROTOCOL_DATA_PROVIDER, deployer)
+    provider.initialize(pool, tx)
+    curve = place(MockCurvePool, CURVE, deployer)
+    curve.initialize(steth, *CURVE_PARAMS, tx)
+    balancer = place(MockBalancerVault, BALANCER, deployer)
+    base_fee = place(MockBaseFee, BASE_FEE_ORACLE, deployer)
+    base_fee.initialize(*BASE_FEE, tx)
+    health_check = place(MockHealthCheck, HEALTH_CHECK, deployer)
+    health_check.initialize(*HEALTH_CHECK_LIMITS, tx)
+
+    weth.deposit({"from": deployer, "value": 2 * liquidity})
+    weth.approve(pool, liquidity, tx)
+    pool.deposit(weth, liquidity, deployer, 0, tx)
+    weth.transfer(balancer, liquidity, tx)
+    steth.submit(ZERO_ADDRESS, {"from": deployer, "value": liquidity})
+    steth.approve(curve, liquidity, tx)
+    curve.add_liquidity(
+        [liquidity, liquidity], 0, {"from": deployer, "value": liquidity}
+    )
+
+    for address in WHALES:
+        set_balance(address, 3 * WHALE_BALANCE)
+        whale = accounts.at(address, force=True)
+        weth.deposit({"from": whale, "value": WHALE_BALANCE})
+        steth.submit(ZERO_ADDRESS, {"from": whale, "value": WHALE_BALANCE})
+
+    return {
+        "weth": weth,
+        "steth": steth,
+        "lending_pool": pool,
+        "protocol_data_provider": provider,
+        "price_oracle": oracle,
+        "curve": curve,
+        "balancer": balancer,
+        "base_fee": base_fee,
+        "health_check": health_check,
+    }
+
+
+def configuration(ltv, threshold, bonus, reserve_factor, borrowing):
+    # Reserve configuration packed like Aave's ReserveConfigurationMap, for an
+    # active 18 decimals reserve
+    return (
+        ltv
+        | threshold << 16
+        | bonus << 32
+        | 18 << 48
+        | 1 << 56
+        | int(borrowing) << 58
+        | reserve_factor << 64
+    )
+
+
+def place(container, address, deployer):
+    # Deploys `container` and moves its runtime code to `address`
+    contract = container.deploy({"from": deployer})
+    set_code(address, web3.eth.get_code(contract.address))
+    return container.at(address)
+
+
+def set_code(address, code):
+    _rpc(SET_CODE, str(address), "0x" + bytes(code).hex())
+
+
+def set_balance(address, balance):
+    _rpc(SET_BALANCE, str(address), hex(balance))
+
+
+def _rpc(methods, *params):
+    # Result of the first of the equivalent methods the node supports
+    for method in methods:
+        response = web3.provider.make_request(method, list(params))
+        if "error" not in response:
+            return response.get("result")
+    raise ValueError(f"None of {', '.join(methods)} is supported by this node")
@@ -1,73 +1,295 @@
-from brownie import Contract
+from brownie import MarketLibCloner, Multicall2, convert, interface, web3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import os
-import requests
+import yaml
+
+from scripts.addresses import BALANCER, WETH
+from scripts.alerts import AlertDispatcher
+from scripts.contract_cache import cached_contract
+from scripts.flashloans import flashloan_report
+from scripts.history import HealthStore
 
 telegram_bot_key = os.getenv("TELEGRAM_BOT_KEY")
+telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID", "-1001580241915")
+
+# Strategy list and fleet settings, see monitor-config.yml
+MONITOR_CONFIG = os.getenv("MONITOR_CONFIG", "monitor-config.yml")
+
+# Maximum number of strategies polled at the same time
+DEFAULT_CONCURRENCY = 8
+
+CLONED_TOPIC = "0x" + bytes(web3.keccak(text="Cloned(address)")).hex()
+
+# Canonical Multicall2 deployment on mainnet
+MULTICALL2 = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"
+
+# Strategy view functions collected in every snapshot (no arguments)
+SNAPSHOT_FIELDS = [
+    "balanceOfWant",
+    "balanceOfCollateral",
+    "balanceOfDebt",
+    "estimatedTotalAssets",
+    "getWantPerYieldBearing",
+    "collateralizationRatio",
+    "lowerRebalanceTolerance",
+    "upperRebalanceTolerance",
+    "getCurrentCollRatio",
+    "getLiquidationRatio",
+    "maxSingleTrade",
+]
+
+# Immutable per-strategy data, fetched once and reused across snapshots
+_metadata = {}
+
+# Background alert delivery, created on first use
+_dispatcher = None
 
 
 def main():
+    multicall = get_multicall()
+
     eth_c = print_monitoring_info_for_strategy(
-        "0xd33535e9F2E09485aC9cE8b27F865251161065E0"
+        "0xd33535e9F2E09485aC9cE8b27F865251161065E0", multicall
     )
     send_msg("\n".join(eth_c))
 
     yfi_a = print_monitoring_info_for_strategy(
-        "0x19b2c8b3C601E9690ee524B02d4aCA058Db8B0D7"
+        "0x19b2c8b3C601E9690ee524B02d4aCA058Db8B0D7", multicall
     )
     send_msg("\n".join(yfi_a))
+    get_dispatcher().flush()
 
 
-def print_monitoring_info_for_strategy(s):
-    output = ["```"]
+def fleet():
+    # Poll every configured strategy concurrently, then send the reports
+    config = load_config()
+    multicall = get_multicall(config.get("multicall", MULTICALL2))
+    strategies = fleet_strategies(config)
 
-    s = Contract(s)
-    want = Contract(s.want())
-    vault = Contract(s.vault())
-    yvault = Contract(s.yVault())
-    maker_dai_delegate = Contract("0xf728c1645739b1d4367A94232d7473016Df908E7")
+    results = poll_fleet(
+        strategies, multicall, config.get("concurrency", DEFAULT_CONCURRENCY)
+    )
+    for address, result in results:
+        if isinstance(result, Exception):
+            send_msg(f"```\nFailed to monitor {address}: {result!r}\n```")
+        else:
+            send_msg("\n".join(format_report(result)))
 
-    output.append(f"{s.name()} {s}")
+    # The reports are already queued: a failed history write must not drop
+    # them when the process exits
+    try:
+        if config.get("history"):
+            store = HealthStore(config["history"])
+            try:
+                store.append_many(
+                    [r for _, r in results if not isinstance(r, Exception)]
+                )
+            finally:
+                store.close()
+    finally:
+        get_dispatcher().flush()
 
-    shares = yvault.balanceOf(s)
-    value = shares * yvault.pricePerShare() / 1e18
-    debt = s.balanceOfDebt()
 
-    output.append(
-        f"Balance of CDP #{s.cdpId()}: {s.balanceOfCollateral()/1e18:.2f} {want.symbol()}"
+def liquidity():
+    # Balancer flashloan liquidity against the debt of every configured
+    # strategy, now and over the stored history if one is configured
+    config = load_config()
+    multicall = get_multicall(config.get("multicall", MULTICALL2))
+    store = HealthStore(config["history"]) if config.get("history") else None
+    for s in fleet_strategies(config):
+        snapshot = snapshot_strategy(s, multicall)
+        print(f"{snapshot['name']} {s}")
+        print(f"Debt: {_amount(snapshot['balanceOfDebt'])} {snapshot['symbol']}")
+        for line in flashloan_report(snapshot):
+            print(line)
+        if store is None:
+            continue
+        rows = store.liquidity_range(s)
+        capped = [r for r in rows if r[2] > r[3]]
+        if rows:
+            print(
+                f"History: {len(capped)} of {len(rows)} snapshots with the "
+                f"debt above the flashloan liquidity, lowest liquidity "
+                f"{min(r[3] for r in rows):.2f} WETH"
+            )
+    if store is not None:
+        store.close()
+
+
+def load_config(path=MONITOR_CONFIG):
+    with Path(path).open() as fp:
+        return yaml.safe_load(fp) or {}
+
+
+def fleet_strategies(config):
+    # Explicit strategies first, then every clone found from the cloners
+    strategies = [convert.to_address(s) for s in config.get("strategies", [])]
+    for cloner in config.get("cloners", []):
+        for s in discover_clones(cloner["address"], cloner.get("from_block", 0)):
+            if s not in strategies:
+                strategies.append(s)
+    return strategies
+
+
+def discover_clones(cloner, from_block=0, to_block="latest"):
+    # The original strategy plus every clone announced by a Cloned event
+    cloner = MarketLibCloner.at(cloner)
+    logs = web3.eth.get_logs(
+        {
+            "address": cloner.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [CLONED_TOPIC],
+        }
     )
-    output.append(f"Debt: {debt/1e18:.2f} DAI")
-    output.append(f"Value of investment: {value/1e18:.2f} DAI")
+    clones = [
+        convert.to_address("0x" + bytes(log["topics"][1][-20:]).hex()) for log in logs
+    ]
+    return [cloner.original()] + clones
 
-    if value >= debt:
-        output.append(f"Current profit: {(value - debt)/1e18:.2f} DAI")
-    else:
-        output.append(f"Current loss: {(debt - value)/1e18:.2f} DAI")
 
-    output.append(
-        f"{want.symbol()} price (spotter): {maker_dai_delegate.getSpotPrice(s.ilk())/1e18:.2f}"
+def poll_fleet(strategies, multicall, concurrency=DEFAULT_CONCURRENCY):
+    # Snapshots run in a bounded thread pool, so the whole fleet takes about
+    # as long as the slowest strategy. Failures are returned, not raised.
+    def poll(s):
+        try:
+            return s, snapshot_strategy(s, multicall)
+        except Exception as e:
+            return s, e
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(executor.map(poll, strategies))
+
+
+def get_multicall(address=MULTICALL2):
+    return Multicall2.at(address)
+
+
+def strategy_metadata(s):
+    s = cached_contract(s)
+    if s.address not in _metadata:
+        want = cached_contract(s.want())
+        _metadata[s.address] = {
+            "strategy": s,
+            "name": s.name(),
+            "want": want,
+            "symbol": want.symbol(),
+            "vault": cached_contract(s.vault()),
+        }
+    return _metadata[s.address]
+
+
+def snapshot_strategy(s, multicall=None, block_identifier=None):
+    # All fields are read by a single aggregate eth_call, so every value
+    # in the snapshot comes from the same block
+    if multicall is None:
+        multicall = get_multicall()
+    meta = strategy_metadata(s)
+    s = meta["strategy"]
+    vault = meta["vault"]
+
+    calls = [(f, s, getattr(s, f), ()) for f in SNAPSHOT_FIELDS]
+    calls.append(("tendTrigger", s, s.tendTrigger, (1,)))
+    calls.append(("strategies", vault, vault.strategies, (s.address,)))
+    calls.append(
+        ("creditAvailable", vault, vault.creditAvailable["address"], (s.address,))
+    )
+    calls.append(("timestamp", multicall, multicall.getCurrentBlockTimestamp, ()))
+    weth = interface.ERC20(WETH)
+    calls.append(("balancerLiquidity", weth, weth.balanceOf, (BALANCER,)))
+
+    block, _, results = multicall.tryBlockAndAggregate.call(
+        False,
+        [(target.address, fn.encode_input(*args)) for _, target, fn, args in calls],
+        block_identifier=block_identifier,
+    )
+
+    snapshot = {
+        "address": s.address,
+        "name": meta["name"],
+        "symbol": meta["symbol"],
+        "block": block,
+    }
+    # A call to an address without code (a strategy before its deployment)
+    # succeeds with empty return data, it counts as failed as well
+    for (key, _, fn, _), (success, data) in zip(calls, results):
+        snapshot[key] = fn.decode_output(data) if success and data else None
+    snapshot["strategies"] = (
+        snapshot["strategies"].dict() if snapshot["strategies"] is not None else None
     )
-    output.append(f"Target c-ratio: {s.collateralizationRatio()/1e18:.2f}")
-    output.append(f"Current c-ratio: {s.getCurrentCollRatio()/1e18:.2f}")
+    return snapshot
+
+
+def _amount(value, digits=2):
+    # Fixed point value of a snapshot, "n/a" if its call failed
+    return "n/a" if value is None else f"{value/1e18:.{digits}f}"
+
+
+def format_report(snapshot):
+    # Calls that failed in the aggregate are None in the snapshot and shown
+    # as "n/a"; the report is only OK if every call went through
+    output = ["```"]
+    symbol = snapshot["symbol"]
+    params = snapshot["strategies"]
+    failed = [key for key, value in snapshot.items() if value is None]
+
+    output.append(f"{snapshot['name']} {snapshot['address']}")
+    output.append(f"Block: {snapshot['block']}")
+    if failed:
+        output.append(f"Failed calls: {', '.join(failed)}")
+
+    assets = snapshot["estimatedTotalAssets"]
+    vault_debt = params["totalDebt"] if params is not None else None
+
+    output.append(f"Collateral: {_amount(snapshot['balanceOfCollateral'])} stETH")
+    output.append(f"Debt: {_amount(snapshot['balanceOfDebt'])} {symbol}")
+    output.append(f"Estimated total assets: {_amount(assets)} {symbol}")
+
+    if assets is None or vault_debt is None:
+        output.append(f"Current profit: n/a")
+    elif assets >= vault_debt:
+        output.append(f"Current profit: {(assets - vault_debt)/1e18:.4f} {symbol}")
+    else:
+        output.append(f"Current loss: {(vault_debt - assets)/1e18:.4f} {symbol}")
+
     output.append(
-        f"Liquidation ratio: {maker_dai_delegate.getLiquidationRatio(s.ilk())/1e27:.2f}"
+        f"{symbol} per stETH (oracle): {_amount(snapshot['getWantPerYieldBearing'], 4)}"
     )
-    output.append(f"Debt ratio: {vault.strategies(s).dict()['debtRatio']/100:.2f}%")
+    output.append(f"Target c-ratio: {_amount(snapshot['collateralizationRatio'])}")
+    output.append(f"Current c-ratio: {_amount(snapshot['getCurrentCollRatio'])}")
+    output.append(f"Liquidation ratio: {_amount(snapshot['getLiquidationRatio'])}")
+    if params is not None:
+        output.append(f"Debt ratio: {params['debtRatio']/100:.2f}%")
+    else:
+        output.append(f"Debt ratio: n/a")
+    output.extend(flashloan_report(snapshot))
 
-    if s.tendTrigger(1):
+    if snapshot["tendTrigger"]:
         output.append(
             f"Strategy is outside the tolerance band and should be rebalanced. Call tend()!"
         )
-    else:
+    elif snapshot["tendTrigger"] is None:
+        output.append(f"tendTrigger failed, the tolerance band was not checked!")
+    elif not failed:
         output.append(f"Everything looks OK")
 
     output.append("```")
     return output
 
 
+def print_monitoring_info_for_strategy(s, multicall=None):
+    return format_report(snapshot_strategy(s, multicall))
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = AlertDispatcher(telegram_bot_key)
+    return _dispatcher
+
+
 def send_msg(text):
-    payload = {"chat_id": "-1001580241915", "text": text, "parse_mode": "MarkdownV2"}
-    r = requests.get(
-        "https://api.telegram.org/bot" + telegram_bot_key + "/sendMessage",
-        params=payload,
-    )
+    # Queued for delivery, never blocks the monitor
+    get_dispatcher().submit(telegram_chat_id, text)
@@ -0,0 +1,217 @@
+from brownie import convert, web3
+
+import os
+import sys
+import time
+
+from scripts.addresses import LENDING_POOL, PRICE_ORACLE, STETH, WETH
+from scripts.contract_cache import cached_contract
+from scripts.history import HealthStore
+from scripts import metrics
+from scripts.monitor import (
+    MULTICALL2,
+    fleet_strategies,
+    format_report,
+    get_multicall,
+    load_config,
+    send_msg,
+    snapshot_strategy,
+    strategy_metadata,
+)
+
+# Seconds between two polls for new blocks
+POLL_INTERVAL = int(os.getenv("MONITOR_POLL_INTERVAL", 12))
+
+# Largest block range requested in a single eth_getLogs
+MAX_BLOCK_RANGE = 1000
+
+
+def _topic(signature):
+    return "0x" + bytes(web3.keccak(text=signature)).hex()
+
+
+TRANSFER = _topic("Transfer(address,address,uint256)")
+RESERVE_DATA_UPDATED = _topic(
+    "ReserveDataUpdated(address,uint256,uint256,uint256,uint256,uint256)"
+)
+ANSWER_UPDATED = _topic("AnswerUpdated(int256,uint256,uint256)")
+STRATEGY_REPORTED = _topic(
+    "StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256)"
+)
+
+
+def main():
+    # Follow new blocks and report strategies when they enter or leave the
+    # rebalance tolerance band
+    config = load_config()
+    multicall = get_multicall(config.get("multicall", MULTICALL2))
+    store = HealthStore(config["history"]) if config.get("history") else None
+    if config.get("metrics_port"):
+        metrics.instrument(web3)
+        metrics.serve(config["metrics_port"])
+
+    def on_update(previous, snapshot):
+        if store is not None:
+            store.append(snapshot)
+        metrics.record_snapshot(snapshot)
+        report_tend_trigger_changes(previous, snapshot)
+
+    daemon = MonitorDaemon(
+        fleet_strategies(config),
+        multicall,
+        price_sources=config.get("price_sources") or default_price_sources(),
+        on_update=on_update,
+    )
+    daemon.run()
+
+
+def report_tend_trigger_changes(previous, snapshot):
+    if previous is None or previous["tendTrigger"] != snapshot["tendTrigger"]:
+        send_msg("\n".join(format_report(snapshot)))
+
+
+def default_price_sources():
+    # Chainlink aggregators behind the AAVE oracle sources of stETH and WETH
+    oracle = cached_contract(PRICE_ORACLE)
+    sources = []
+    for asset in (STETH, WETH):
+        source = oracle.getSourceOfAsset(asset)
+        try:
+            sources.append(cached_contract(source).aggregator())
+        except Exception:
+            sources.append(source)
+    return sources
+
+
+def _address_topic(address):
+    return "0x" + convert.to_address(address)[2:].lower().rjust(64, "0")
+
+
+class MonitorDaemon:
+    # Keeps the last known snapshot of every strategy in memory and only
+    # re-reads a strategy when a log in the new blocks touches it:
+    #  - Transfer of its aToken or variable debt token to or from it
+    #  - ReserveDataUpdated of stETH or WETH on the lending pool
+    #  - AnswerUpdated of one of the watched price sources
+    #  - StrategyReported for it on its vault
+    # Blocks without such logs cost a single eth_getLogs.
+
+    def __init__(
+        self,
+        strategies,
+        multicall,
+        lending_pool=LENDING_POOL,
+        price_sources=(),
+        on_update=None,
+    ):
+        self.multicall = multicall
+        self.on_update = on_update
+        self.state = {}
+        self.last_block = None
+
+        self.lending_pool = convert.to_address(lending_pool)
+        self.reserves = {_address_topic(STETH), _address_topic(WETH)}
+        self.price_sources = {convert.to_address(p) for p in price_sources}
+
+        # address emitting the log -> strategies whose tokens it holds
+        self.tokens = {}
+        # (vault, strategy topic) -> strategy
+        self.vaults = {}
+        self.strategies = []
+        for s in strategies:
+            meta = strategy_metadata(s)
+            s = meta["strategy"].address
+            self.strategies.append(s)
+            for token in (meta["strategy"].aToken(), meta["strategy"].debtToken()):
+                self.tokens.setdefault(convert.to_address(token), set()).add(s)
+            self.vaults[(meta["vault"].address, _address_topic(s))] = s
+
+    def watched_addresses(self):
+        return sorted(
+            set(self.tokens)
+            | {vault for vault, _ in self.vaults}
+            | {self.lending_pool}
+            | self.price_sources
+        )
+
+    def start(self, block=None):
+        # Take the initial snapshot of every strategy
+        if block is None:
+            block = web3.eth.block_number
+        for s in self.strategies:
+            self._refresh(s, block)
+        self.last_block = block
+
+    def affected_strategies(self, logs):
+        dirty = set()
+        for log in logs:
+            address = convert.to_address(log["address"])
+            topics = ["0x" + bytes(t).hex() for t in log["topics"]]
+            if not topics:
+                continue
+            if topics[0] == TRANSFER and address in self.tokens:
+                for s in self.tokens[address]:
+                    if _address_topic(s) in topics[1:3]:
+                        dirty.add(s)
+            elif topics[0] == RESERVE_DATA_UPDATED and address == self.lending_pool:
+                if topics[1] in self.reserves:
+                    dirty.update(self.strategies)
+            elif topics[0] == ANSWER_UPDATED and address in self.price_sources:
+                dirty.update(self.strategies)
+            elif topics[0] == STRATEGY_REPORTED:
+                s = self.vaults.get((address, topics[1]))
+                if s is not None:
+                    dirty.add(s)
+        return dirty
+
+    def process(self, to_block=None):
+        # Handle all blocks since the last processed one. Returns the
+        # strategies that were re-read.
+        if to_block is None:
+            to_block = web3.eth.block_number
+        if self.last_block is None:
+            self.start(to_block)
+            return set(self.strategies)
+        if to_block <= self.last_block:
+            return set()
+
+        dirty = set()
+        addresses = self.watched_addresses()
+        from_block = self.last_block + 1
+        while from_block <= to_block:
+            end = min(to_block, from_block + MAX_BLOCK_RANGE - 1)
+            logs = web3.eth.get_logs(
+                {"address": addresses, "fromBlock": from_block, "toBlock": end}
+            )
+            dirty |= self.affected_strategies(logs)
+            from_block = end + 1
+
+        for s in dirty:
+            self._refresh(s, to_block)
+        self.last_block = to_block
+        return dirty
+
+    def run(self, poll_interval=POLL_INTERVAL):
+        while True:
+            self.poll()
+            time.sleep(poll_interval)
+
+    def poll(self):
+        # process() that never raises: a failed poll (RPC timeout, bad log)
+        # is logged and returns None. last_block only moves once a range is
+        # fully processed, so the next poll retries the same blocks.
+        try:
+            return self.process()
+        except Exception as e:
+            print(
+                f"Poll after block {self.last_block} failed, retrying: {e!r}",
+                file=sys.stderr,
+            )
+            return None
+
+    def _refresh(self, s, block):
+        previous = self.state.get(s)
+        snapshot = snapshot_strategy(s, self.multicall, block_identifier=block)
+        self.state[s] = snapshot
+        if self.on_update is not None:
+            self.on_update(previous, snapshot)
@@ -0,0 +1,303 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import numpy as np
+
+from scripts.addresses import LENDING_POOL, WETH
+
+# Monte Carlo liquidation risk of a leveraged stETH position. Correlated
+# stETH/ETH depeg and WETH borrow-rate paths are generated in batches, every
+# batch replays the keeper and the rebalance rules of Strategy.adjustPosition
+# over all of its paths at once, and batches are spread over a process pool.
+# Amounts are floats in ETH, rates are annual fractions. The pool workers
+# import this module, so brownie is only imported by position_from_strategy
+# and the simulation also runs where workers are spawned (macOS, Windows).
+
+HOURS_PER_YEAR = 24 * 365
+
+COLLATERAL_DUST = 10 / 1e18
+
+# Market model and keeper behaviour, one step is an hour
+PARAMS = {
+    "steps": 24 * 30,
+    # log(stETH/ETH) mean-reverts to its starting value, with downward jumps
+    "depeg_vol": 0.1,
+    "depeg_reversion": 12.0,
+    "jump_rate": 2.0,
+    "jump_size": 0.03,
+    # variable borrow rate of WETH on AAVE, jumps up with every depeg jump
+    "rate_mean": 0.03,
+    "rate_vol": 0.2,
+    "rate_reversion": 50.0,
+    "rate_jump": 0.05,
+    "correlation": -0.5,
+    "staking_apr": 0.04,
+    # Curve ETH/stETH: selling `depth` stETH costs 50% slippage, depth
+    # shrinks as the peg weakens
+    "curve_depth": 100_000.0,
+    "depth_sensitivity": 10.0,
+    "max_slippage": 0.02,
+    "flashloan_cap": float("inf"),
+    # AAVE v2 stETH reserve
+    "liquidation_bonus": 0.075,
+    "close_factor": 0.5,
+    # steps between tendTrigger checks and between harvests
+    "keeper_interval": 1,
+    "harvest_interval": 24 * 7,
+    # chance that isCurrentBaseFeeAcceptable is true at a keeper check
+    "base_fee_acceptable": 0.8,
+}
+
+# Paths per process pool task
+BATCH_SIZE = 1_000
+
+
+def main():
+    strategy = click.prompt("Strategy")
+    paths = click.prompt("Paths", type=int, default=10_000)
+    summary = run(position_from_strategy(strategy), paths=paths)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+
+def position_from_strategy(s):
+    # Starting position and strategy settings, read from the chain
+    from brownie import interface
+    from scripts.monitor import snapshot_strategy, strategy_metadata
+
+    s = strategy_metadata(s)["strategy"]
+    snapshot = snapshot_strategy(s)
+    lending_pool = interface.ILendingPool(LENDING_POOL)
+    return {
+        "collateral": snapshot["balanceOfCollateral"] / 1e18,
+        "debt": snapshot["balanceOfDebt"] / 1e18,
+        "want": snapshot["balanceOfWant"] / 1e18,
+        "price": snapshot["getWantPerYieldBearing"] / 1e18,
+        "target": snapshot["collateralizationRatio"] / 1e18,
+        "lower": snapshot["lowerRebalanceTolerance"] / 1e18,
+        "upper": snapshot["upperRebalanceTolerance"] / 1e18,
+        "liquidation_ratio": snapshot["getLiquidationRatio"] / 1e18,
+        "min_single_trade": s.minSingleTrade() / 1e18,
+        "max_single_trade": s.maxSingleTrade() / 1e18,
+        "max_borrow_rate": s.maxBorrowRate() / 1e27,
+        "borrow_rate": lending_pool.getReserveData(WETH)[4] / 1e27,
+    }
+
+
+def generate_paths(position, params, n, rng):
+    # (price, borrow rate) arrays of shape (n, steps)
+    steps, dt = params["steps"], 1 / HOURS_PER_YEAR
+    shocks = rng.standard_normal((2, n, steps))
+    rho = params["correlation"]
+    rate_shocks = rho * shocks[0] + np.sqrt(1 - rho ** 2) * shocks[1]
+    jumps = rng.random((n, steps)) < params["jump_rate"] * dt
+    jump_sizes = rng.exponential(params["jump_size"], (n, steps)) * jumps
+
+    log_depeg = np.zeros((n, steps))
+    rates = np.zeros((n, steps))
+    x = np.zeros(n)
+    r = np.full(n, position["borrow_rate"])
+    for t in range(steps):
+        x += -params["depeg_reversion"] * x * dt
+        x += params["depeg_vol"] * np.sqrt(dt) * shocks[0, :, t] - jump_sizes[:, t]
+        r += params["rate_reversion"] * (params["rate_mean"] - r) * dt
+        r += params["rate_vol"] * np.sqrt(dt) * rate_shocks[:, t]
+        r += params["rate_jump"] * jumps[:, t]
+        r = np.maximum(r, 0)
+        log_depeg[:, t], rates[:, t] = x, r
+    return position["price"] * np.exp(log_depeg), rates
+
+
+def replay(position, params, prices, rates, rng):
+    # Replays one batch of paths, returns per-path arrays
+    n, steps = prices.shape
+    dt = 1 / HOURS_PER_YEAR
+    state = {
+        "collateral": np.full(n, position["collateral"]),
+        "debt": np.full(n, position["debt"]),
+        "want": np.full(n, position["want"]),
+    }
+    result = {
+        "liquidated": np.zeros(n, dtype=bool),
+        "liquidation_loss": np.zeros(n),
+        "slippage_loss": np.zeros(n),
+        "tends": np.zeros(n, dtype=int),
+        "failed_tends": np.zeros(n, dtype=int),
+        "harvests": np.zeros(n, dtype=int),
+        "min_ratio": np.full(n, np.inf),
+    }
+    for t in range(steps):
+        price, rate = prices[:, t], rates[:, t]
+        depth = params["curve_depth"] * np.minimum(
+            1, (price / position["price"]) ** params["depth_sensitivity"]
+        )
+        state["debt"] *= np.exp(rate * dt)
+        state["collateral"] *= 1 + params["staking_apr"] * dt
+
+        _liquidate(state, result, position, params, price)
+        ratio = _ratio(state, price)
+        result["min_ratio"] = np.minimum(result["min_ratio"], ratio)
+
+        base_fee_acceptable = rng.random(n) < params["base_fee_acceptable"]
+        if t % params["keeper_interval"] == 0:
+            tend = tend_trigger(state, position, price, base_fee_acceptable)
+            ok = adjust_position(state, tend, position, params, price, rate, depth)
+            result["tends"] += tend
+            result["failed_tends"] += tend & ~ok
+            result["slippage_loss"] += ok * state.pop("slippage")
+        if t > 0 and t % params["harvest_interval"] == 0:
+            harvest = base_fee_acceptable.copy()
+            ok = adjust_position(state, harvest, position, params, price, rate, depth)
+            result["harvests"] += harvest
+            result["slippage_loss"] += ok * state.pop("slippage")
+
+    result["equity"] = (
+        state["collateral"] * prices[:, -1] - state["debt"] + state["want"]
+    )
+    return result
+
+
+def _ratio(state, price):
+    # Strategy._getCurrentPessimisticRatio
+    return state["collateral"] * price / np.where(state["debt"] > 0, state["debt"], 1)
+
+
+def _liquidate(state, result, position, params, price):
+    # AAVE liquidation call for every position below the liquidation ratio
+    debt, collateral = state["debt"], state["collateral"]
+    liquidatable = (debt > 0) & (_ratio(state, price) < position["liquidation_ratio"])
+    bonus = 1 + params["liquidation_bonus"]
+    repaid = np.minimum(params["close_factor"] * debt, collateral * price / bonus)
+    repaid = np.where(liquidatable, repaid, 0)
+    state["debt"] = debt - repaid
+    state["collateral"] = collateral - repaid * bonus / price
+    result["liquidation_loss"] += repaid * params["liquidation_bonus"]
+    result["liquidated"] |= liquidatable
+
+
+def tend_trigger(state, position, price, base_fee_acceptable):
+    ratio = _ratio(state, price)
+    below = ratio < position["target"] - position["lower"]
+    above = (
+        (ratio > position["target"] + position["upper"])
+        & (state["debt"] > 0)
+        & base_fee_acceptable
+    )
+    return (state["collateral"] >= COLLATERAL_DUST) & (below | above)
+
+
+def adjust_position(state, mask, position, params, price, rate, depth):
+    # Strategy.adjustPosition(0) on the paths in `mask`. A reverted call
+    # leaves the state untouched. Updates `state` in place, stores the
+    # slippage paid in state["slippage"] and returns the successful paths.
+    target = position["target"]
+    collateral, debt, want = state["collateral"], state["debt"], state["want"]
+    initial_ratio = _ratio(state, price)
+
+    wind_first = (rate <= position["max_borrow_rate"]) & (
+        want > position["min_single_trade"]
+    )
+    rebalance = ~wind_first & (debt > 0)
+    below = rebalance & (initial_ratio < target - position["lower"])
+    above = rebalance & (initial_ratio > target + position["upper"])
+
+    # ratio below the band: MarketLib.unwind
+    to_repay = collateral - collateral * initial_ratio / target
+    requested = np.minimum(to_repay * price, position["max_single_trade"])
+    withdrawn = np.minimum(requested * target / (target - 1) / price, collateral)
+    withdrawn = np.where(below, withdrawn, 0)
+    slippage = withdrawn / (withdrawn + depth)
+    flashloan = np.minimum(debt, params["flashloan_cap"])
+    remaining = debt - flashloan
+    u_collateral = collateral - withdrawn
+    wallet = want + withdrawn * price * (1 - slippage)
+    borrowed = u_collateral * price / target - remaining
+    reverted = below & (
+        (slippage > params["max_slippage"])
+        | ((u_collateral > COLLATERAL_DUST) & (borrowed < 0))
+    )
+    borrowed = np.where(
+        flashloan > wallet, np.maximum(borrowed, flashloan - wallet), borrowed
+    )
+    borrowed = np.where(u_collateral > COLLATERAL_DUST, borrowed, 0)
+    reverted |= below & (wallet + borrowed < flashloan)
+
+    new = {
+        "collateral": np.where(below, u_collateral, collateral),
+        "debt": np.where(below, remaining + borrowed, debt),
+        "want": np.where(below, wallet + borrowed - flashloan, want),
+    }
+    # ratio above the band: borrow up to the target before winding
+    extra = np.where(above, collateral * price / target - debt, 0)
+    new["debt"] = new["debt"] + extra
+    new["want"] = new["want"] + extra
+    # MarketLib.wind of the free want
+    wound = np.where(
+        wind_first | above, np.minimum(position["max_single_trade"], new["want"]), 0
+    )
+    wound = np.where(wound >= COLLATERAL_DUST, wound, 0)
+    flashloan = np.minimum(wound / (target - 1), params["flashloan_cap"])
+    # Lido mints 1:1, Curve is used when stETH trades below ETH
+    new["collateral"] = new["collateral"] + (wound + flashloan) / np.minimum(price, 1)
+    new["debt"] = new["debt"] + flashloan
+    new["want"] = new["want"] - wound
+
+    # "unsafe coll. ratio (adjPos)"
+    ratio = _ratio(new, price)
+    reverted |= (
+        (new["debt"] > 0)
+        & (ratio < initial_ratio)
+        & (ratio <= target - position["lower"])
+    )
+    ok = mask & ~reverted
+    for key in new:
+        state[key] = np.where(ok, new[key], state[key])
+    state["slippage"] = np.where(below, withdrawn * price * slippage, 0)
+    return ok
+
+
+def simulate_batch(position, params, n, seed):
+    rng = np.random.default_rng(seed)
+    prices, rates = generate_paths(position, params, n, rng)
+    return replay(position, params, prices, rates, rng)
+
+
+def run(
+    position, params=None, paths=10_000, batch_size=BATCH_SIZE, workers=None, seed=0
+):
+    # Liquidation probability and expected loss over `paths` paths. Every
+    # batch has its own seed, so the result does not depend on `workers`.
+    params = {**PARAMS, **(params or {})}
+    sizes = [min(batch_size, paths - i) for i in range(0, paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = list(
+            executor.map(
+                simulate_batch,
+                [position] * len(sizes),
+                [params] * len(sizes),
+                sizes,
+                seeds,
+            )
+        )
+    result = {k: np.concatenate([b[k] for b in batches]) for k in batches[0]}
+    return summarize(position, result)
+
+
+def summarize(position, result):
+    assets = position["collateral"] * position["price"] - position["debt"]
+    assets += position["want"]
+    loss = result["liquidation_loss"] + result["slippage_loss"]
+    return {
+        "paths": len(loss),
+        "liquidation_probability": float(result["liquidated"].mean()),
+        "expected_loss": float(loss.mean()),
+        "expected_loss_ratio": float(loss.mean() / assets) if assets > 0 else 0.0,
+        "loss_p99": float(np.percentile(loss, 99)),
+        "expected_liquidation_loss": float(result["liquidation_loss"].mean()),
+        "expected_slippage_loss": float(result["slippage_loss"].mean()),
+        "min_ratio_p1": float(np.percentile(result["min_ratio"], 1)),
+        "tends": float(result["tends"].mean()),
+        "failed_tends": float(result["failed_tends"].mean()),
+        "harvests": float(result["harvests"].mean()),
+    }
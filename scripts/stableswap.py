@@ -0,0 +1,155 @@
+from brownie import Contract
+
+import numpy as np
+
+from scripts.addresses import CURVE
+
+# Offline replica of the Curve ETH/stETH pool (StableSwapSTETH.vy). Seeded
+# from one snapshot of the pool (balances, A and fee), it quotes get_dy for
+# whole vectors of trade sizes. All arithmetic is on Python integers with the
+# rounding of the Vyper code, so quotes match the pool to the wei.
+
+POOL = CURVE
+
+N_COINS = 2
+A_PRECISION = 100
+FEE_DENOMINATOR = 10 ** 10
+
+# MarketLib.DENOMINATOR, maxSlippage is in basis points
+DENOMINATOR = 10_000
+
+# Views of the pool used for the snapshot
+POOL_ABI = [
+    {
+        "name": name,
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": inputs,
+        "outputs": [{"name": "", "type": "uint256"}],
+    }
+    for name, inputs in [
+        ("balances", [{"name": "i", "type": "uint256"}]),
+        ("A_precise", []),
+        ("fee", []),
+        ("admin_fee", []),
+        (
+            "get_dy",
+            [
+                {"name": "i", "type": "int128"},
+                {"name": "j", "type": "int128"},
+                {"name": "dx", "type": "uint256"},
+            ],
+        ),
+    ]
+]
+
+
+def _uint(value):
+    return np.atleast_1d(np.asarray(value, dtype=object))
+
+
+class StableSwap:
+    def __init__(self, balances, amp, fee, admin_fee=0):
+        # `amp` is A_precise (A * A_PRECISION), fees are in 1e10
+        self.balances = [int(b) for b in balances]
+        self.amp = int(amp)
+        self.fee = int(fee)
+        self.admin_fee = int(admin_fee)
+        self.D = self.get_D(self.balances)
+
+    @classmethod
+    def from_chain(cls, address=POOL, block_identifier=None):
+        pool = Contract.from_abi("StableSwapSTETH", address, POOL_ABI)
+        kwargs = {"block_identifier": block_identifier}
+        return cls(
+            [pool.balances.call(i, **kwargs) for i in range(N_COINS)],
+            pool.A_precise.call(**kwargs),
+            pool.fee.call(**kwargs),
+            pool.admin_fee.call(**kwargs),
+        )
+
+    def get_D(self, xp):
+        S = sum(xp)
+        if S == 0:
+            return 0
+        D = S
+        Ann = self.amp * N_COINS
+        for _ in range(255):
+            D_P = D
+            for x in xp:
+                D_P = D_P * D // (x * N_COINS + 1)
+            Dprev = D
+            D = (
+                (Ann * S // A_PRECISION + D_P * N_COINS)
+                * D
+                // ((Ann - A_PRECISION) * D // A_PRECISION + (N_COINS + 1) * D_P)
+            )
+            if abs(D - Dprev) <= 1:
+                return D
+        raise ValueError("D did not converge")
+
+    def get_y(self, x):
+        # New balance of the other coin for an array of balances `x` of the
+        # input coin, every element converging on its own like the pool
+        x = _uint(x)
+        D = self.D
+        Ann = self.amp * N_COINS
+        c = D * D // (x * N_COINS)
+        c = c * D * A_PRECISION // (Ann * N_COINS)
+        b = x + D * A_PRECISION // Ann
+
+        y = np.full(x.shape, D, dtype=object)
+        active = np.ones(x.shape, dtype=bool)
+        for _ in range(255):
+            y_prev = y[active]
+            y_next = (y_prev * y_prev + c[active]) // (2 * y_prev + b[active] - D)
+            y[active] = y_next
+            converged = np.abs(y_next - y_prev) <= 1
+            active[np.flatnonzero(active)[converged]] = False
+            if not active.any():
+                return y
+        raise ValueError("y did not converge")
+
+    def get_dy(self, i, j, dx):
+        # Amount of coin j received for each amount of coin i in `dx`
+        # (0: ETH, 1: stETH), 0 where the pool would revert
+        dx = _uint(dx)
+        dy = self.balances[j] - self.get_y(self.balances[i] + dx) - 1
+        dy = np.where(dy > 0, dy, 0)
+        return dy - self.fee * dy // FEE_DENOMINATOR
+
+    def after_exchange(self, i, j, dx):
+        # Pool after exchange(i, j, dx): the admin share of the fee leaves
+        # the balances
+        dy = self.balances[j] - self.get_y(self.balances[i] + int(dx))[0] - 1
+        dy_fee = self.fee * dy // FEE_DENOMINATOR
+        balances = list(self.balances)
+        balances[i] += int(dx)
+        balances[j] -= dy - dy_fee + dy_fee * self.admin_fee // FEE_DENOMINATOR
+        return StableSwap(balances, self.amp, self.fee, self.admin_fee)
+
+    def slippage(self, i, j, dx):
+        # Shortfall of get_dy against a 1:1 trade, in basis points
+        dx = _uint(dx)
+        dy = self.get_dy(i, j, dx)
+        return np.array((dx - dy) * DENOMINATOR / dx, dtype=float)
+
+    def max_trade(self, max_slippage, i=1, j=0):
+        # Largest amount of coin i that can be swapped with the minimum
+        # output of MarketLib._swapYieldBearingToWant
+        # (amount * (DENOMINATOR - maxSlippage) / DENOMINATOR)
+        def within(dx):
+            min_dy = dx * (DENOMINATOR - max_slippage) // DENOMINATOR
+            return self.get_dy(i, j, dx)[0] >= min_dy
+
+        low, high = 0, self.balances[j]
+        if not within(1):
+            return 0
+        while high - low > 1:
+            mid = (low + high) // 2
+            low, high = (mid, high) if within(mid) else (low, mid)
+        return low
+
+    def exchange(self, i, j):
+        # get_dy as a swap function for scripts/leverage.py
+        return lambda dx: self.get_dy(i, j, dx)
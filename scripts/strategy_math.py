@@ -0,0 +1,18 @@
+import numpy as np
+
+# Fixed point units and helpers of Strategy.sol shared by the off-chain
+# replicas (triggers, leverage, accounting, exit planner). Nothing here
+# touches brownie, so the models import outside a loaded project and in the
+# spawned workers of a process pool.
+
+WAD = 10 ** 18
+RAY = 10 ** 27
+
+# Strategy.COLLATERAL_DUST
+COLLATERAL_DUST = 10
+
+
+def current_coll_ratio(collateral, debt, want_per_yield_bearing):
+    # Strategy._getCurrentPessimisticRatio
+    debt = np.where(debt == 0, 1, debt)
+    return collateral * want_per_yield_bearing // debt
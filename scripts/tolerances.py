@@ -0,0 +1,133 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import click
+import numpy as np
+
+from scripts.history import HealthStore
+from scripts.risk import PARAMS, generate_paths, position_from_strategy, replay
+
+# Search of collateralizationRatio and rebalance tolerances. Every candidate
+# replays the same price and rate paths (simulated or taken from the health
+# history) through tendTrigger/adjustPosition, and is scored by its final
+# equity net of the gas spent on tends and harvests. Candidates run in
+# parallel on a process pool, whose workers import this module: it must not
+# need the brownie project at import time.
+
+# Gas used per call, leveraged position with a flashloan
+GAS = {"tend": 1_200_000, "harvest": 1_500_000}
+
+# ETH per unit of gas (30 gwei)
+GAS_PRICE = 30e-9
+
+TARGETS = [1.6, 1.8, 2.0, 2.2, 2.5]
+TOLERANCES = [0.02, 0.05, 0.1, 0.15, 0.2]
+
+
+def main():
+    from scripts.monitor import load_config
+
+    config = load_config()
+    strategy = click.prompt("Strategy")
+    source = click.prompt(
+        "Paths", type=click.Choice(["simulated", "history"]), default="simulated"
+    )
+    position = position_from_strategy(strategy)
+    paths = None
+    if source == "history":
+        store = HealthStore(config.get("history", "monitor-history.sqlite"))
+        paths = historical_paths(store, strategy, position["borrow_rate"])
+        store.close()
+
+    results = search(position, paths=paths)
+    print("target  lower  upper  liq.prob  exp.loss  keeper     score")
+    for r in results[:10]:
+        print(
+            f"{r['target']:6.2f} {r['lower']:6.2f} {r['upper']:6.2f} "
+            f"{r['liquidation_probability']:9.4f} {r['expected_loss']:9.4f} "
+            f"{r['keeper_spend']:7.4f} {r['score']:9.4f}"
+        )
+
+
+def historical_paths(store, strategy, borrow_rate, interval=3600):
+    # Price path of one strategy from the health history, resampled to one
+    # value every `interval` seconds. Returns (prices, rates) of shape
+    # (1, steps); the borrow rate is not stored and kept constant.
+    rows = store.range(strategy, columns=["timestamp", "want_per_yield_bearing"])
+    if len(rows) < 2:
+        raise ValueError(f"not enough history for {strategy}")
+    timestamps, prices = np.array(rows, dtype=float).T
+    grid = np.arange(timestamps[0], timestamps[-1] + 1, interval)
+    prices = np.interp(grid, timestamps, prices)[None, :]
+    return prices, np.full(prices.shape, borrow_rate)
+
+
+def candidates(position, targets=TARGETS, lowers=TOLERANCES, uppers=TOLERANCES):
+    # Settings whose lower band edge stays above the liquidation ratio. This
+    # is a deliberate safety bound of the search, not the contract's check:
+    # setCollateralizationRatio/setRebalanceTolerance compare against
+    # getLiquidationRatio() * WAD / RAY (about 1.3e9 wei) and accept almost
+    # any setting.
+    return [
+        {"target": t, "lower": lower, "upper": upper}
+        for t, lower, upper in product(targets, lowers, uppers)
+        if t - lower > position["liquidation_ratio"]
+    ]
+
+
+def evaluate(position, candidate, params, paths, n, seed, gas, gas_price):
+    # Score of one candidate. Without `paths`, the same `seed` produces the
+    # same simulated paths for every candidate.
+    position = {**position, **candidate}
+    rng = np.random.default_rng(seed)
+    if paths is None:
+        paths = generate_paths(position, params, n, rng)
+    result = replay(position, params, *paths, rng)
+
+    loss = result["liquidation_loss"] + result["slippage_loss"]
+    calls = result["tends"] * gas["tend"] + result["harvests"] * gas["harvest"]
+    keeper_spend = calls * gas_price
+    return {
+        **candidate,
+        "liquidation_probability": float(result["liquidated"].mean()),
+        "expected_loss": float(loss.mean()),
+        "keeper_spend": float(keeper_spend.mean()),
+        "tends": float(result["tends"].mean()),
+        "failed_tends": float(result["failed_tends"].mean()),
+        "score": float((result["equity"] - keeper_spend).mean()),
+    }
+
+
+def search(
+    position,
+    targets=TARGETS,
+    lowers=TOLERANCES,
+    uppers=TOLERANCES,
+    params=None,
+    paths=None,
+    n=1_000,
+    seed=0,
+    gas=GAS,
+    gas_price=GAS_PRICE,
+    max_liquidation_probability=0.01,
+    workers=None,
+):
+    # Every candidate, best first: candidates within
+    # `max_liquidation_probability` ranked by score, then the others
+    params = {**PARAMS, **(params or {})}
+    grid = candidates(position, targets, lowers, uppers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                evaluate, position, c, params, paths, n, seed, gas, gas_price
+            )
+            for c in grid
+        ]
+        results = [f.result() for f in futures]
+    return sorted(
+        results,
+        key=lambda r: (
+            r["liquidation_probability"] > max_liquidation_probability,
+            -r["score"],
+        ),
+    )
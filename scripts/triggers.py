@@ -0,0 +1,158 @@
+from brownie import interface, web3
+
+import numpy as np
+
+from scripts.addresses import BASE_FEE_ORACLE
+from scripts.monitor import get_multicall, strategy_metadata
+from scripts.strategy_math import COLLATERAL_DUST, WAD, current_coll_ratio
+
+# Off-chain replica of Strategy.tendTrigger and Strategy.harvestTrigger.
+# Keepers fetch the state of the whole fleet with one Multicall2 call and
+# evaluate both triggers for every strategy at once. All uint256 values are
+# kept as exact Python integers in object arrays, so the comparisons match
+# the contract to the wei.
+
+# Strategies per aggregate call, keeps each eth_call within the gas cap
+BATCH_SIZE = 50
+
+# Strategy fields read for the triggers, in call order
+STATE_FIELDS = [
+    "balanceOfCollateral",
+    "balanceOfDebt",
+    "getWantPerYieldBearing",
+    "collateralizationRatio",
+    "lowerRebalanceTolerance",
+    "upperRebalanceTolerance",
+    "estimatedTotalAssets",
+    "maxReportDelay",
+    "creditThreshold",
+]
+
+
+def _uint(values):
+    return np.array([int(v) for v in values], dtype=object)
+
+
+def tend_trigger(
+    collateral,
+    debt,
+    want_per_yield_bearing,
+    collateralization_ratio,
+    lower_tolerance,
+    upper_tolerance,
+    base_fee_acceptable,
+):
+    current_ratio = current_coll_ratio(collateral, debt, want_per_yield_bearing)
+    below = current_ratio < collateralization_ratio - lower_tolerance
+    above = (
+        (current_ratio > collateralization_ratio + upper_tolerance)
+        & (debt > 0)
+        & base_fee_acceptable
+    )
+    return ((collateral >= COLLATERAL_DUST) & (below | above)).astype(bool)
+
+
+def harvest_trigger(
+    active,
+    base_fee_acceptable,
+    force_harvest_trigger_once,
+    timestamp,
+    last_report,
+    max_report_delay,
+    credit_available,
+    credit_threshold,
+):
+    due = (
+        force_harvest_trigger_once
+        | (timestamp - last_report > max_report_delay)
+        | (credit_available > credit_threshold)
+    )
+    return (active & base_fee_acceptable & due).astype(bool)
+
+
+def fetch_state(strategies, multicall=None, block_identifier=None):
+    # State of every strategy as arrays, read with one aggregate call per
+    # BATCH_SIZE strategies, all pinned to the same block
+    if multicall is None:
+        multicall = get_multicall()
+    if block_identifier is None:
+        block_identifier = web3.eth.block_number
+
+    rows = []
+    for i in range(0, len(strategies), BATCH_SIZE):
+        header, batch = _fetch_batch(
+            strategies[i : i + BATCH_SIZE], multicall, block_identifier
+        )
+        rows += batch
+    base_fee_acceptable, timestamp = header
+
+    state = {"block": block_identifier, "timestamp": timestamp}
+    for i, field in enumerate(STATE_FIELDS):
+        state[field] = _uint(row[i] for row in rows)
+    params = [row[len(STATE_FIELDS)].dict() for row in rows]
+    state["debtRatio"] = _uint(p["debtRatio"] for p in params)
+    state["lastReport"] = _uint(p["lastReport"] for p in params)
+    state["creditAvailable"] = _uint(row[-1] for row in rows)
+    state["baseFeeAcceptable"] = np.full(len(rows), bool(base_fee_acceptable))
+    return state
+
+
+def _fetch_batch(strategies, multicall, block_identifier):
+    base_fee = interface.IBaseFee(BASE_FEE_ORACLE)
+    calls = [
+        (base_fee, base_fee.isCurrentBaseFeeAcceptable, ()),
+        (multicall, multicall.getCurrentBlockTimestamp, ()),
+    ]
+    for s in strategies:
+        meta = strategy_metadata(s)
+        s, vault = meta["strategy"], meta["vault"]
+        calls += [(s, getattr(s, f), ()) for f in STATE_FIELDS]
+        calls.append((vault, vault.strategies, (s.address,)))
+        calls.append((vault, vault.creditAvailable["address"], (s.address,)))
+
+    _, _, results = multicall.tryBlockAndAggregate.call(
+        True,
+        [(target.address, fn.encode_input(*args)) for target, fn, args in calls],
+        block_identifier=block_identifier,
+    )
+    values = [fn.decode_output(data) for (_, fn, _), (_, data) in zip(calls, results)]
+
+    per_strategy = len(STATE_FIELDS) + 2
+    rows = [
+        values[2 + i * per_strategy : 2 + (i + 1) * per_strategy]
+        for i in range(len(strategies))
+    ]
+    return values[:2], rows
+
+
+def evaluate(state, force_harvest_trigger_once=None):
+    # (tendTrigger, harvestTrigger) arrays for a state from fetch_state.
+    # forceHarvestTriggerOnce is internal to the strategy and has to be
+    # passed in by the keeper if it was set.
+    n = len(state["balanceOfCollateral"])
+    if force_harvest_trigger_once is None:
+        force_harvest_trigger_once = np.zeros(n, dtype=bool)
+
+    # BaseStrategy.isActive
+    active = (state["debtRatio"] > 0) | (state["estimatedTotalAssets"] > 0)
+
+    tend = tend_trigger(
+        state["balanceOfCollateral"],
+        state["balanceOfDebt"],
+        state["getWantPerYieldBearing"],
+        state["collateralizationRatio"],
+        state["lowerRebalanceTolerance"],
+        state["upperRebalanceTolerance"],
+        state["baseFeeAcceptable"],
+    )
+    harvest = harvest_trigger(
+        active.astype(bool),
+        state["baseFeeAcceptable"],
+        np.asarray(force_harvest_trigger_once, dtype=bool),
+        state["timestamp"],
+        state["lastReport"],
+        state["maxReportDelay"],
+        state["creditAvailable"],
+        state["creditThreshold"],
+    )
+    return tend, harvest
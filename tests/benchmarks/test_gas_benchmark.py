@@ -0,0 +1,114 @@
+import os
+
+import pytest
+from brownie import interface
+from scripts import gas
+from scripts.addresses import CURVE
+
+# Gas of the position-changing paths across position size, rebalance
+# tolerance and the route of MarketLib._swapWantToYieldBearing. Results are
+# compared against gas-benchmark.fork.json, or gas-benchmark.mocks.json with
+# --mocks, and a case the file does not have fails; run with
+# GAS_BENCHMARK_UPDATE=1 to record the current numbers into it. The sweep
+# takes a while, so it only runs with `--gas`.
+
+pytestmark = pytest.mark.gas
+
+SIZES = [1, 10, 100, 500]
+TOLERANCES = [5 * 10 ** 16, 10 ** 17, 2 * 10 ** 17]
+ROUTES = ["lido", "curve"]
+
+
+@pytest.fixture(scope="module")
+def gas_results(mocks):
+    path = gas.results_file("gas-benchmark", "mocks" if mocks else "fork")
+    missing = gas.missing_baseline(path)
+    if missing and not os.getenv("GAS_BENCHMARK_UPDATE"):
+        pytest.skip(f"{missing} (GAS_BENCHMARK_UPDATE=1)")
+    baseline = gas.load(path)
+    results = {}
+    yield baseline, results
+    print(
+        "\n".join(gas.diff({k: baseline[k] for k in results if k in baseline}, results))
+    )
+    if os.getenv("GAS_BENCHMARK_UPDATE"):
+        gas.update(path, results)
+
+
+def route_through_curve(amount, steth, steth_whale):
+    # Dump stETH into the pool until buying stETH on Curve pays more than
+    # minting it on Lido for the whole wind
+    curve = interface.ICurveFi(CURVE)
+    chunk = steth.balanceOf(steth_whale) // 10
+    steth.approve(curve, 2 ** 256 - 1, {"from": steth_whale})
+    for _ in range(10):
+        if curve.get_dy(0, 1, amount) > amount:
+            return
+        curve.exchange(1, 0, chunk, 0, {"from": steth_whale})
+    pytest.skip("cannot move the Curve pool below 1:1 on this fork")
+
+
+@pytest.mark.parametrize("route", ROUTES)
+@pytest.mark.parametrize("tolerance", TOLERANCES)
+@pytest.mark.parametrize("size", SIZES)
+def test_gas(
+    gas_results,
+    test_strategy,
+    vault,
+    token,
+    token_whale,
+    steth,
+    steth_whale,
+    gov,
+    chain,
+    route,
+    tolerance,
+    size,
+):
+    baseline, results = gas_results
+    strategy = test_strategy
+    amount = size * 10 ** 18
+    token.approve(vault, amount, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    strategy.setRebalanceTolerance(tolerance, tolerance, {"from": gov})
+    if route == "curve":
+        route_through_curve(2 * amount, steth, steth_whale)
+
+    used = {"harvest": strategy.harvest({"from": gov}).gas_used}
+
+    # Every other path starts from the wound position and is undone
+    def measure(path, *txs):
+        receipts = [tx() for tx in txs]
+        used[path] = receipts[-1].gas_used
+        chain.undo(len(txs))
+
+    target = strategy.collateralizationRatio()
+    measure(
+        "tend",
+        lambda: strategy.setCollateralizationRatio(
+            target + 2 * tolerance, {"from": gov}
+        ),
+        lambda: strategy.tend({"from": gov}),
+    )
+    assets = strategy.estimatedTotalAssets()
+    measure(
+        "emergencyUnwind", lambda: strategy.emergencyUnwind(assets // 4, {"from": gov})
+    )
+    measure(
+        "emergencyDebtRepayment",
+        lambda: strategy.emergencyDebtRepayment(
+            strategy.balanceOfCollateral() // 10, {"from": gov}
+        ),
+    )
+    measure(
+        "_liquidatePosition",
+        lambda: strategy._liquidatePosition(assets // 4, {"from": gov}),
+    )
+
+    case = f"{route}-{size}-{tolerance / 1e18}"
+    errors = []
+    for path, gas_used in used.items():
+        results[f"{path}[{case}]"] = gas_used
+        errors.append(gas.regression(baseline, f"{path}[{case}]", gas_used))
+    if not os.getenv("GAS_BENCHMARK_UPDATE"):
+        assert not list(filter(None, errors))
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+from scripts import gas
+from scripts.gas_snapshot import measure, snapshot_file
+
+pytestmark = pytest.mark.gas
+
+
+def test_gas_snapshot(strategy, vault, cloner, gov, token_whale, mocks):
+    # Same calls as `brownie run gas_snapshot`, on the test deployment. A
+    # case the committed snapshot does not have fails like a regression.
+    path = snapshot_file("mocks" if mocks else "fork")
+    missing = gas.missing_baseline(path)
+    if missing and not os.getenv("GAS_BENCHMARK_UPDATE"):
+        pytest.skip(f"{missing} (brownie run gas_snapshot)")
+    baseline = gas.load(path)
+    results = measure(strategy, vault, cloner, gov, token_whale)
+    if os.getenv("GAS_BENCHMARK_UPDATE"):
+        gas.save(path, results)
+        return
+    assert set(results) >= set(baseline)
+    errors = [gas.regression(baseline, case, used) for case, used in results.items()]
+    assert not list(filter(None, errors))
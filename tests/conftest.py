@@ -1,36 +1,120 @@
 import pytest
-from brownie import config, convert, interface, Contract
+from brownie import config, convert, interface, web3, Contract
+from brownie.network import rpc
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--mocks",
+        action="store_true",
+        help="run on local stand-ins of Aave, Lido, Curve and Balancer instead of a mainnet fork",
+    )
+    parser.addoption(
+        "--market",
+        help="comma separated want-yieldBearing cells to run (e.g. WETH-stETH), or 'all'",
+    )
+    parser.addoption(
+        "--gas",
+        action="store_true",
+        help="run the gas benchmarks (tests marked gas)",
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "gas: gas benchmark, only runs with --gas")
+
+#The gas sweep deploys and winds a position per case, so it is opt-in
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--gas"):
+        return
+    skip = pytest.mark.skip(reason="gas benchmark, run with --gas")
+    for item in items:
+        if item.get_closest_marker("gas"):
+            item.add_marker(skip)
+
+#want/yieldBearing matrix: cell -> (wantNr, yieldBearingNr). Every test using
+#the deployment runs once per cell, with its own test id (test_x[WETH-stETH])
+#and its own session deployment. Strategy and MarketLib hard-code WETH want
+#and stETH collateral, so only SUPPORTED_MARKETS run unless --market asks.
+MARKETS = {
+    "WETH-stETH": (0, 0),
+    "stETH-stETH": (1, 0),
+    "wstETH-stETH": (2, 0),
+    "WETH-wstETH": (0, 1),
+    "stETH-wstETH": (1, 1),
+    "wstETH-wstETH": (2, 1),
+}
+SUPPORTED_MARKETS = ["WETH-stETH"]
+
+def pytest_generate_tests(metafunc):
+    if "market" in metafunc.fixturenames:
+        option = metafunc.config.getoption("--market")
+        if option == "all":
+            cells = list(MARKETS)
+        elif option:
+            cells = option.split(",")
+            for cell in cells:
+                if cell not in MARKETS:
+                    raise pytest.UsageError(f"unknown market {cell}, expected one of {', '.join(MARKETS)}")
+        else:
+            cells = SUPPORTED_MARKETS
+        metafunc.parametrize("market", cells, indirect=True, scope="session")
+
+#With pytest-xdist (brownie test -n N) every worker launches its own chain on
+#its own port (brownie adds the worker number to the port), so deployments,
+#snapshots, funded accounts and impersonated whales never cross workers
+@pytest.fixture(scope="session", autouse=True)
+def worker(request):
+    worker = getattr(request.config, "workerinput", {}).get("workerid", "master")
+    if worker != "master" and not rpc.is_child():
+        pytest.exit(
+            f"{worker} attached to a node it did not launch at {web3.provider.endpoint_uri}, "
+            "stop it so every worker gets its own chain"
+        )
+    yield worker
+
+#Local protocol stack (scripts/mocks.py), None on a mainnet fork
+@pytest.fixture(scope="session", autouse=True)
+def mocks(request, worker, accounts):
+    if request.config.getoption("--mocks"):
+        from scripts.mocks import deploy
+        yield deploy(accounts[-1])
+    else:
+        yield None
 ##################
 #################
 #Decide on Strategy Contract
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def StrategyChoice(Strategy):    
     choice = Strategy
     yield choice
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def TestStrategyChoice(TestStrategy):    
     choice = TestStrategy #TestStrategy, NewTestStrategy
     yield choice
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def MarketLibClonerChoice(MarketLibCloner):    
     choice = MarketLibCloner 
     yield choice
 #######################################################
+#Cell of the want/yieldBearing matrix, see MARKETS
+@pytest.fixture(scope="session")
+def market(request):
+    yield MARKETS[request.param]
+#######################################################
 #Decide on wantToken = token
-@pytest.fixture(autouse=True)
-def wantNr():    
-    wantNr = 0 #Currently: 
+@pytest.fixture(scope="session")
+def wantNr(market):    
+    wantNr = market[0] #Currently: 
     #0 = WETH,   1 = stETH,   2 = wstETH 
     yield wantNr
 #######################################################
 #Decide on yieldBearing = collateral Token on Money Market
-@pytest.fixture(autouse=True)
-def yieldBearingNr():    
-    yieldBearingNr = 0
-    # 0 = stETH, 1 =    
+@pytest.fixture(scope="session")
+def yieldBearingNr(market):    
+    yieldBearingNr = market[1]
+    # 0 = stETH, 1 = wstETH
     yield yieldBearingNr
 #######################################################
-@pytest.fixture
+@pytest.fixture(scope="session")
 def token(weth, steth, wsteth, wantNr):   
     #signifies want token given by wantNr
     token_address = [
@@ -40,7 +124,7 @@ def token(weth, steth, wsteth, wantNr):
     ]
     yield token_address[wantNr]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def yieldBearing(weth, steth, wsteth, yieldBearingNr):   
     #signifies want token given by wantNr
     yieldBearingToken_address = [
@@ -50,16 +134,16 @@ def yieldBearing(weth, steth, wsteth, yieldBearingNr):
     yield yieldBearingToken_address[yieldBearingNr]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def borrow_token(weth):
     yield weth
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def borrow_whale(weth_whale):
     yield weth_whale
  
 #chainlinkWantToETHPriceFeed
-@pytest.fixture
+@pytest.fixture(scope="session")
 def price_oracle_want_to_eth(wantNr):
     oracle_address = [
     "0x5f4ec3df9cbd43714fe2740f5e3616155c5b8419",  #ETH/USD
@@ -69,17 +153,17 @@ def price_oracle_want_to_eth(wantNr):
     yield interface.AggregatorInterface(oracle_address[wantNr])
 #############################################################
 
-@pytest.fixture
-def weth():
+@pytest.fixture(scope="session")
+def weth(mocks):
     token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2" #WETH
-    yield Contract(token_address)   
+    yield mocks["weth"] if mocks else Contract(token_address)
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def steth(interface):
     #weth
     yield interface.ERC20('0xae7ab96520de3a18e5e111b5eaab095312d7fe84')
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def wsteth(interface):
     contract = interface.IWstETH("0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0")
     yield contract
@@ -96,26 +180,26 @@ def weth_amout(user, weth):
     user.transfer(weth, weth_amout)
     yield weth_amout
 
-@pytest.fixture
-def dai():
+@pytest.fixture(scope="session")
+def dai(mocks):
     dai_address = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
-    yield Contract(dai_address)
+    yield interface.ERC20(dai_address) if mocks else Contract(dai_address)
 
-@pytest.fixture
-def usdc():
+@pytest.fixture(scope="session")
+def usdc(mocks):
     token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
-    yield Contract(token_address)
+    yield interface.ERC20(token_address) if mocks else Contract(token_address)
 
 #@pytest.fixture
 #def steth_whale(accounts):
 #    yield accounts.at("0x2faf487a4414fe77e2327f0bf4ae2a264a776ad2") 
 
-#@pytest.fixture
-#def wsteth_whale(accounts):
-#    yield accounts.at("0x62e41b1185023bcc14a465d350e1dde341557925") 
+@pytest.fixture(scope="session")
+def wsteth_whale(accounts):
+    yield accounts.at("0x62e41b1185023bcc14a465d350e1dde341557925", force=True)
 
-@pytest.fixture
-def token_whale(accounts, wantNr, dai_whale, weth_whale):
+@pytest.fixture(scope="session")
+def token_whale(request, accounts, wantNr):
     #eth_whale = accounts.at("0xda9dfa130df4de4673b89022ee50ff26f6ea73cf", force=True)
     #token_whale_address = [
     #"0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8",   #0 = ETH
@@ -125,10 +209,10 @@ def token_whale(accounts, wantNr, dai_whale, weth_whale):
     #]
     #token_whale_account = accounts.at(token_whale_address[wantNr], force=True) 
     #eth_whale.transfer(token_whale_account, "100000 ether")
-    yield weth_whale
+    yield request.getfixturevalue(["weth_whale", "steth_whale", "wsteth_whale"][wantNr])
 
-@pytest.fixture
-def token_whale_BIG(accounts, wantNr, dai_whale, weth_whale):
+@pytest.fixture(scope="session")
+def token_whale_BIG(token_whale):
     #eth_whale = accounts.at("0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8", force=True)
     #token_whale_address = [
     #"0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8",   #0 = ETH
@@ -140,9 +224,9 @@ def token_whale_BIG(accounts, wantNr, dai_whale, weth_whale):
     #eth_whale.transfer(token_whale_account, eth_whale.balance()*0.95)
     #ethwrapping.deposit({'from': token_whale_account, 'value': token_whale_account.balance()*0.95})
     #yield token_whale_account
-    yield weth_whale
+    yield token_whale
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def steth_holder(accounts, steth):
     #big binance7 wallet
     #acc = accounts.at('0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8', force=True)
@@ -151,7 +235,7 @@ def steth_holder(accounts, steth):
     assert steth.balanceOf(acc)  > 0
     yield acc
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def yieldBearing_whale(accounts, steth):
     #big binance7 wallet
     #acc = accounts.at('0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8', force=True)
@@ -160,7 +244,7 @@ def yieldBearing_whale(accounts, steth):
     assert steth.balanceOf(acc)  > 0
     yield acc
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def steth_whale(accounts, steth):
     #big binance7 wallet
     #acc = accounts.at('0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8', force=True)
@@ -176,57 +260,79 @@ def weth_amount(user, weth):
     user.transfer(weth, weth_amount)
     yield weth_amount
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def weth_whale(accounts):
     yield accounts.at("0x57757e3d981446d585af0d9ae4d7df6d64647806", force=True)
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def dai_whale(accounts, dai):
     #yield accounts.at("0xF977814e90dA44bFA03b6295A0616a897441aceC", force=True)
     yield accounts.at("0x5d3a536e4d6dbd6114cc1ead35777bab948e3643", force=True)
 
-@pytest.fixture
-def yvDAI():
+@pytest.fixture(scope="session")
+def yvDAI(mocks):
+    if mocks:
+        pytest.skip("yvDAI only exists on mainnet")
     vault_address = "0xdA816459F1AB5631232FE5e97a05BBBb94970c95"
     yield Contract(vault_address)
 
-@pytest.fixture(autouse=True)
-def isolation(fn_isolation):
-    pass
-
-@pytest.fixture(autouse=True)
+#Strategy is linked to MarketLib, so the library has to exist before any
+#fixture or test deploys a Strategy, TestStrategy or MarketLibCloner
+@pytest.fixture(scope="session", autouse=True)
 def lib(gov, MarketLib):
     yield MarketLib.deploy({"from": gov})
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def deployment(chain, lib, vault, cloner, healthCheck, multicall):
+    # The shared contracts are deployed once per session (once per worker when
+    # running in parallel) and every test starts from this snapshot, so every
+    # test must end reverted to the deployment state. Brownie keeps a single
+    # snapshot slot: a test calling chain.snapshot() replaces the deployment
+    # in it, and the isolation revert then lands on the test's own state.
+    # Step back with chain.undo (as the gas benchmarks do) instead.
+    chain.snapshot()
+
+@pytest.fixture(autouse=True)
+def isolation(request, chain):
+    # Tests of a market cell start from the snapshot of its deployment. Tests
+    # that do not use the deployment are not parametrized by market and start
+    # from the current state. Both are reverted afterwards.
+    if "market" in request.fixturenames:
+        request.getfixturevalue("deployment")
+    else:
+        chain.snapshot()
+    yield
+    chain.revert()
+
+@pytest.fixture(scope="session")
 def gov(accounts):
     yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def user(accounts):
     yield accounts[0]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def user2(accounts):
     yield accounts[4]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(accounts):
     yield accounts[1]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     yield accounts[2]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def management(accounts):
     yield accounts[3]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist(accounts):
     yield accounts.at("0x16388463d60FFE0661Cf7F1f31a7D658aC790ff7", force=True)
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     yield accounts[5]
 
@@ -274,7 +380,7 @@ def amountBIGTIME2(accounts, token, user2, token_whale):
     token.transfer(user2, amount, {"from": reserve})
     yield amount
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def vault(pm, gov, rewards, guardian, management, token):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
@@ -283,8 +389,10 @@ def vault(pm, gov, rewards, guardian, management, token):
     vault.setManagement(management, {"from": gov})
     yield vault
     
-@pytest.fixture
-def productionVault(wantNr):
+@pytest.fixture(scope="session")
+def productionVault(wantNr, mocks):
+    if mocks:
+        pytest.skip("the production vault only exists on mainnet")
     vault_address = [
     "0xa258C4606Ca8206D8aA700cE2143D7db854D168c",  #yvWETH
     "0xa258C4606Ca8206D8aA700cE2143D7db854D168c",  #yvWETH
@@ -294,20 +402,24 @@ def productionVault(wantNr):
     yield Contract(vault_address[wantNr])
 
 
-@pytest.fixture
-def healthCheck(gov):
-    healthCheck = Contract("0xDDCea799fF1699e98EDF118e0629A974Df7DF012")
+@pytest.fixture(scope="session")
+def healthCheck(gov, mocks):
+    healthCheck = mocks["health_check"] if mocks else Contract("0xDDCea799fF1699e98EDF118e0629A974Df7DF012")
     healthCheck.setProfitLimitRatio(1000, {"from": gov})  #default 100, # 1%
     healthCheck.setlossLimitRatio(100, {"from": gov})  #default 1 # 0.01%
     #healthCheck.setProfitLimitRatio(5000, {"from": gov})  #default 100, # 1%
     #healthCheck.setlossLimitRatio(100, {"from": gov})  #default 1 # 0.01%
     yield healthCheck
 
-@pytest.fixture
-def basefeeChecker():
-    basefee = Contract("0xb5e1CAcB567d98faaDB60a1fD4820720141f064F")
+@pytest.fixture(scope="session")
+def basefeeChecker(mocks):
+    basefee = mocks["base_fee"] if mocks else Contract("0xb5e1CAcB567d98faaDB60a1fD4820720141f064F")
     yield basefee
 
+@pytest.fixture(scope="session")
+def multicall(user, Multicall2):
+    yield user.deploy(Multicall2)
+
 @pytest.fixture
 def maxIL():
     yield 1000e18
@@ -374,7 +486,7 @@ def RELATIVE_APPROX_LOSSY():
 def RELATIVE_APPROX_ROUGH():
     yield 1e-1
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def cloner(
     strategist,
     vault,
@@ -0,0 +1,51 @@
+import pytest
+from brownie import chain, interface
+from scripts.aave_rates import LENDING_POOL, RAY, WETH, ReserveRateModel
+from scripts.log_index import decode_log
+
+WAD = 10 ** 18
+
+
+def current_variable_borrow_rate(block):
+    reserve = interface.ILendingPool(LENDING_POOL).getReserveData.call(
+        WETH, block_identifier=block
+    )
+    return reserve[4]
+
+
+def test_rate_parity_after_borrow(vault, strategy, token, amount, user, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+
+    before = ReserveRateModel.from_chain(block_identifier=chain.height)
+    tx = strategy.harvest({"from": gov})
+    borrowed = sum(
+        args["amount"]
+        for event, args in filter(None, (decode_log(log) for log in tx.logs))
+        if event == "Borrow"
+    )
+    assert borrowed > 0
+
+    # The reserve was last updated by our borrow in this block
+    after = ReserveRateModel.from_chain(block_identifier=tx.block_number)
+    rate = current_variable_borrow_rate(tx.block_number)
+    assert after.variable_borrow_rate(0)[0] == rate
+    # Predicted from the previous block, only interest accrual differs
+    assert before.variable_borrow_rate(borrowed)[0] == pytest.approx(rate, rel=1e-4)
+
+
+def test_max_borrow_stops_at_max_rate():
+    model = ReserveRateModel(
+        700_000 * WAD, 1_000 * WAD, 300_000 * WAD, 8 * RAY // 10, 0, 8 * RAY // 100, RAY
+    )
+    max_rate = 44 * 10 ** 24
+    headroom = model.max_borrow(max_rate)
+    below, above = model.variable_borrow_rate([headroom, headroom + 1])
+    assert below <= max_rate < above
+    assert model.max_wind(max_rate, 2 * WAD) == headroom
+
+    # Above the optimal utilization slope2 applies
+    rates = model.variable_borrow_rate([0, 450_000 * WAD, 650_000 * WAD])
+    assert rates[0] < rates[1] <= 8 * RAY // 100 < rates[2]
+    assert model.max_borrow(rates[0] - 1) == 0
+    assert model.max_borrow(RAY * 10) == model.available_liquidity
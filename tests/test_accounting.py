@@ -0,0 +1,173 @@
+import pytest
+from hypothesis import assume, given, settings, strategies as st
+from scripts.accounting import (
+    Revert,
+    estimated_total_assets,
+    predict_harvest,
+    prepare_return,
+)
+
+WAD = 10 ** 18
+DENOMINATOR = 10_000
+
+amounts = st.integers(min_value=0, max_value=10 ** 24)
+prices = st.integers(min_value=9 * 10 ** 17, max_value=WAD)
+
+
+@st.composite
+def states(draw, debt=True):
+    collateral = draw(amounts)
+    price = draw(prices)
+    target = draw(st.integers(min_value=12 * 10 ** 17, max_value=3 * WAD))
+    max_debt = collateral * price // target if debt else 0
+    return {
+        "want": draw(amounts),
+        "yield_bearing": draw(st.integers(min_value=0, max_value=10 ** 20)),
+        "collateral": collateral,
+        "debt": draw(st.integers(min_value=0, max_value=max_debt)),
+        "price": price,
+        "target": target,
+        "lower": WAD // 10,
+        "liquidation_ratio": 11 * 10 ** 17,
+        "min_single_trade": draw(st.integers(min_value=0, max_value=10 ** 18)),
+        "max_single_trade": draw(st.integers(min_value=10 ** 15, max_value=10 ** 24)),
+    }
+
+
+def lossy_unwind(loss_bps):
+    # Frees the requested want minus `loss_bps`, with no debt to repay
+    def unwind(state, want_amount):
+        withdrawn = min(want_amount * WAD // state["price"], state["collateral"])
+        freed = withdrawn * state["price"] // WAD
+        return {
+            **state,
+            "collateral": state["collateral"] - withdrawn,
+            "want": state["want"] + freed * (DENOMINATOR - loss_bps) // DENOMINATOR,
+        }
+
+    return unwind
+
+
+def no_unwind(state, want_amount):
+    raise AssertionError("liquidatePosition should not unwind")
+
+
+@settings(max_examples=2_000, deadline=None)
+@given(states(), amounts, amounts)
+def test_prepare_return_books_either_profit_or_loss(state, outstanding, total_debt):
+    # Reverting states (SafeMath, unsafe ratio) are skipped, the rest never
+    # report profit and loss at once or a negative amount
+    try:
+        profit, loss, debt_payment, _ = prepare_return(outstanding, total_debt, state)
+    except Revert:
+        return
+    assert profit == 0 or loss == 0
+    assert min(profit, loss, debt_payment) >= 0
+
+
+@settings(max_examples=2_000, deadline=None)
+@given(states(debt=False), amounts, amounts)
+def test_below_min_single_trade_does_not_liquidate(state, outstanding, total_debt):
+    assets = estimated_total_assets(state)
+    state["min_single_trade"] += outstanding + max(assets - total_debt, 0) + 1
+    profit, loss, debt_payment, after = prepare_return(
+        outstanding, total_debt, state, no_unwind
+    )
+    assert after == state
+    assert profit + debt_payment <= state["want"]
+    assert debt_payment <= outstanding
+    assert profit - loss == min(assets - total_debt, state["want"])
+
+
+@settings(max_examples=2_000, deadline=None)
+@given(states(debt=False), amounts, amounts)
+def test_want_below_profit_pays_want(state, outstanding, total_debt):
+    state["min_single_trade"] = 2 ** 256 - 1
+    assume(state["want"] < estimated_total_assets(state) - total_debt)
+    profit, loss, debt_payment, _ = prepare_return(outstanding, total_debt, state)
+    assert (profit, loss, debt_payment) == (state["want"], 0, 0)
+
+
+@settings(max_examples=2_000, deadline=None)
+@given(states(debt=False), amounts, amounts, st.integers(min_value=0, max_value=2_000))
+def test_liquidation_losses_are_reported(state, outstanding, total_debt, loss_bps):
+    assets = estimated_total_assets(state)
+    to_liquidate = outstanding + max(assets - total_debt, 0)
+    needed = min(to_liquidate, state["max_single_trade"])
+    profit, loss, debt_payment, after = prepare_return(
+        outstanding, total_debt, state, lossy_unwind(loss_bps)
+    )
+    # Liquidation never books profit, and whatever liquidatePosition could not
+    # free is netted against profit or reported as loss
+    assert profit - loss <= assets - total_debt
+    unwound = to_liquidate >= state["min_single_trade"] and state["want"] < needed
+    liquidation_loss = max(needed - after["want"], 0) if unwound else 0
+    if profit < after["want"]:
+        assert profit - loss == assets - total_debt - liquidation_loss
+    if unwound and loss_bps > 0 and after["want"] > state["want"]:
+        assert estimated_total_assets(after) < assets
+
+
+@settings(max_examples=2_000, deadline=None)
+@given(states(debt=False), amounts, amounts, st.integers(min_value=0, max_value=2_000))
+def test_report_fits_want_balance(state, outstanding, total_debt, loss_bps):
+    # Vault.report pulls profit + debtPayment from the strategy
+    assume(estimated_total_assets(state) - total_debt <= state["max_single_trade"])
+    profit, _, debt_payment, after = prepare_return(
+        outstanding, total_debt, state, lossy_unwind(loss_bps)
+    )
+    assert profit + debt_payment <= after["want"]
+
+
+def test_profit_above_max_single_trade_exceeds_want():
+    # Known issue: when maxSingleTrade caps the liquidation below the profit,
+    # profit is cut to the want balance but debtPayment is kept, and
+    # Vault.report reverts on the transfer
+    state = {
+        "want": 0,
+        "yield_bearing": 0,
+        "collateral": 20 * WAD,
+        "debt": 0,
+        "price": WAD,
+        "target": 2 * WAD,
+        "lower": WAD // 10,
+        "min_single_trade": 0,
+        "max_single_trade": 8 * WAD,
+    }
+    profit, loss, debt_payment, after = prepare_return(
+        5 * WAD, 10 * WAD, state, lossy_unwind(0)
+    )
+    assert (profit, loss, debt_payment) == (8 * WAD, 0, 5 * WAD)
+    assert profit + debt_payment > after["want"]
+
+
+def test_differential_harvest(vault, strategy, token, amount, user, gov, chain):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": gov})
+    chain.sleep(86400)
+    chain.mine(1)
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+
+    tx = strategy.harvest({"from": gov})
+    event = tx.events["Harvested"]
+    debt_after = strategy.balanceOfDebt()
+
+    # Interest accrues every second, so the prediction reads the state the
+    # harvest started from at the timestamp of the harvest block
+    chain.undo()
+    if tx.timestamp > chain[-1].timestamp:
+        chain.mine(timestamp=tx.timestamp)
+    profit, loss, debt_payment, state = predict_harvest(strategy)
+    assert debt_after <= state["debt"]
+    if state["yield_bearing"] == 0:
+        assert (event["profit"], event["loss"], event["debtPayment"]) == (
+            profit,
+            loss,
+            debt_payment,
+        )
+    else:
+        # Loose stETH is swapped in the same unwind, see predict_harvest
+        assert event["profit"] == pytest.approx(profit, rel=1e-6, abs=10 ** 12)
+        assert event["loss"] == pytest.approx(loss, rel=1e-6, abs=10 ** 12)
+        assert event["debtPayment"] == pytest.approx(debt_payment, rel=1e-6)
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from scripts.alerts import MAX_MESSAGE_LENGTH, AlertDispatcher, TokenBucket
+
+
+@pytest.fixture
+def chat_api():
+    # Local stand-in for the Telegram bot API
+    received = []
+    failures = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if failures:
+                status, response = failures.pop(0)
+            else:
+                received.append(body)
+                status, response = 200, {"ok": True}
+            data = json.dumps(response).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.received = received
+    server.failures = failures
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+
+
+def test_submit_does_not_block(chat_api):
+    dispatcher = AlertDispatcher("key", base_url=chat_api.url, chat_rate=0.5)
+    dispatcher.submit(1, "first")
+    dispatcher.flush()
+
+    # The chat bucket is empty now: the next delivery waits ~2s, submit does not
+    start = time.monotonic()
+    dispatcher.submit(1, "second")
+    assert time.monotonic() - start < 0.1
+    dispatcher.close()
+    assert [m["text"] for m in chat_api.received] == ["first", "second"]
+
+
+def test_reports_are_coalesced_per_chat(chat_api):
+    dispatcher = AlertDispatcher("key", base_url=chat_api.url, chat_rate=0.5)
+    dispatcher.submit(1, "warm up")
+    dispatcher.flush()
+    # Queued while the worker waits for the chat rate limit
+    for i in range(3):
+        dispatcher.submit(1, f"report {i}")
+        dispatcher.submit(2, f"other {i}")
+    dispatcher.close()
+
+    by_chat = {}
+    for message in chat_api.received:
+        by_chat.setdefault(message["chat_id"], []).append(message["text"])
+    assert len(by_chat["1"]) < 4
+    assert "\n".join(by_chat["1"][1:]) == "report 0\nreport 1\nreport 2"
+    assert len(by_chat["2"]) < 3
+    assert "\n".join(by_chat["2"]) == "other 0\nother 1\nother 2"
+
+
+def test_oversized_report_is_split(chat_api):
+    dispatcher = AlertDispatcher("key", base_url=chat_api.url, chat_rate=100)
+    lines = [f"Strategy {i}: everything looks OK" for i in range(300)]
+    dispatcher.submit(1, "\n".join(["```", *lines, "```"]))
+    dispatcher.submit(1, "x" * (MAX_MESSAGE_LENGTH + 1))
+    dispatcher.close()
+
+    texts = [m["text"] for m in chat_api.received]
+    assert len(texts) > 2 and not dispatcher.failed
+    assert all(len(text) <= MAX_MESSAGE_LENGTH for text in texts)
+    reports = [t for t in texts if t.startswith("```")]
+    assert all(t.endswith("```") for t in reports)
+    assert [l for t in reports for l in t.split("\n") if l != "```"] == lines
+    assert "".join(t for t in texts if t not in reports) == "x" * (
+        MAX_MESSAGE_LENGTH + 1
+    )
+
+
+def test_retries_with_backoff(chat_api):
+    chat_api.failures.extend(
+        [
+            (500, {"ok": False}),
+            (429, {"ok": False, "parameters": {"retry_after": 0.1}}),
+        ]
+    )
+    dispatcher = AlertDispatcher("key", base_url=chat_api.url, backoff=0.05)
+    dispatcher.submit(1, "alert")
+    dispatcher.close()
+
+    assert [m["text"] for m in chat_api.received] == ["alert"]
+    assert dispatcher.failed == []
+
+
+def test_gives_up_on_client_errors(chat_api):
+    chat_api.failures.append((400, {"ok": False}))
+    dispatcher = AlertDispatcher("key", base_url=chat_api.url, backoff=0.05)
+    dispatcher.submit(1, "bad")
+    dispatcher.close()
+
+    assert chat_api.received == []
+    assert [p["text"] for p in dispatcher.failed] == ["bad"]
+
+
+def test_worker_survives_delivery_errors(chat_api, monkeypatch):
+    dispatcher = AlertDispatcher("key", base_url=chat_api.url)
+    deliver = dispatcher._deliver
+
+    def buggy(chat_id, text, parse_mode):
+        if text == "bad":
+            raise TypeError("bug")
+        return deliver(chat_id, text, parse_mode)
+
+    monkeypatch.setattr(dispatcher, "_deliver", buggy)
+    dispatcher.submit(1, "bad")
+    dispatcher.flush()
+    dispatcher.submit(1, "good")
+    dispatcher.close()
+
+    assert [m["text"] for m in chat_api.received] == ["good"]
+    assert [p["text"] for p in dispatcher.failed] == ["bad"]
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # First token is available immediately, the next four take 50ms each
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.1)
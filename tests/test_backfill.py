@@ -0,0 +1,87 @@
+import json
+import pytest
+from brownie import chain
+from scripts.backfill import backfill, chunks
+from scripts.history import HealthStore
+
+
+def test_chunks():
+    assert chunks(10, 25, 5) == [(10, 14), (15, 19), (20, 24), (25, 25)]
+
+
+def test_backfill_matches_historical_state(
+    vault, strategy, token, amount, user, gov, multicall
+):
+    from_block = chain.height + 1
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    chain.mine(3)
+    strategy.emergencyUnwind(amount // 4, {"from": vault.management()})
+    chain.mine(3)
+    to_block = chain.height
+
+    store = HealthStore()
+    written = backfill(
+        strategy, from_block, to_block, store, multicall, chunk_size=3, workers=4
+    )
+    assert written == to_block - from_block + 1
+
+    rows = store.range(strategy.address, columns=["block", "debt", "collateral"])
+    assert [r[0] for r in rows] == list(range(from_block, to_block + 1))
+    for block, debt, collateral in rows:
+        assert debt == pytest.approx(
+            strategy.balanceOfDebt(block_identifier=block) / 1e18
+        )
+        assert collateral == pytest.approx(
+            strategy.balanceOfCollateral(block_identifier=block) / 1e18
+        )
+
+
+def test_backfill_starts_before_deployment(
+    vault, cloner, strategist, rewards, keeper, gov, multicall
+):
+    # The clone has no code at from_block, those blocks are skipped
+    from_block = chain.height
+    tx = cloner.cloneMarketLib(
+        vault, strategist, rewards, keeper, "Clone", {"from": gov}
+    )
+    clone = tx.events["Cloned"]["clone"]
+    chain.mine(3)
+    to_block = chain.height
+
+    store = HealthStore()
+    written = backfill(clone, from_block, to_block, store, multicall, chunk_size=2)
+
+    blocks = [r[0] for r in store.range(clone, columns=["block"])]
+    assert blocks == list(range(tx.block_number, to_block + 1))
+    assert written == len(blocks)
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path, strategy, multicall):
+    chain.mine(10)
+    to_block = chain.height
+    from_block = to_block - 9
+    checkpoint = tmp_path / "checkpoint.json"
+
+    # The first two chunks finished before the interruption
+    done = [[from_block, from_block + 2], [from_block + 3, from_block + 5]]
+    checkpoint.write_text(json.dumps({"done": done}))
+
+    store = HealthStore()
+    written = backfill(
+        strategy,
+        from_block,
+        to_block,
+        store,
+        multicall,
+        step=2,
+        chunk_size=3,
+        checkpoint=checkpoint,
+    )
+
+    blocks = [r[0] for r in store.range(strategy.address, columns=["block"])]
+    assert blocks == [from_block + 6, from_block + 8]
+    assert written == 2
+    assert len(json.loads(checkpoint.read_text())["done"]) == 4
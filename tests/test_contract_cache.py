@@ -0,0 +1,78 @@
+import pytest
+from brownie import network
+from scripts import contract_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(contract_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(contract_cache, "_contracts", {})
+    yield contract_cache
+
+
+def test_cache_works_offline_after_warm_up(cache, vault, strategy, monkeypatch):
+    warm = cache.cached_contract(vault.address)
+    assert warm.abi == vault.abi
+    assert (cache.CACHE_DIR / cache.chain_key() / f"{vault.address}.json").exists()
+
+    # A new process starts with an empty memory cache and no explorer access
+    monkeypatch.setattr(cache, "_contracts", {})
+
+    def offline(address):
+        raise ConnectionError("explorer is not reachable")
+
+    monkeypatch.setattr(cache, "_fetch", offline)
+
+    cold = cache.cached_contract(vault.address)
+    assert cold.abi == vault.abi
+    assert cold.strategies(strategy).dict() == vault.strategies(strategy).dict()
+
+
+def test_abis_are_content_addressed(
+    cache, cloner, strategy, vault, strategist, rewards, keeper, gov
+):
+    clone = cloner.cloneMarketLib(
+        vault, strategist, rewards, keeper, "Clone", {"from": gov}
+    ).events["Cloned"]["clone"]
+    key = cache.chain_key()
+    cache._write_entry(key, strategy.address, "Strategy", strategy.abi, None)
+    cache._write_entry(key, clone, "Strategy", strategy.abi, cache._code_hash(clone))
+
+    assert len(list((cache.CACHE_DIR / "abis").glob("*.json"))) == 1
+    assert cache.cached_contract(clone).name() == "Clone"
+
+
+def test_invalidate(cache, vault, strategy):
+    key = cache.chain_key()
+    cache._write_entry(key, vault.address, "Vault", vault.abi, None)
+    cache._write_entry(key, strategy.address, "Strategy", strategy.abi, None)
+
+    assert cache.invalidate(key, [vault.address]) == 1
+    assert cache._read_entry(key, vault.address) is None
+    assert cache._read_entry(key, strategy.address) is not None
+
+    assert cache.invalidate(key) == 1
+    assert list((cache.CACHE_DIR / "abis").glob("*.json")) == []
+
+
+def test_key_includes_network(cache, vault):
+    cache.cached_contract(vault.address)
+
+    # A fork of mainnet has chain id 1 too, it must not share mainnet entries
+    assert network.show_active() in cache.chain_key()
+    assert [p.name for p in cache.CACHE_DIR.iterdir() if p.name != "abis"] == [
+        cache.chain_key()
+    ]
+
+
+def test_redeploy_is_refetched(cache, vault, strategy, monkeypatch):
+    # An entry written for other code at the same address, as left behind by
+    # a previous deployment on a development chain
+    cache._write_entry(cache.chain_key(), vault.address, "Strategy", strategy.abi, "0")
+
+    fetched = []
+    monkeypatch.setattr(cache, "_fetch", lambda a: fetched.append(a) or vault)
+
+    assert cache.cached_contract(vault.address).abi == vault.abi
+    assert fetched == [vault.address]
+    assert cache._read_entry(cache.chain_key(), vault.address)["abi"] == vault.abi
@@ -0,0 +1,80 @@
+import pytest
+from scripts.exit_planner import ExitIncomplete, execute, plan_exit
+from scripts.stableswap import StableSwap
+
+WAD = 10 ** 18
+
+POOL = StableSwap([300_000 * WAD, 350_000 * WAD], 5000, 4_000_000, 5 * 10 ** 9)
+
+
+@pytest.fixture
+def position():
+    yield {
+        "collateral": 40_000 * WAD,
+        "debt": 19_000 * WAD,
+        "want": 0,
+        "price": 99 * 10 ** 16,
+        "target": 2 * WAD,
+        "lower": WAD // 10,
+        "liquidation_ratio": 1234 * 10 ** 15,
+        "min_single_trade": 10 ** 15,
+        "flashloan_maximum": 10 ** 30,
+    }
+
+
+def test_plan_drains_position(position):
+    plan = plan_exit(position, POOL)
+    assert plan["remaining"] < position["min_single_trade"]
+    assert plan["steps"][-1]["debt"] == 0
+    assert plan["cost"] == plan["slippage"] + plan["gas"]
+    for step in plan["steps"]:
+        assert step["received"] >= step["withdrawn"] * 9_800 // 10_000
+
+
+def test_plan_trades_gas_against_slippage(position):
+    # Arbitrage restores the pool between harvests: small chunks pay less
+    # slippage, and only expensive gas makes a single chunk worth it
+    cheap_gas = plan_exit(position, POOL, gas_price=0, recovery=1, max_chunks=10)
+    expensive_gas = plan_exit(position, POOL, gas_price=1e-5, recovery=1)
+    assert len(cheap_gas["steps"]) > len(expensive_gas["steps"])
+    assert cheap_gas["slippage"] < expensive_gas["slippage"]
+
+
+def test_plan_respects_flashloan_and_slippage_limits(position):
+    capped = plan_exit({**position, "flashloan_maximum": 5_000 * WAD}, POOL)
+    # The first unwind only repays what the Balancer vault can lend
+    assert capped["steps"][0]["debt"] >= position["debt"] - 5_000 * WAD
+    assert len(capped["steps"]) > 1
+    # A shallow pool cannot absorb the position within maxSlippage
+    shallow = StableSwap([20_000 * WAD, 25_000 * WAD], 5000, 4_000_000)
+    assert plan_exit(position, shallow) is None
+
+
+def test_keeper_drains_strategy(vault, strategy, token, amount, user, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": gov})
+    max_single_trade = strategy.maxSingleTrade()
+
+    with pytest.raises(ValueError):
+        execute(strategy, gov)
+
+    vault.updateStrategyDebtRatio(strategy, 0, {"from": gov})
+    txs = execute(strategy, gov)
+    assert len(txs) >= 1
+    assert strategy.estimatedTotalAssets() < strategy.minSingleTrade()
+    assert strategy.balanceOfDebt() == 0
+    assert strategy.maxSingleTrade() == max_single_trade
+
+
+def test_keeper_reports_open_position(vault, strategy, token, amount, user, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": gov})
+    vault.updateStrategyDebtRatio(strategy, 0, {"from": gov})
+
+    # No harvest left in the budget: the open position is an error
+    with pytest.raises(ExitIncomplete) as e:
+        execute(strategy, gov, max_chunks=0)
+    assert e.value.txs == []
+    assert e.value.remaining == strategy.estimatedTotalAssets()
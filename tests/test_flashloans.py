@@ -0,0 +1,109 @@
+import pytest
+from scripts.addresses import BALANCER
+from scripts.flashloans import (
+    flashloan_report,
+    max_safe_unwind,
+    next_wind,
+    unwind_capped,
+)
+from scripts.history import HealthStore
+from scripts.leverage import unwind
+from scripts.monitor import format_report, snapshot_strategy
+
+WAD = 10 ** 18
+PRICE = 99 * 10 ** 16
+TARGET = 2 * WAD
+
+
+@pytest.mark.parametrize("liquidity", [0, 1_000 * WAD, 9_000 * WAD, 15_000 * WAD])
+def test_max_safe_unwind_is_the_largest_that_does_not_revert(liquidity):
+    collateral, debt = 20_000 * WAD, 9_900 * WAD
+
+    def reverts(requested):
+        result = unwind(collateral, debt, 0, requested, PRICE, TARGET, liquidity)
+        return bool(result["reverted"][0])
+
+    safe = max_safe_unwind(collateral, debt, PRICE, TARGET, liquidity)
+    assert unwind_capped(debt, liquidity) == (liquidity < debt)
+    if liquidity == 0:
+        assert safe == 0
+        return
+    assert not reverts(safe)
+    if unwind_capped(debt, liquidity):
+        assert reverts(safe + 1)
+    else:
+        # The request withdraws every unit of collateral
+        assert (
+            unwind(collateral, debt, 0, safe, PRICE, TARGET, liquidity)["collateral"][0]
+            == 0
+        )
+
+
+def test_report_flags_capped_unwind():
+    snapshot = {
+        "symbol": "WETH",
+        "balanceOfCollateral": 20_000 * WAD,
+        "balanceOfDebt": 9_900 * WAD,
+        "getWantPerYieldBearing": PRICE,
+        "collateralizationRatio": TARGET,
+        "balancerLiquidity": 15_000 * WAD,
+    }
+    assert flashloan_report(snapshot)[1] == "Flashloan liquidity covers a full unwind"
+    snapshot["balancerLiquidity"] = 5_000 * WAD
+    assert "Largest safe unwind" in flashloan_report(snapshot)[1]
+    snapshot["balancerLiquidity"] = None
+    assert flashloan_report(snapshot) == []
+
+
+def test_report_flags_capped_wind():
+    snapshot = {
+        "symbol": "WETH",
+        "balanceOfWant": 400 * WAD,
+        "creditAvailable": 700 * WAD,
+        "maxSingleTrade": 1_000 * WAD,
+        "balanceOfDebt": 0,
+        "collateralizationRatio": TARGET,
+        "balancerLiquidity": 1_000 * WAD,
+    }
+    # A wind of 1000 at a ratio of 2 flashloans 1000
+    assert next_wind(400 * WAD, 700 * WAD, 1_000 * WAD) == 1_000 * WAD
+    assert flashloan_report(snapshot)[2] == "Flashloan liquidity covers the next wind"
+    snapshot["balancerLiquidity"] = 999 * WAD
+    assert "under-levered" in flashloan_report(snapshot)[2]
+    snapshot["creditAvailable"] = None
+    assert flashloan_report(snapshot)[2] == "Flashloan cover of the next wind: n/a"
+
+
+def test_liquidity_history():
+    store = HealthStore()
+    snapshots = [
+        {
+            "address": "0x0000000000000000000000000000000000000001",
+            "block": block,
+            "timestamp": 1_600_000_000 + block * 12,
+            "balanceOfCollateral": 200 * WAD,
+            "balanceOfDebt": 100 * WAD,
+            "estimatedTotalAssets": 100 * WAD,
+            "getCurrentCollRatio": 2 * WAD,
+            "getWantPerYieldBearing": WAD,
+            "getLiquidationRatio": 13 * 10 ** 17,
+            "strategies": {"debtRatio": 10_000},
+            "balancerLiquidity": liquidity,
+        }
+        for block, liquidity in [(1, 150 * WAD), (2, 50 * WAD), (3, None)]
+    ]
+    store.append_many(snapshots)
+    rows = store.liquidity_range(snapshots[0]["address"])
+    assert [(r[0], r[2], r[3]) for r in rows] == [(1, 100, 150), (2, 100, 50)]
+
+
+def test_snapshot_reads_liquidity(
+    vault, strategy, token, weth, amount, user, gov, multicall
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": gov})
+
+    snapshot = snapshot_strategy(strategy, multicall)
+    assert snapshot["balancerLiquidity"] == weth.balanceOf(BALANCER)
+    assert flashloan_report(snapshot)[0] in format_report(snapshot)
@@ -0,0 +1,70 @@
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from scripts import gas
+
+
+def test_results_round_trip(tmp_path):
+    path = tmp_path / "gas.json"
+    assert gas.load(path) == {}
+    gas.save(path, {"tend[lido]": 900_000, "harvest[lido]": 1_000_000})
+    assert json.loads(path.read_text())["version"] == gas.VERSION
+    assert list(gas.load(path)) == ["harvest[lido]", "tend[lido]"]
+
+    path.write_text(json.dumps({"version": 0, "results": {}}))
+    with pytest.raises(ValueError):
+        gas.load(path)
+
+
+def test_results_file_per_stack():
+    assert gas.results_file("gas-snapshot", "mocks").name == "gas-snapshot.mocks.json"
+    with pytest.raises(ValueError):
+        gas.results_file("gas-snapshot", "development")
+
+
+def test_missing_baseline(tmp_path):
+    path = tmp_path / "gas-benchmark.mocks.json"
+    assert "record a baseline first" in gas.missing_baseline(path)
+    gas.save(path, {})
+    assert gas.missing_baseline(path) is None
+
+
+def test_regression_and_diff():
+    baseline = {"harvest[lido]": 1_000_000, "tend[lido]": 900_000}
+    assert gas.regression(baseline, "harvest[lido]", 1_050_000) is None
+    assert "+5.10%" in gas.regression(baseline, "harvest[lido]", 1_051_000)
+    assert "not in the baseline" in gas.regression(baseline, "harvest[curve]", 1)
+
+    results = {"harvest[lido]": 990_000, "harvest[curve]": 1_200_000}
+    assert gas.diff(baseline, results) == [
+        "+ harvest[curve]: 1200000",
+        "  harvest[lido]: 1000000 -> 990000 (-10000, -1.00%)",
+        "- tend[lido]: 900000",
+    ]
+
+
+def test_parallel_updates_keep_every_case(tmp_path):
+    # One update per test worker, all at once
+    path = tmp_path / "gas.json"
+    gas.save(path, {"harvest[lido]": 1_000_000})
+    cases = {f"tend[{i}]": 900_000 + i for i in range(16)}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda case: gas.update(path, dict([case])), cases.items()))
+    assert gas.load(path) == {"harvest[lido]": 1_000_000, **cases}
+
+
+def test_import_without_fcntl():
+    # Windows has no fcntl, the lock is only chosen when a file is updated
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; sys.modules['fcntl'] = None; import scripts.gas",
+        ],
+        cwd=Path(__file__).parents[1],
+        check=True,
+    )
@@ -0,0 +1,89 @@
+import pytest
+from brownie import chain
+from scripts.history import HealthStore
+from scripts.monitor import snapshot_strategy
+
+STRATEGY = "0x0000000000000000000000000000000000000001"
+
+
+def make_snapshot(block, coll_ratio, debt=100e18, address=STRATEGY):
+    return {
+        "address": address,
+        "block": block,
+        "timestamp": 1_600_000_000 + block * 12,
+        "balanceOfCollateral": int(debt * coll_ratio),
+        "balanceOfDebt": int(debt),
+        "estimatedTotalAssets": int(debt * (coll_ratio - 1)),
+        "getCurrentCollRatio": int(coll_ratio * 1e18),
+        "getWantPerYieldBearing": int(1e18),
+        "getLiquidationRatio": int(1.3333e18),
+        "strategies": {"debtRatio": 10_000},
+    }
+
+
+def test_range_and_downsample():
+    store = HealthStore()
+    store.append_many(
+        [make_snapshot(b, 2 + (b % 10) / 100) for b in range(1, 101)]
+        + [make_snapshot(b, 3, address=STRATEGY[:-1] + "2") for b in range(1, 101)]
+    )
+    assert store.last_block(STRATEGY) == 100
+
+    rows = store.range(STRATEGY, 10, 19, columns=["block", "coll_ratio"])
+    assert [r[0] for r in rows] == list(range(10, 20))
+    assert rows[0][1] == pytest.approx(2.0)
+
+    # 120s buckets are 10 blocks wide
+    buckets = store.downsample(STRATEGY, 120)
+    assert sum(b[1] for b in buckets) == 100
+    assert len(buckets) == 11
+    full = buckets[1]
+    coll_ratio = 2 + 3 * 3
+    assert full[1] == 10
+    assert full[coll_ratio : coll_ratio + 3] == pytest.approx((2.0, 2.045, 2.09))
+
+
+def test_closest_to_liquidation():
+    store = HealthStore()
+    store.append_many(
+        [
+            make_snapshot(1, 2.0),
+            make_snapshot(2, 1.5),
+            make_snapshot(3, 1.4, debt=0),
+            make_snapshot(4, 1.8),
+        ]
+    )
+    row = store.closest_to_liquidation(STRATEGY)
+    assert row[1] == 2
+    assert store.closest_to_liquidation(STRATEGY, from_block=3)[1] == 4
+
+
+def test_store_monitor_snapshots(
+    tmp_path, vault, strategy, token, amount, user, gov, multicall
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    store = HealthStore(tmp_path / "history.sqlite")
+    snapshot = snapshot_strategy(strategy, multicall)
+    store.append(snapshot)
+    store.close()
+
+    store = HealthStore(tmp_path / "history.sqlite")
+    (row,) = store.range(strategy.address)
+    assert row[1] == chain.height
+    assert row[2] == chain[-1].timestamp
+    assert row[4] == pytest.approx(strategy.balanceOfDebt() / 1e18)
+    assert row[6] == pytest.approx(strategy.getCurrentCollRatio() / 1e18)
+
+
+def test_incomplete_snapshots_are_skipped():
+    # A call that failed in the aggregate leaves a None the NOT NULL columns
+    # cannot store
+    store = HealthStore()
+    failed = make_snapshot(2, 2.0)
+    failed["getCurrentCollRatio"] = None
+    assert store.append_many([make_snapshot(1, 2.0), failed]) == 1
+    assert [row[1] for row in store.range(STRATEGY)] == [1]
@@ -0,0 +1,115 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from brownie import interface
+from scripts.addresses import BALANCER, CURVE, STETH
+from scripts.leverage import simulate_deposits, unwind
+from scripts.log_index import decode_log
+
+
+def events(tx, name):
+    decoded = filter(None, (decode_log(log) for log in tx.logs))
+    return [args for event, args in decoded if event == name]
+
+
+def test_wind_parity(vault, strategy, token, weth, amount, user, gov):
+    curve = interface.ICurveFi(CURVE)
+    steth = interface.ISteth(STETH)
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+
+    def swap(amounts):
+        # MarketLib._swapWantToYieldBearing: Lido unless Curve pays more
+        lido = not steth.isStakingPaused.call()
+        quote = lambda a: curve.get_dy(0, 1, a) if a else 0
+        return np.array(
+            [a if lido and quote(a) <= a else quote(a) for a in amounts], dtype=object
+        )
+
+    expected = simulate_deposits(
+        [amount],
+        strategy.getWantPerYieldBearing(),
+        strategy.collateralizationRatio(),
+        weth.balanceOf(BALANCER),
+        strategy.minSingleTrade(),
+        strategy.maxSingleTrade(),
+        swap,
+    )
+    tx = strategy.harvest({"from": gov})
+
+    (flashloan,) = events(tx, "FlashLoan")
+    assert flashloan["amount"] == expected["flashloan"][0]
+    assert strategy.balanceOfDebt() == pytest.approx(expected["debt"][0], rel=1e-12)
+    assert strategy.balanceOfCollateral() == pytest.approx(
+        expected["collateral"][0], rel=1e-12
+    )
+    assert strategy.getCurrentCollRatio() == pytest.approx(
+        expected["collRatio"][0], rel=1e-12
+    )
+
+
+def test_unwind_parity(vault, strategy, token, weth, amount, user, gov):
+    curve = interface.ICurveFi(CURVE)
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": gov})
+
+    requested = amount // 4
+    swap = np.vectorize(lambda a: curve.get_dy(1, 0, a) if a else 0, otypes=[object])
+    expected = unwind(
+        strategy.balanceOfCollateral(),
+        strategy.balanceOfDebt(),
+        strategy.balanceOfWant(),
+        requested,
+        strategy.getWantPerYieldBearing(),
+        strategy.collateralizationRatio(),
+        weth.balanceOf(BALANCER),
+        swap,
+        liquidation_ratio=strategy.getLiquidationRatio(),
+    )
+    assert not expected["reverted"][0]
+    tx = strategy.emergencyUnwind(requested, {"from": vault.management()})
+
+    (withdrawn,) = events(tx, "Withdraw")
+    assert withdrawn["amount"] == expected["withdrawn"][0]
+    # Interest accrues between the read and the transaction
+    assert strategy.balanceOfDebt() == pytest.approx(expected["debt"][0], rel=1e-6)
+    assert strategy.balanceOfCollateral() == pytest.approx(
+        expected["collateral"][0], rel=1e-6
+    )
+    assert strategy.balanceOfWant() == pytest.approx(expected["want"][0], rel=1e-6)
+
+
+def test_vectorized_matches_single_scenarios():
+    deposits = [10 ** 16, 10 ** 18, 5 * 10 ** 20, 2 * 10 ** 21]
+    prices = [10 ** 18, 95 * 10 ** 16]
+    targets = [15 * 10 ** 17, 2 * 10 ** 18, 3 * 10 ** 18]
+    grid = simulate_deposits(
+        np.array(deposits, dtype=object)[:, None, None],
+        np.array(prices, dtype=object)[None, :, None],
+        np.array(targets, dtype=object)[None, None, :],
+        10 ** 24,
+    )
+    assert grid["collRatio"].shape == (4, 2, 3)
+    for i, d in enumerate(deposits):
+        for j, p in enumerate(prices):
+            for k, t in enumerate(targets):
+                single = simulate_deposits(d, p, t, 10 ** 24)
+                for field, values in grid.items():
+                    assert values[i, j, k] == single[field][0]
+    # Deposits above maxSingleTrade are wound partially
+    assert grid["want"][3, 0, 0] == 10 ** 21
+
+
+def test_models_import_without_project():
+    # A fresh interpreter has no brownie project loaded, like the spawned
+    # workers of the risk and tolerance process pools
+    modules = ["leverage", "accounting", "exit_planner", "risk", "tolerances"]
+    subprocess.run(
+        [sys.executable, "-c", "; ".join(f"import scripts.{m}" for m in modules)],
+        cwd=Path(__file__).parents[1],
+        check=True,
+    )
@@ -0,0 +1,61 @@
+from brownie import chain
+from scripts.log_index import LogIndex
+
+
+def test_index_strategy_lifecycle(
+    vault, strategy, cloner, token, amount, user, gov, strategist, rewards, keeper
+):
+    start = chain.height
+    clone = cloner.cloneMarketLib(
+        vault, strategist, rewards, keeper, "Clone", {"from": gov}
+    ).events["Cloned"]["clone"]
+
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    wind = strategy.harvest({"from": gov})
+    unwind = strategy.emergencyUnwind(amount // 4, {"from": vault.management()})
+
+    index = LogIndex()
+    # The original strategy is announced before `start`, add it explicitly
+    index.add_strategies([strategy])
+    assert (
+        index.sync(vaults=[vault], cloners=[cloner], from_block=start) == chain.height
+    )
+    assert set(index.strategies) == {strategy.address, clone}
+
+    (harvest,) = index.harvests(strategy)
+    assert harvest[1] == wind.txid
+    assert harvest[3]["strategy"] == strategy.address
+    assert (
+        int(harvest[2]["debtOutstanding"])
+        == wind.events["Harvested"]["debtOutstanding"]
+    )
+
+    flashloans = index.flashloans(strategy)
+    assert [(f[1], f[2]) for f in flashloans] == [
+        (wind.txid, "wind"),
+        (unwind.txid, "unwind"),
+    ]
+    assert index.last_flashloan(strategy, "wind")[0] == wind.block_number
+    assert index.events(clone) == []
+
+
+def test_index_resumes(vault, strategy, token, amount, user, gov, tmp_path):
+    path = tmp_path / "logs.sqlite"
+    start = chain.height
+    index = LogIndex(path)
+    index.add_strategies([strategy])
+    index.sync(vaults=[vault], from_block=start)
+
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    tx = strategy.harvest({"from": gov})
+
+    # A new process picks up after the last ingested block
+    index = LogIndex(path)
+    assert index.last_block == start
+    index.sync(vaults=[vault], from_block=0, chunk_size=2)
+    assert index.last_block == chain.height
+    assert [e[1] for e in index.events(strategy, "Harvested")] == [tx.txid]
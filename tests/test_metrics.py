@@ -0,0 +1,75 @@
+import pytest
+import requests
+from brownie import chain, web3
+from scripts import metrics
+from scripts.monitor import snapshot_strategy
+
+
+@pytest.fixture
+def exporter():
+    server = metrics.serve(0, host="127.0.0.1")
+    yield f"http://127.0.0.1:{server.server_port}/metrics"
+    server.shutdown()
+
+
+@pytest.fixture
+def instrumented():
+    metrics.instrument(web3)
+    yield
+    web3.middleware_onion.remove("rpc_metrics")
+
+
+def scrape(url):
+    samples = {}
+    for line in requests.get(url).text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_strategy_gauges(
+    exporter, vault, strategy, token, amount, user, gov, multicall
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    metrics.record_snapshot(snapshot_strategy(strategy, multicall))
+    samples = scrape(exporter)
+
+    label = f'{{strategy="{strategy.address}"}}'
+    assert samples["strategy_coll_ratio" + label] == pytest.approx(
+        strategy.getCurrentCollRatio() / 1e18
+    )
+    assert samples["strategy_debt" + label] == pytest.approx(
+        strategy.balanceOfDebt() / 1e18
+    )
+    assert samples["strategy_tend_trigger" + label] == strategy.tendTrigger(1)
+    assert samples["strategy_snapshot_block" + label] == chain.height
+
+
+def test_failed_calls_drop_samples(exporter, strategy, multicall):
+    snapshot = snapshot_strategy(strategy, multicall)
+    metrics.record_snapshot(snapshot)
+    snapshot["getCurrentCollRatio"] = None
+    metrics.record_snapshot(snapshot)
+    samples = scrape(exporter)
+
+    label = f'{{strategy="{strategy.address}"}}'
+    assert "strategy_coll_ratio" + label not in samples
+    assert samples["strategy_failed_calls" + label] == 1
+
+
+def test_rpc_latency_histogram(exporter, instrumented, strategy):
+    before = metrics.rpc_latency.count("eth_call")
+    for _ in range(3):
+        strategy.balanceOfDebt()
+    assert metrics.rpc_latency.count("eth_call") == before + 3
+
+    samples = scrape(exporter)
+    count = samples['rpc_request_seconds_count{method="eth_call"}']
+    assert samples['rpc_request_seconds_bucket{method="eth_call",le="+Inf"}'] == count
+    assert samples['rpc_requests_total{method="eth_call"}'] == count
+    assert 'contract_cache_requests_total{result="hits"}' in samples
@@ -0,0 +1,80 @@
+import pytest
+from brownie import chain
+from scripts.monitor_daemon import MonitorDaemon
+
+
+@pytest.fixture
+def daemon(strategy, multicall):
+    updates = []
+    daemon = MonitorDaemon(
+        [strategy],
+        multicall,
+        on_update=lambda previous, snapshot: updates.append(snapshot),
+    )
+    daemon.updates = updates
+    daemon.start()
+    yield daemon
+
+
+def test_unrelated_blocks_cost_nothing(daemon, strategy, user, rewards):
+    assert len(daemon.updates) == 1
+    user.transfer(rewards, 1)
+    chain.mine(5)
+
+    assert daemon.process() == set()
+    assert len(daemon.updates) == 1
+    assert daemon.last_block == chain.height
+
+
+def test_harvest_refreshes_strategy(daemon, vault, strategy, token, amount, user, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    assert daemon.process() == {strategy.address}
+    state = daemon.state[strategy.address]
+    assert state["block"] == chain.height
+    assert state["balanceOfDebt"] == strategy.balanceOfDebt()
+    assert state["balanceOfCollateral"] == strategy.balanceOfCollateral()
+
+    # Nothing touched the strategy since
+    chain.mine(1)
+    assert daemon.process() == set()
+
+
+def test_failed_poll_is_retried(
+    daemon, monkeypatch, vault, strategy, token, amount, user, gov
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    last_block = daemon.last_block
+
+    def bad_log(logs):
+        raise ValueError("bad log")
+
+    # The failure is swallowed and the blocks stay unprocessed
+    monkeypatch.setattr(daemon, "affected_strategies", bad_log)
+    assert daemon.poll() is None
+    assert daemon.last_block == last_block
+
+    monkeypatch.undo()
+    assert daemon.poll() == {strategy.address}
+    assert daemon.last_block == chain.height
+
+
+def test_vault_report_refreshes_only_its_strategy(
+    vault, strategy, cloner, strategist, rewards, keeper, gov, multicall
+):
+    clone = cloner.cloneMarketLib(
+        vault, strategist, rewards, keeper, "Clone", {"from": gov}
+    ).events["Cloned"]["clone"]
+    fleet = MonitorDaemon([strategy, clone], multicall)
+    fleet.start()
+
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    assert fleet.process() == {strategy.address}
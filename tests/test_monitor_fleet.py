@@ -0,0 +1,71 @@
+import pytest
+from brownie import chain
+from scripts import monitor
+from scripts.monitor import fleet_strategies, poll_fleet
+
+
+def test_fleet_discovers_clones(
+    vault, strategy, cloner, strategist, rewards, keeper, gov, multicall
+):
+    clones = [
+        cloner.cloneMarketLib(
+            vault, strategist, rewards, keeper, f"Clone {i}", {"from": gov}
+        ).events["Cloned"]["clone"]
+        for i in range(2)
+    ]
+
+    config = {
+        "strategies": [strategy.address],
+        "cloners": [{"address": cloner.address, "from_block": 0}],
+    }
+    strategies = fleet_strategies(config)
+
+    # The original is listed explicitly and found by the cloner, only once
+    assert strategies == [cloner.original()] + clones
+
+    results = dict(poll_fleet(strategies, multicall, concurrency=2))
+    assert set(results) == set(strategies)
+    for address, snapshot in results.items():
+        assert not isinstance(snapshot, Exception)
+        assert snapshot["address"] == address
+        assert snapshot["block"] == chain.height
+
+
+def test_fleet_reports_failures(strategy, multicall, user):
+    # An EOA is not a strategy: its failure must not stop the other polls
+    results = dict(poll_fleet([strategy.address, user.address], multicall))
+    assert not isinstance(results[strategy.address], Exception)
+    assert isinstance(results[user.address], Exception)
+
+
+def test_fleet_flushes_reports_when_history_fails(monkeypatch):
+    sent = []
+
+    class Dispatcher:
+        def submit(self, chat_id, text):
+            sent.append(text)
+
+        def flush(self):
+            sent.append("flushed")
+
+    class BrokenStore:
+        def __init__(self, path):
+            pass
+
+        def append_many(self, snapshots):
+            raise TypeError("bad snapshot")
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(monitor, "load_config", lambda: {"history": "history.sqlite"})
+    monkeypatch.setattr(monitor, "get_multicall", lambda address: None)
+    monkeypatch.setattr(monitor, "fleet_strategies", lambda config: ["0x1"])
+    monkeypatch.setattr(monitor, "poll_fleet", lambda *args: [("0x1", {})])
+    monkeypatch.setattr(monitor, "format_report", lambda snapshot: ["report"])
+    monkeypatch.setattr(monitor, "get_dispatcher", lambda: Dispatcher())
+    monkeypatch.setattr(monitor, "HealthStore", BrokenStore)
+
+    with pytest.raises(TypeError):
+        monitor.fleet()
+    assert sent == ["report", "flushed"]
@@ -0,0 +1,60 @@
+import pytest
+from brownie import chain
+from scripts.monitor import snapshot_strategy, format_report
+
+
+def test_snapshot_matches_direct_calls(
+    vault, strategy, token, amount, user, gov, multicall
+):
+    # Deposit to the vault and send funds through the strategy
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    snapshot = snapshot_strategy(strategy, multicall)
+
+    assert snapshot["block"] == chain.height
+    assert snapshot["name"] == strategy.name()
+    assert snapshot["balanceOfCollateral"] == strategy.balanceOfCollateral()
+    assert snapshot["balanceOfDebt"] == strategy.balanceOfDebt()
+    assert snapshot["estimatedTotalAssets"] == strategy.estimatedTotalAssets()
+    assert snapshot["getCurrentCollRatio"] == strategy.getCurrentCollRatio()
+    assert snapshot["getLiquidationRatio"] == strategy.getLiquidationRatio()
+    assert snapshot["tendTrigger"] == strategy.tendTrigger(1)
+    assert snapshot["strategies"] == vault.strategies(strategy).dict()
+
+    report = format_report(snapshot)
+    assert report[0] == report[-1] == "```"
+
+
+def test_report_of_failed_calls(strategy, multicall):
+    snapshot = snapshot_strategy(strategy, multicall)
+    snapshot["getCurrentCollRatio"] = None
+    snapshot["tendTrigger"] = None
+
+    report = format_report(snapshot)
+    assert "Failed calls: getCurrentCollRatio, tendTrigger" in report
+    assert "Current c-ratio: n/a" in report
+    assert "Everything looks OK" not in report
+
+
+def test_snapshot_is_pinned_to_block(
+    vault, strategy, token, amount, user, gov, multicall
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    block = chain.height
+    debt = strategy.balanceOfDebt()
+
+    # Change the position after the pinned block
+    strategy.emergencyUnwind(
+        strategy.estimatedTotalAssets() // 2, {"from": vault.management()}
+    )
+    assert strategy.balanceOfDebt() != debt
+
+    snapshot = snapshot_strategy(strategy, multicall, block_identifier=block)
+    assert snapshot["block"] == block
+    assert snapshot["balanceOfDebt"] == debt
@@ -0,0 +1,56 @@
+import pytest
+from scripts.risk import position_from_strategy, run
+
+POSITION = {
+    "collateral": 2000.0,
+    "debt": 1000.0,
+    "want": 0.0,
+    "price": 0.99,
+    "target": 2.0,
+    "lower": 0.1,
+    "upper": 0.1,
+    "liquidation_ratio": 1 / 0.81,
+    "min_single_trade": 1e-3,
+    "max_single_trade": 1000.0,
+    "max_borrow_rate": 0.044,
+    "borrow_rate": 0.02,
+}
+
+# No keeper at all
+ABANDONED = {"keeper_interval": 10 ** 9, "harvest_interval": 10 ** 9}
+
+
+def test_result_independent_of_workers():
+    single = run(POSITION, paths=400, batch_size=100, workers=1)
+    pooled = run(POSITION, paths=400, batch_size=100, workers=4)
+    assert single == pooled
+    assert single["paths"] == 400
+
+
+def test_calm_market_is_safe():
+    summary = run(POSITION, {"depeg_vol": 0.0, "jump_rate": 0.0}, paths=200)
+    assert summary["liquidation_probability"] == 0
+    assert summary["expected_loss"] == 0
+    assert summary["tends"] == 0
+
+
+def test_keeper_reduces_liquidations():
+    crash = {"jump_size": 0.3, "jump_rate": 10.0, "curve_depth": 1e7}
+    abandoned = run(POSITION, {**crash, **ABANDONED}, paths=500)
+    kept = run(POSITION, crash, paths=500)
+    assert abandoned["liquidation_probability"] > 0
+    assert abandoned["expected_liquidation_loss"] > 0
+    assert kept["liquidation_probability"] < abandoned["liquidation_probability"]
+    assert kept["tends"] > 0
+
+
+def test_position_from_strategy(vault, strategy, token, amount, user, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": gov})
+
+    position = position_from_strategy(strategy)
+    assert position["debt"] == pytest.approx(strategy.balanceOfDebt() / 1e18)
+    assert position["target"] == strategy.collateralizationRatio() / 1e18
+    assert position["max_single_trade"] == strategy.maxSingleTrade() / 1e18
+    assert 0 <= position["borrow_rate"] < 1
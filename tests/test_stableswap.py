@@ -0,0 +1,34 @@
+import numpy as np
+from brownie import Contract, chain
+from scripts.stableswap import POOL, POOL_ABI, StableSwap
+
+SIZES = [1, 10 ** 12, 10 ** 15, 10 ** 18, 37 * 10 ** 18 + 1, 10 ** 21, 10 ** 23]
+
+
+def test_get_dy_matches_pool():
+    pool = Contract.from_abi("StableSwapSTETH", POOL, POOL_ABI)
+    block = chain.height
+    replica = StableSwap.from_chain(block_identifier=block)
+    for i, j in [(0, 1), (1, 0)]:
+        quotes = replica.get_dy(i, j, SIZES)
+        assert list(quotes) == [
+            pool.get_dy.call(i, j, dx, block_identifier=block) for dx in SIZES
+        ]
+
+
+def test_vector_matches_scalar_quotes():
+    replica = StableSwap.from_chain()
+    sizes = np.array([k * 10 ** 19 + 7 for k in range(1, 501)], dtype=object)
+    quotes = replica.get_dy(1, 0, sizes)
+    for dx, dy in list(zip(sizes, quotes))[::50]:
+        assert replica.get_dy(1, 0, dx)[0] == dy
+    assert np.all(np.diff(replica.slippage(1, 0, sizes)) >= 0)
+
+
+def test_max_trade_respects_max_slippage():
+    pool = Contract.from_abi("StableSwapSTETH", POOL, POOL_ABI)
+    replica = StableSwap.from_chain()
+    size = replica.max_trade(200)
+    assert 0 < size < replica.balances[0]
+    assert pool.get_dy(1, 0, size) >= size * (10_000 - 200) // 10_000
+    assert pool.get_dy(1, 0, size + 1) < (size + 1) * (10_000 - 200) // 10_000
@@ -0,0 +1,206 @@
+import pytest
+from brownie import chain, interface
+from brownie.exceptions import VirtualMachineError
+from brownie.test import strategy
+
+# Stateful fuzzing of the vault/strategy lifecycle on the local protocol stack
+# (--mocks): random sequences of deposits, withdrawals, harvests, tends, debt
+# ratio changes, stETH price moves, stETH rebases, emergency unwinds and
+# migrations, with the invariants checked after every step. Brownie's
+# state_machine snapshots the chain when the test starts and reverts to it
+# before every example; the strategy is added to the vault in `setup`, so the
+# test uses no function fixture that changes the chain and the snapshot is the
+# one of the deployment.
+
+WAD = 10 ** 18
+MAX_BPS = 10_000
+
+# Collateral MarketLib leaves behind when withdrawing (COLLATERAL_DUST) plus
+# the rounding of stETH share transfers
+DUST = 100
+
+# Reverts of a guard: the step is dropped, nothing changed
+GUARDS = {
+    "unsafe coll. ratio (adjPos)",
+    "unsafe coll. ratio (liqPos)",
+    "assets>maxSingleTrade",
+    "cannot migrate debt position",
+    "Exchange resulted in fewer coins than expected",
+}
+
+SETTINGS = {"max_examples": 100, "stateful_step_count": 25}
+
+
+class Lifecycle:
+    st_amount = strategy("uint256", min_value=10 ** 16, max_value=200 * WAD)
+    st_bps = strategy("uint256", min_value=1, max_value=MAX_BPS)
+    st_debt_ratio = strategy("uint256", max_value=MAX_BPS)
+    # stETH/ETH of the price oracle, within the depegs seen on mainnet
+    st_price = strategy("uint256", min_value=93 * 10 ** 16, max_value=101 * 10 ** 16)
+    # Oracle report, in bps of the pooled ether: rewards or slashing
+    st_rebase = strategy("int256", min_value=-10, max_value=10)
+    st_seconds = strategy("uint256", max_value=7 * 24 * 3600)
+    st_unwind = strategy("bool")
+
+    def __init__(cls, vault, cloner, Strategy, mocks, gov, strategist, whale):
+        cls.vault = vault
+        cls.cloner = cloner
+        cls.Strategy = Strategy
+        cls.gov = gov
+        cls.strategist = strategist
+        cls.whale = whale
+        cls.weth = mocks["weth"]
+        cls.steth = mocks["steth"]
+        cls.oracle = mocks["price_oracle"]
+        cls.tokens = {
+            token: mocks["protocol_data_provider"].getReserveTokensAddresses(token)
+            for token in [cls.weth, cls.steth]
+        }
+
+    def setup(self):
+        self.strategy = self.Strategy.at(self.cloner.original())
+        self.strategy.setDoHealthCheck(False, {"from": self.gov})
+        self.vault.addStrategy(
+            self.strategy, MAX_BPS, 0, 2 ** 256 - 1, 1_000, {"from": self.gov}
+        )
+        self.weth.approve(self.vault, 2 ** 256 - 1, {"from": self.whale})
+        self.retired = []
+
+    def rule_deposit(self, st_amount):
+        self.vault.deposit(st_amount, {"from": self.whale})
+
+    def rule_withdraw(self, st_bps):
+        shares = self.vault.balanceOf(self.whale) * st_bps // MAX_BPS
+        if shares > 0:
+            self.transact(
+                self.vault.withdraw, shares, self.whale, MAX_BPS, {"from": self.whale}
+            )
+
+    def rule_harvest(self):
+        self.transact(self.strategy.harvest)
+
+    def rule_tend(self):
+        self.transact(self.strategy.tend)
+
+    def rule_debt_ratio(self, st_debt_ratio):
+        self.vault.updateStrategyDebtRatio(
+            self.strategy, st_debt_ratio, {"from": self.gov}
+        )
+
+    def rule_price(self, st_price):
+        self.oracle.setAssetPrice(self.steth, st_price, {"from": self.gov})
+        self.keeper()
+
+    def rule_rebase(self, st_rebase):
+        pooled = self.steth.getTotalPooledEther()
+        self.steth.setTotalPooledEther(
+            pooled * (MAX_BPS + st_rebase) // MAX_BPS, {"from": self.gov}
+        )
+        self.keeper()
+
+    def rule_time(self, st_seconds):
+        chain.sleep(st_seconds)
+        chain.mine()
+        self.keeper()
+
+    def rule_emergency_unwind(self, st_bps):
+        amount = self.strategy.estimatedTotalAssets() * st_bps // MAX_BPS
+        self.transact(self.strategy.emergencyUnwind, amount)
+
+    def rule_migrate(self, st_unwind):
+        old = self.strategy
+        if st_unwind:
+            self.transact(old.emergencyUnwind, old.estimatedTotalAssets())
+        tx = self.cloner.cloneMarketLib(
+            self.vault,
+            self.strategist,
+            self.strategist,
+            self.strategist,
+            "Strategy-AAVE-lev-v2-stETH",
+            {"from": self.strategist},
+        )
+        new = self.Strategy.at(tx.events["Cloned"]["clone"])
+        new.setDoHealthCheck(False, {"from": self.gov})
+        assets = old.estimatedTotalAssets()
+        total_debt = self.vault.strategies(old)["totalDebt"]
+        if not self.transact(self.vault.migrateStrategy, old, new):
+            assert old.balanceOfDebt() > 0
+            return
+
+        # Everything moved to the new strategy, no debt left behind
+        assert old.balanceOfDebt() == 0
+        assert old.balanceOfCollateral() <= DUST
+        assert old.estimatedTotalAssets() <= DUST
+        assert new.estimatedTotalAssets() + DUST >= assets
+        assert self.vault.strategies(new)["totalDebt"] == total_debt
+        self.retired.append(old)
+        self.strategy = new
+
+    def invariant_collateralization_ratio(self):
+        if self.strategy.balanceOfDebt() > 0:
+            assert (
+                self.strategy.getCurrentCollRatio()
+                > self.strategy.getLiquidationRatio()
+            )
+
+    def invariant_estimated_total_assets(self):
+        # Recomputed from the token balances and the oracle prices
+        s = self.strategy
+        a_token, _, _ = self.tokens[self.steth]
+        _, _, debt_token = self.tokens[self.weth]
+        price = (
+            WAD
+            * (WAD * WAD // self.oracle.getAssetPrice(self.weth))
+            // (WAD * WAD // self.oracle.getAssetPrice(self.steth))
+        )
+        assert s.estimatedTotalAssets() == (
+            self.weth.balanceOf(s)
+            + (self.steth.balanceOf(s) + interface.ERC20(a_token).balanceOf(s))
+            * price
+            // WAD
+            - interface.ERC20(debt_token).balanceOf(s)
+        )
+        assert self.vault.totalAssets() == (
+            self.weth.balanceOf(self.vault) + self.vault.strategies(s)["totalDebt"]
+        )
+
+    def invariant_no_stranded_debt(self):
+        for old in self.retired:
+            assert old.balanceOfDebt() == 0
+            assert self.vault.strategies(old)["totalDebt"] == 0
+
+    def keeper(self):
+        # The keeper answers a market move when the strategy asks for a tend
+        if self.strategy.tendTrigger(0):
+            self.transact(self.strategy.tend)
+
+    def transact(self, fn, *args):
+        # True if the transaction went through, False if a guard reverted it.
+        # Sent by governance unless `args` ends with a transaction dict.
+        if not args or not isinstance(args[-1], dict):
+            args += ({"from": self.gov},)
+        try:
+            fn(*args)
+        except VirtualMachineError as e:
+            if e.revert_msg not in GUARDS:
+                raise
+            return False
+        return True
+
+
+def test_lifecycle(
+    state_machine, vault, cloner, Strategy, mocks, gov, strategist, weth_whale
+):
+    if not mocks:
+        pytest.skip("moves the oracle and rebases stETH, run with --mocks")
+    state_machine(
+        Lifecycle,
+        vault,
+        cloner,
+        Strategy,
+        mocks,
+        gov,
+        strategist,
+        weth_whale,
+        settings=SETTINGS,
+    )
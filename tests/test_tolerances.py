@@ -0,0 +1,74 @@
+import numpy as np
+from scripts.history import HealthStore
+from scripts.tolerances import candidates, historical_paths, search
+
+POSITION = {
+    "collateral": 2000.0,
+    "debt": 1000.0,
+    "want": 0.0,
+    "price": 0.99,
+    "target": 2.0,
+    "lower": 0.1,
+    "upper": 0.1,
+    "liquidation_ratio": 1 / 0.81,
+    "min_single_trade": 1e-3,
+    "max_single_trade": 1000.0,
+    "max_borrow_rate": 0.044,
+    "borrow_rate": 0.02,
+}
+
+
+def test_candidates_respect_liquidation_ratio():
+    grid = candidates(POSITION, targets=[1.3, 2.0], lowers=[0.05, 0.1], uppers=[0.1])
+    assert [(c["target"], c["lower"]) for c in grid] == [
+        (1.3, 0.05),
+        (2.0, 0.05),
+        (2.0, 0.1),
+    ]
+
+
+def test_search_ranks_by_score():
+    results = search(
+        POSITION, targets=[1.8, 2.0], lowers=[0.05, 0.2], uppers=[0.1], n=100
+    )
+    assert len(results) == 4
+    feasible = [r for r in results if r["liquidation_probability"] <= 0.01]
+    assert results[: len(feasible)] == feasible
+    scores = [r["score"] for r in feasible]
+    assert scores == sorted(scores, reverse=True)
+    # Narrow bands need more tends
+    by_lower = {(r["target"], r["lower"]): r for r in results}
+    assert by_lower[(2.0, 0.05)]["tends"] >= by_lower[(2.0, 0.2)]["tends"]
+
+
+def test_search_on_history():
+    store = HealthStore()
+    for i in range(48):
+        store.append(
+            {
+                "address": "0xStrategy",
+                "block": i,
+                "timestamp": 1_600_000_000 + i * 1800,
+                "balanceOfCollateral": 2000 * 10 ** 18,
+                "balanceOfDebt": 1000 * 10 ** 18,
+                "estimatedTotalAssets": 1000 * 10 ** 18,
+                "getCurrentCollRatio": 2 * 10 ** 18,
+                "getWantPerYieldBearing": (990 - i) * 10 ** 15,
+                "getLiquidationRatio": 1234 * 10 ** 15,
+                "strategies": {"debtRatio": 10_000},
+            }
+        )
+    prices, rates = historical_paths(store, "0xStrategy", 0.02)
+    assert prices.shape == rates.shape == (1, 24)
+    assert np.all(np.diff(prices) < 0)
+
+    (tight, loose) = search(
+        POSITION,
+        targets=[2.0],
+        lowers=[0.02, 0.2],
+        uppers=[0.1],
+        paths=(prices, rates),
+        workers=1,
+    )
+    assert {tight["lower"], loose["lower"]} == {0.02, 0.2}
+    assert min(tight["tends"], loose["tends"]) == 0
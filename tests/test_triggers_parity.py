@@ -0,0 +1,84 @@
+import pytest
+from brownie import chain
+from scripts.triggers import evaluate, fetch_state
+
+
+def assert_parity(strategies, multicall, force=None):
+    state = fetch_state(strategies, multicall)
+    tend, harvest = evaluate(state, force)
+    for i, s in enumerate(strategies):
+        assert tend[i] == s.tendTrigger(1)
+        assert harvest[i] == s.harvestTrigger(1)
+    return tend, harvest
+
+
+@pytest.fixture
+def fleet(strategy, cloner, vault, strategist, rewards, keeper, gov, StrategyChoice):
+    # A second strategy that is not added to the vault (inactive)
+    clone = cloner.cloneMarketLib(
+        vault, strategist, rewards, keeper, "Clone", {"from": gov}
+    ).events["Cloned"]["clone"]
+    yield [strategy, StrategyChoice.at(clone)]
+
+
+def test_trigger_parity_lifecycle(
+    fleet, vault, strategy, token, amount, user, gov, basefeeChecker, multicall
+):
+    # Nothing deposited
+    assert_parity(fleet, multicall)
+
+    # Credit available above creditThreshold
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.setCreditThreshold(amount // 2, {"from": gov})
+    tend, harvest = assert_parity(fleet, multicall)
+    assert harvest[0]
+
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    tend, harvest = assert_parity(fleet, multicall)
+    assert not tend[0] and not harvest[0]
+
+    # Forced harvest
+    strategy.setForceHarvestTriggerOnce(True, {"from": gov})
+    assert_parity(fleet, multicall, force=[True, False])
+    strategy.setForceHarvestTriggerOnce(False, {"from": gov})
+
+    # maxReportDelay passed
+    chain.sleep(strategy.maxReportDelay() + 1)
+    chain.mine(1)
+    tend, harvest = assert_parity(fleet, multicall)
+    assert harvest[0]
+
+
+@pytest.mark.parametrize("factor", [0.5, 0.999, 1.001, 1.5])
+@pytest.mark.parametrize("max_base_fee", [0, 1001 * 1e9])
+def test_tend_trigger_parity_bands(
+    fleet,
+    vault,
+    strategy,
+    token,
+    amount,
+    user,
+    gov,
+    basefeeChecker,
+    multicall,
+    factor,
+    max_base_fee,
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    tolerance = strategy.lowerRebalanceTolerance()
+    current = strategy.getCurrentCollRatio()
+    basefeeChecker.setMaxAcceptableBaseFee(
+        max_base_fee, {"from": strategy.strategist()}
+    )
+
+    # Move the target below and above the current ratio, in and out of the band
+    strategy.setCollateralizationRatio(int(current + tolerance * factor), {"from": gov})
+    assert_parity(fleet, multicall)
+    strategy.setCollateralizationRatio(int(current - tolerance * factor), {"from": gov})
+    assert_parity(fleet, multicall)